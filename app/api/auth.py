@@ -3,8 +3,9 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app.schemas.schemas import UserCreate, UserResponse, UserLogin, Token
 from app.models.models import User
-from app.services.auth_service import hash_password, verify_password, create_access_token
+from app.services.auth_service import hash_password, verify_and_rehash, create_access_token
 from app.api.dependencies import get_current_user
+from app.services.cache_service import publish
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -42,6 +43,8 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         nombre=user_data.nombre
     )
     db.add(new_user)
+    # Otros workers podrían tener en caché un usuario anterior con este email
+    publish(db, "users", new_user.email)
     db.commit()
     db.refresh(new_user)
     
@@ -55,6 +58,9 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
     """
     Autentica a un usuario y genera un token JWT.
     
+    Si el hash guardado tiene menos coste de bcrypt que el calibrado, se
+    rehace con el actual.
+    
     Args:
         credentials: Credenciales de login (email, password)
         db: Sesión de BD
@@ -66,14 +72,21 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
         HTTPException 401: Si las credenciales son inválidas
     """
     user = db.query(User).filter(User.email == credentials.email).first()
+    valid, new_hash = verify_and_rehash(credentials.password, user.password_hash) if user else (False, None)
     
-    if not user or not verify_password(credentials.password, user.password_hash):
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email o password incorrectos",
             headers={"WWW-Authenticate": "Bearer"}
         )
     
+    if new_hash:
+        # Hash con un coste de bcrypt fuera de la banda: se rehace ahora que se conoce el password
+        user.password_hash = new_hash
+        publish(db, "users", user.email)
+        db.commit()
+    
     access_token = create_access_token(data={"sub": user.email})
     
     return {"access_token": access_token, "token_type": "bearer", "user": user}
@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from typing import Optional
+from app.services.profiling_service import is_authorized, get_report, list_reports
+from app.services import gemini_service
+
+router = APIRouter(prefix="/debug", tags=["Debug"], include_in_schema=False)
+
+# ==========================================
+# DEPENDENCY: TOKEN DE ADMINISTRADOR
+# ==========================================
+
+def require_profiling_token(x_profile_token: Optional[str] = Header(None)):
+    """
+    Solo permite el acceso con el token de profiling configurado.
+    Responde 404 para no revelar que el endpoint existe.
+    """
+    if not is_authorized(x_profile_token):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not Found"
+        )
+
+# ==========================================
+# GET /debug/profiles
+# ==========================================
+@router.get("/profiles", dependencies=[Depends(require_profiling_token)])
+def get_profiles():
+    """
+    Lista los perfiles guardados (los más recientes primero).
+    """
+    return list_reports()
+
+# ==========================================
+# GET /debug/profiles/{id}
+# ==========================================
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_profiling_token)])
+def get_profile(profile_id: str):
+    """
+    Devuelve el informe completo de un perfil: funciones con más tiempo,
+    pilas colapsadas y consultas SQL ejecutadas.
+    
+    Raises:
+        HTTPException 404: Si el perfil no existe (o ya se descartó)
+    """
+    report = get_report(profile_id)
+    
+    if report is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Perfil no encontrado"
+        )
+    
+    return report
+
+# ==========================================
+# GET /debug/models
+# ==========================================
+@router.get("/models", dependencies=[Depends(require_profiling_token)])
+def get_models():
+    """
+    Estado del router de modelos de Gemini: qué modelos están disponibles
+    y sus llamadas y errores recientes (de este worker).
+    """
+    return gemini_service.model_router.status()
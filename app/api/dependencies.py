@@ -1,9 +1,21 @@
-from fastapi import Depends, HTTPException, status
+import hashlib
+import math
+from typing import Optional
+import orjson
+from fastapi import Depends, Header, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.models import User
 from app.services.auth_service import decode_access_token
+from app.config import settings
+from app.services.rate_limit_service import get_rate_limiter
+from app.services.cache_service import user_cache
+from app.services.idempotency_service import (
+    IdempotencyConflict,
+    IdempotencyInProgress,
+    idempotency_store,
+)
 
 # ==========================================
 # OAUTH2 SCHEME
@@ -17,6 +29,9 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
     """
     Dependency que extrae el usuario autenticado del JWT token.
+    
+    Los usuarios se cachean por email (desligados de la sesión) y se
+    invalidan en todos los workers cuando cambian.
     """
     payload= decode_access_token(token)
     
@@ -27,9 +42,7 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             headers={"WWW-Authenticate": "Bearer"}
         )
     
-    email: str = payload.get("sub")
-    
-    user = db.query(User).filter(User.email == email).first()
+    user = user_from_token_payload(payload, db)
     
     if user is None:
         raise HTTPException(
@@ -38,4 +51,139 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             headers={"WWW-Authenticate": "Bearer"}
         )
         
-    return user
\ No newline at end of file
+    return user
+
+def user_from_token_payload(payload: dict, db: Session) -> Optional[User]:
+    """Usuario del claim "sub" de un JWT ya validado (cacheado por email)"""
+    email: str = payload.get("sub")
+    
+    user = user_cache.get(email)
+    
+    if user is None:
+        user = db.query(User).filter(User.email == email).first()
+        if user is not None:
+            db.expunge(user)
+            user_cache.set(email, user)
+    
+    return user
+
+# ==========================================
+# DEPENDENCY: RATE LIMITING
+# ==========================================
+
+class RateLimit:
+    """
+    Dependency que limita las peticiones de cada usuario por clase de
+    endpoint ("llm" o "crud"), con budgets independientes.
+    
+    Uso:
+        @router.post("/suggest-next", dependencies=[Depends(rate_limit_llm)])
+    """
+    
+    def __init__(self, endpoint_class: str):
+        self.endpoint_class = endpoint_class
+    
+    def __call__(self, current_user: User = Depends(get_current_user)):
+        if not settings.rate_limit_enabled:
+            return
+        
+        result = get_rate_limiter().check(current_user.id, self.endpoint_class)
+        
+        if not result.allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Demasiadas peticiones, inténtalo más tarde",
+                headers={"Retry-After": str(max(1, math.ceil(result.retry_after)))}
+            )
+
+
+rate_limit_llm = RateLimit("llm")
+rate_limit_crud = RateLimit("crud")
+
+# ==========================================
+# DEPENDENCY: IDEMPOTENCY-KEY
+# ==========================================
+
+class IdempotentRequest:
+    """
+    Estado de la cabecera Idempotency-Key en una petición.
+    
+    Uso en el endpoint:
+        if idempotency.replay is not None:
+            return idempotency.replay
+        ...
+        idempotency.save(db, respuesta, status.HTTP_201_CREATED)
+        db.commit()
+    """
+    
+    def __init__(self, user_id: int, key: Optional[str] = None, replay: Optional[Response] = None):
+        self.user_id = user_id
+        self.key = key
+        self.replay = replay
+    
+    def save(self, db: Session, response, status_code: int) -> None:
+        """Guarda la respuesta (un schema de Pydantic) en la transacción de `db`"""
+        if self.key is None:
+            return
+        body = orjson.dumps(response.model_dump(mode="json"))
+        idempotency_store.save(db, self.user_id, self.key, status_code, body)
+
+
+async def _request_body_hash(request: Request) -> str:
+    return hashlib.sha256(await request.body()).hexdigest()
+
+
+def idempotency(
+    request: Request,
+    idempotency_key: Optional[str] = Header(None, max_length=255, description="Clave para reintentar sin duplicar"),
+    body_hash: str = Depends(_request_body_hash),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Dependency para POST que admiten la cabecera Idempotency-Key.
+    
+    La primera petición con una clave se ejecuta y su respuesta se guarda
+    (settings.idempotency_ttl_seconds). Un reintento con la misma clave
+    recibe esa respuesta (cabecera Idempotent-Replayed: true) sin volver a
+    ejecutarse; si la original sigue en curso, espera a que termine.
+    Sin cabecera, la petición se ejecuta normalmente.
+    
+    Raises:
+        HTTPException 422: Si la clave ya se usó con otra petición
+        HTTPException 409: Si la petición original sigue en curso
+    """
+    if idempotency_key is None or not settings.idempotency_enabled:
+        yield IdempotentRequest(current_user.id)
+        return
+    
+    engine = db.get_bind()
+    endpoint = f"{request.method} {request.url.path}"
+    
+    try:
+        stored = idempotency_store.claim(engine, current_user.id, idempotency_key, endpoint, body_hash)
+    except IdempotencyConflict:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail="Esta Idempotency-Key ya se usó con otra petición"
+        )
+    except IdempotencyInProgress:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Hay una petición con esta Idempotency-Key en curso",
+            headers={"Retry-After": "1"}
+        )
+    
+    if stored is not None:
+        yield IdempotentRequest(current_user.id, replay=Response(
+            content=stored.body,
+            status_code=stored.status_code,
+            media_type="application/json",
+            headers={"Idempotent-Replayed": "true"}
+        ))
+        return
+    
+    try:
+        yield IdempotentRequest(current_user.id, idempotency_key)
+    finally:
+        idempotency_store.release(engine, current_user.id, idempotency_key)
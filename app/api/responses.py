@@ -0,0 +1,373 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+import csv
+import enum
+import gzip
+import io
+import brotli
+import msgpack
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, create_model
+from app.config import settings
+from app.models.models import Task, TaskArchive
+from app.schemas.schemas import TaskResponse
+
+# ==========================================
+# SERIALIZACIÓN RÁPIDA DE COLECCIONES DE TAREAS
+# ==========================================
+# Para listas grandes, validar cada objeto ORM con TaskResponse y volver a
+# codificarlo cuesta más que la propia consulta. Este camino selecciona sólo
+# las columnas de TaskResponse como tuplas y las codifica directamente a
+# JSON con orjson, sin hidratar objetos ORM ni validar dos veces.
+
+# Mismo orden de campos que TaskResponse, para que el JSON sea idéntico
+TASK_RESPONSE_FIELDS = tuple(TaskResponse.model_fields)
+TASK_RESPONSE_COLUMNS = tuple(getattr(Task, field) for field in TASK_RESPONSE_FIELDS)
+TASK_ARCHIVE_RESPONSE_COLUMNS = tuple(getattr(TaskArchive, field) for field in TASK_RESPONSE_FIELDS)
+
+# OPT_UTC_Z: los datetimes UTC se escriben con "Z", como hace Pydantic
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+# ==========================================
+# CAMPOS DISPERSOS (?fields=)
+# ==========================================
+# Las vistas de lista sólo necesitan unos pocos campos: los pedidos se
+# llevan al SELECT (no se leen los textos largos que no se devuelven) y
+# a un TaskResponse recortado.
+
+
+def parse_fields(value: Optional[str]) -> tuple:
+    """
+    Campos pedidos con ?fields=id,titulo,..., en el orden de TaskResponse.
+    Sin valor, todos.
+
+    Raises:
+        ValueError: Si algún campo no existe o no se pide ninguno
+    """
+    if value is None:
+        return TASK_RESPONSE_FIELDS
+    requested = {field.strip() for field in value.split(",") if field.strip()}
+    unknown = requested - set(TASK_RESPONSE_FIELDS)
+    if unknown:
+        raise ValueError(f"Campos desconocidos: {', '.join(sorted(unknown))}")
+    if not requested:
+        raise ValueError("Indica al menos un campo")
+    return tuple(field for field in TASK_RESPONSE_FIELDS if field in requested)
+
+
+def response_columns(model, fields: tuple) -> tuple:
+    """Columnas de `model` (Task o TaskArchive) para los campos pedidos"""
+    return tuple(getattr(model, field) for field in fields)
+
+
+@lru_cache(maxsize=256)
+def task_response_model(fields: tuple) -> type[BaseModel]:
+    """TaskResponse con sólo `fields` (mismos tipos y serialización)"""
+    if fields == TASK_RESPONSE_FIELDS:
+        return TaskResponse
+    return create_model(
+        "TaskResponsePartial",
+        __config__=ConfigDict(from_attributes=True),
+        **{field: (TaskResponse.model_fields[field].annotation, TaskResponse.model_fields[field]) for field in fields}
+    )
+
+# ==========================================
+# FORMATOS NEGOCIABLES
+# ==========================================
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+# JSON columnar: {"fields": [...], "rows": [[...], ...]}, nombres de campo una sola vez
+COLUMNAR_MEDIA_TYPE = "application/vnd.taskmaster.columnar+json"
+
+# Documentación OpenAPI de las representaciones alternativas
+TASK_LIST_RESPONSES = {
+    200: {
+        "content": {
+            MSGPACK_MEDIA_TYPE: {},
+            COLUMNAR_MEDIA_TYPE: {},
+        },
+        "description": "Lista de tareas. Admite Accept: application/msgpack, "
+                       f"Accept: {COLUMNAR_MEDIA_TYPE} (o ?layout=columnar) "
+                       "y compresión gzip/br según Accept-Encoding.",
+    }
+}
+
+
+def rows_to_dicts(rows, fields: tuple = TASK_RESPONSE_FIELDS) -> list:
+    """Convierte tuplas de columnas en dicts campo -> valor"""
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def encode_tasks_json(rows, fields: tuple = TASK_RESPONSE_FIELDS) -> bytes:
+    """
+    Codifica filas (tuplas en el orden de `fields`) a JSON.
+
+    Los enums se escriben por su valor y los datetimes en ISO 8601,
+    igual que la serialización de TaskResponse.
+    """
+    return orjson.dumps(rows_to_dicts(rows, fields), option=ORJSON_OPTIONS)
+
+
+def encode_tasks_columnar(rows, fields: tuple = TASK_RESPONSE_FIELDS) -> bytes:
+    """Codifica filas en JSON columnar: los nombres de campo van una sola vez"""
+    return orjson.dumps({"fields": fields, "rows": [tuple(row) for row in rows]}, option=ORJSON_OPTIONS)
+
+
+def _msgpack_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat().replace("+00:00", "Z")
+    raise TypeError(f"Tipo no serializable en msgpack: {type(value).__name__}")
+
+
+def encode_tasks_msgpack(rows, fields: tuple = TASK_RESPONSE_FIELDS, columnar: bool = False) -> bytes:
+    """
+    Codifica filas en MessagePack (lista de mapas, o columnar).
+    Los datetimes se envían como strings ISO 8601, igual que en JSON.
+    """
+    if columnar:
+        payload = {"fields": list(fields), "rows": [list(row) for row in rows]}
+    else:
+        payload = rows_to_dicts(rows, fields)
+    return msgpack.packb(payload, default=_msgpack_default)
+
+
+def _parse_accept(header: str) -> dict:
+    """
+    Preferencias de una cabecera Accept o Accept-Encoding: {rango: q}.
+
+    Los elementos sin q valen 1; un q mal formado cuenta como rechazo.
+    """
+    preferences = {}
+    for item in header.split(","):
+        name, *params = item.split(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    quality = 0.0
+        preferences[name] = max(quality, preferences.get(name, 0.0))
+    return preferences
+
+
+def _media_type_quality(preferences: dict, media_type: str) -> float:
+    """q del rango más específico que incluye `media_type` (0 si ninguno)"""
+    main_type = media_type.split("/", 1)[0]
+    for media_range in (media_type, f"{main_type}/*", "*/*"):
+        if media_range in preferences:
+            return preferences[media_range]
+    return 0.0
+
+
+def prefers_media_type(request: Request, media_type: str) -> bool:
+    """Si Accept nombra `media_type` con q > 0 y no por debajo de JSON"""
+    preferences = _parse_accept(request.headers.get("accept", ""))
+    quality = preferences.get(media_type, 0.0)
+    return quality > 0 and quality >= _media_type_quality(preferences, JSON_MEDIA_TYPE)
+
+
+def negotiate_format(request: Request) -> tuple[str, bool]:
+    """
+    Elige la representación según Accept (con sus valores q) y ?layout=columnar.
+
+    JSON es la opción por defecto (sin Accept, con comodines o si no se
+    acepta nada de lo que hay); MessagePack y el JSON columnar sólo se
+    eligen si se piden por su nombre. A igual q gana MessagePack, luego
+    el columnar.
+
+    Returns:
+        (media type, si es columnar)
+    """
+    layout_columnar = request.query_params.get("layout") == "columnar"
+    header = request.headers.get("accept", "").strip()
+    if not header:
+        return (COLUMNAR_MEDIA_TYPE, True) if layout_columnar else (JSON_MEDIA_TYPE, False)
+
+    preferences = _parse_accept(header)
+    msgpack_q = max(preferences.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    columnar_q = preferences.get(COLUMNAR_MEDIA_TYPE, 0.0)
+    json_q = _media_type_quality(preferences, JSON_MEDIA_TYPE)
+
+    if msgpack_q > 0 and msgpack_q >= max(columnar_q, json_q):
+        return MSGPACK_MEDIA_TYPE, layout_columnar or columnar_q > 0
+    if layout_columnar or (columnar_q > 0 and columnar_q >= json_q):
+        return COLUMNAR_MEDIA_TYPE, True
+    return JSON_MEDIA_TYPE, False
+
+
+def negotiate_encoding(request: Request) -> str:
+    """
+    Elige la compresión según Accept-Encoding: la de mayor q entre br y
+    gzip (br si empatan). q=0 las rechaza; "*" vale para las no nombradas.
+    """
+    preferences = _parse_accept(request.headers.get("accept-encoding", ""))
+    wildcard = preferences.get("*", 0.0)
+    br = preferences.get("br", wildcard)
+    gzip_q = preferences.get("gzip", wildcard)
+    if br > 0 and br >= gzip_q:
+        return "br"
+    if gzip_q > 0:
+        return "gzip"
+    return "identity"
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.brotli_quality)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=settings.gzip_level)
+    return body
+
+
+def encode_tasks(rows, fields: tuple, media_type: str, columnar: bool) -> bytes:
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return encode_tasks_msgpack(rows, fields, columnar=columnar)
+    if columnar:
+        return encode_tasks_columnar(rows, fields)
+    return encode_tasks_json(rows, fields)
+
+
+def tasks_response(request: Request, rows, fields: tuple = TASK_RESPONSE_FIELDS) -> Response:
+    """
+    Respuesta ya codificada para una lista de tareas, con el formato y la
+    compresión negociados con el cliente. Sólo se comprime por encima de
+    settings.compression_min_bytes (en payloads pequeños no compensa).
+    """
+    media_type, columnar = negotiate_format(request)
+    body = encode_tasks(rows, fields, media_type, columnar)
+
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if len(body) >= settings.compression_min_bytes:
+        encoding = negotiate_encoding(request)
+        if encoding != "identity":
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+# ==========================================
+# EXPORTACIÓN EN STREAMING
+# ==========================================
+# La exportación completa no cabe en memoria para usuarios grandes: las
+# filas se leen por lotes de un cursor de servidor y cada lote se codifica
+# y se envía antes de leer el siguiente (transfer-encoding chunked).
+
+EXPORT_MEDIA_TYPES = {
+    "jsonl": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _enum_values(values) -> list:
+    return [value.value if value is not None else None for value in values]
+
+
+def _isoformat_values(values) -> list:
+    return [value.isoformat() if value is not None else None for value in values]
+
+
+def _csv_values(values) -> list:
+    return [_csv_value(value) for value in values]
+
+
+@lru_cache(maxsize=None)
+def _csv_column_encoders(fields: tuple) -> tuple:
+    """
+    Conversión de cada columna a valores de CSV (None: se escribe tal cual).
+
+    csv.writer ya escribe None como "" y los números y textos como tales;
+    sólo los enums y las fechas de las columnas de tasks necesitan pasar
+    por Python. Los campos que no son columnas de tasks se convierten
+    valor a valor con _csv_value.
+    """
+    encoders = []
+    for field in fields:
+        column = Task.__table__.columns.get(field)
+        if column is None:
+            encoders.append(_csv_values)
+        elif issubclass(column.type.python_type, enum.Enum):
+            encoders.append(_enum_values)
+        elif issubclass(column.type.python_type, datetime):
+            encoders.append(_isoformat_values)
+        else:
+            encoders.append(None)
+    return tuple(encoders)
+
+
+def iter_jsonl(partitions, fields: tuple = TASK_RESPONSE_FIELDS):
+    """Un objeto JSON por línea; un chunk por lote de filas"""
+    for rows in partitions:
+        yield b"".join(
+            orjson.dumps(dict(zip(fields, row)), option=ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+            for row in rows
+        )
+
+
+def iter_csv(partitions, fields: tuple = TASK_RESPONSE_FIELDS):
+    """
+    CSV con cabecera; un chunk por lote de filas.
+
+    Cada lote se convierte por columnas (sólo las que lo necesitan) y se
+    escribe con un único writerows, en lugar de convertir valor a valor.
+    """
+    encoders = _csv_column_encoders(tuple(fields))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for rows in partitions:
+        if not rows:
+            continue
+        columns = list(zip(*rows))
+        for index, encode in enumerate(encoders):
+            if encode is not None:
+                columns[index] = encode(columns[index])
+        writer.writerows(zip(*columns))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+EXPORT_ENCODERS = {
+    "jsonl": iter_jsonl,
+    "csv": iter_csv,
+}
+
+
+def export_response(partitions, export_format: str, filename: str, fields: tuple = TASK_RESPONSE_FIELDS) -> StreamingResponse:
+    """
+    Respuesta en streaming de una exportación.
+
+    Args:
+        partitions: Iterable de lotes de filas (p. ej. Result.partitions())
+        export_format: "jsonl" o "csv"
+        filename: Nombre sugerido para la descarga (sin extensión)
+        fields: Campos de cada fila, en orden
+    """
+    return StreamingResponse(
+        EXPORT_ENCODERS[export_format](partitions, fields),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'}
+    )
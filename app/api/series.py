@@ -0,0 +1,228 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime, timedelta
+from app.database import get_db
+from app.schemas.schemas import TaskSeriesCreate, TaskSeriesResponse, TaskUpdate, TaskResponse, TaskOccurrenceResponse
+from app.models.models import User, Task, TaskSeries, TaskStatus
+from app.api.dependencies import get_current_user, rate_limit_crud
+from app.services.cache_service import publish_task_change
+from app.services.events_service import TASK_COMPLETED, TASK_UPDATED, TASKS_CHANGED, publish_task_event
+from app.services.similarity_service import similarity_index
+from app.services.recurrence_service import materialize, series_virtual_occurrences
+
+router = APIRouter(prefix="/series", tags=["Recurring tasks"])
+
+
+def _get_series(db: Session, series_id: int, user_id: int) -> TaskSeries:
+    series = db.query(TaskSeries).filter(TaskSeries.id == series_id, TaskSeries.user_id == user_id).first()
+
+    if not series:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Serie no encontrada"
+        )
+
+    return series
+
+
+def _materialize_or_404(db: Session, series: TaskSeries, occurrence_at: datetime) -> Task:
+    try:
+        return materialize(db, series, occurrence_at)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
+# ==========================================
+# POST /series - Crear serie recurrente
+# ==========================================
+@router.post("/", response_model=TaskSeriesResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(rate_limit_crud)])
+def create_series(
+    series_data: TaskSeriesCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Crea una tarea recurrente ("cada lunes a las 9", "daily standup").
+
+    Sólo se guarda la regla: las ocurrencias aparecen en GET /tasks
+    (con occurrences_until), /tasks/due, /tasks/overdue y suggest-next.
+
+    Args:
+        series_data: Título, prioridad y regla de repetición
+        db: Sesión de BD
+        current_user: Usuario autenticado
+
+    Returns:
+        Serie creada
+    """
+    dias_semana = series_data.dias_semana
+
+    new_series = TaskSeries(
+        user_id=current_user.id,
+        titulo=series_data.titulo,
+        descripcion=series_data.descripcion,
+        prioridad=series_data.prioridad,
+        frecuencia=series_data.frecuencia,
+        intervalo=series_data.intervalo,
+        dias_semana=",".join(str(d) for d in sorted(set(dias_semana))) if dias_semana else None,
+        inicio=series_data.inicio,
+        fin=series_data.fin
+    )
+
+    db.add(new_series)
+    publish_task_change(db, current_user.id)
+    publish_task_event(db, current_user.id, TASKS_CHANGED)
+    db.commit()
+    db.refresh(new_series)
+
+    return new_series
+
+# ==========================================
+# GET /series - Listar series
+# ==========================================
+@router.get("/", response_model=list[TaskSeriesResponse], dependencies=[Depends(rate_limit_crud)])
+def get_series(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Lista las series recurrentes del usuario"""
+    return db.execute(
+        select(TaskSeries).where(TaskSeries.user_id == current_user.id).order_by(TaskSeries.id)
+    ).scalars().all()
+
+# ==========================================
+# DELETE /series/{id} - Eliminar serie
+# ==========================================
+@router.delete("/{series_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(rate_limit_crud)])
+def delete_series(
+    series_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Elimina una serie. Sus ocurrencias ya guardadas (modificadas o
+    completadas) se conservan como tareas sueltas.
+
+    Raises:
+        HTTPException 404: Si la serie no existe
+    """
+    series = _get_series(db, series_id, current_user.id)
+
+    db.execute(
+        update(Task).where(Task.series_id == series.id).values(series_id=None),
+        execution_options={"synchronize_session": False}
+    )
+    db.delete(series)
+    publish_task_change(db, current_user.id)
+    publish_task_event(db, current_user.id, TASKS_CHANGED)
+    db.commit()
+
+    return None
+
+# ==========================================
+# GET /series/{id}/occurrences - Ocurrencias de una ventana
+# ==========================================
+@router.get("/{series_id}/occurrences", response_model=list[TaskOccurrenceResponse], dependencies=[Depends(rate_limit_crud)])
+def get_occurrences(
+    series_id: int,
+    desde: Optional[datetime] = Query(None, description="Inicio de la ventana (por defecto, ahora)"),
+    hasta: Optional[datetime] = Query(None, description="Fin de la ventana (por defecto, desde + 30 días)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Ocurrencias de la serie en [desde, hasta): las guardadas (con id) y
+    las pendientes calculadas a partir de la regla (id = None).
+
+    Raises:
+        HTTPException 404: Si la serie no existe
+    """
+    series = _get_series(db, series_id, current_user.id)
+    desde = desde or datetime.now()
+    hasta = hasta or desde + timedelta(days=30)
+
+    stored = db.query(Task).filter(
+        Task.series_id == series.id,
+        Task.occurrence_at >= desde,
+        Task.occurrence_at < hasta
+    ).all()
+    occurrences = [TaskOccurrenceResponse.model_validate(task) for task in stored]
+    occurrences += [
+        TaskOccurrenceResponse(**values)
+        for values in series_virtual_occurrences(db, series, desde, hasta)
+    ]
+
+    return sorted(occurrences, key=lambda occurrence: occurrence.occurrence_at)
+
+# ==========================================
+# PUT /series/{id}/occurrences/{fecha} - Modificar una ocurrencia
+# ==========================================
+@router.put("/{series_id}/occurrences/{occurrence_at}", response_model=TaskResponse, dependencies=[Depends(rate_limit_crud)])
+def update_occurrence(
+    series_id: int,
+    occurrence_at: datetime,
+    task_data: TaskUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Modifica una ocurrencia: la guarda como tarea (si aún no lo estaba) y
+    le aplica los cambios. A partir de ahí se gestiona como cualquier tarea.
+
+    Raises:
+        HTTPException 404: Si la serie no existe o la fecha no es una ocurrencia
+    """
+    series = _get_series(db, series_id, current_user.id)
+    task = _materialize_or_404(db, series, occurrence_at)
+
+    for field, value in task_data.model_dump(exclude_unset=True).items():
+        setattr(task, field, value)
+
+    publish_task_change(db, current_user.id)
+    publish_task_event(db, current_user.id, TASK_UPDATED, task.id)
+    db.commit()
+    db.refresh(task)
+    similarity_index.sync_task(task)
+
+    return task
+
+# ==========================================
+# PATCH /series/{id}/occurrences/{fecha}/complete
+# ==========================================
+@router.patch("/{series_id}/occurrences/{occurrence_at}/complete", response_model=TaskResponse, dependencies=[Depends(rate_limit_crud)])
+def complete_occurrence(
+    series_id: int,
+    occurrence_at: datetime,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Completa una ocurrencia (la guarda como tarea completada).
+
+    Raises:
+        HTTPException 404: Si la serie no existe o la fecha no es una ocurrencia
+        HTTPException 400: Si la ocurrencia ya está completada
+    """
+    series = _get_series(db, series_id, current_user.id)
+    task = _materialize_or_404(db, series, occurrence_at)
+
+    if task.estado == TaskStatus.COMPLETED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La tarea ya está completada"
+        )
+
+    task.estado = TaskStatus.COMPLETED
+    task.completed_at = datetime.utcnow()
+
+    publish_task_change(db, current_user.id)
+    publish_task_event(db, current_user.id, TASK_COMPLETED, task.id)
+    db.commit()
+    db.refresh(task)
+    similarity_index.sync_task(task)
+
+    return task
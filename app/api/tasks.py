@@ -1,22 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, File, UploadFile
+from fastapi.responses import Response, StreamingResponse
+import orjson
+from sqlalchemy import func, select, union_all, update
 from sqlalchemy.orm import Session
 from typing import Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+from app.config import settings
 from app.database import get_db
 from app.services.gemini_service import extract_task_data, suggest_next_task
-from app.schemas.schemas import TaskCreate, TaskUpdate, TaskResponse, TaskCreateSmart
-from app.models.models import User, Task, TaskStatus, TaskPriority
-from app.api.dependencies import get_current_user
+from app.services.cache_service import publish_task_change, suggestion_cache
+from app.services.events_service import (
+    TASK_COMPLETED, TASK_CREATED, TASK_DELETED, TASK_UPDATED, TASKS_CHANGED, publish_task_event
+)
+from app.services.similarity_service import similarity_index
+from app.services.digest_service import digest_candidates, score_task_dicts
+from app.services.import_service import ImportFormatError, detect_format, import_tasks
+from app.services.recurrence_service import merge_by_fecha_limite, virtual_occurrences, virtual_rows
+from app.schemas.schemas import (
+    TaskCreate,
+    TaskUpdate,
+    TaskResponse,
+    TaskOccurrenceResponse,
+    TaskCreateSmart,
+    TaskBulkUpdate,
+    TaskBulkResult,
+    TaskImportResult,
+)
+from app.models.models import User, Task, TaskArchive, TaskStatus, TaskPriority, ACTIVE_STATUSES
+from app.api.dependencies import IdempotentRequest, get_current_user, idempotency, rate_limit_crud, rate_limit_llm
+from app.api.responses import (
+    TASK_RESPONSE_FIELDS,
+    TASK_RESPONSE_COLUMNS,
+    TASK_ARCHIVE_RESPONSE_COLUMNS,
+    TASK_LIST_RESPONSES,
+    EXPORT_MEDIA_TYPES,
+    export_response,
+    parse_fields,
+    prefers_media_type,
+    response_columns,
+    task_response_model,
+    tasks_response,
+)
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
+
+def task_fields(
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por comas (p. ej. id,titulo,estado)")
+) -> tuple:
+    """Dependency: campos de ?fields= (todos si no se indica)"""
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
 # ==========================================
 # GET /tasks - Listar tareas
 # ==========================================
-@router.get("/", response_model=list[TaskResponse])
+@router.get("/", response_model=list[TaskOccurrenceResponse], responses=TASK_LIST_RESPONSES, dependencies=[Depends(rate_limit_crud)])
 def get_tasks(
+    request: Request,
     estado: Optional[TaskStatus] = Query(None, description="Filtrar por estado"),
     prioridad: Optional[TaskPriority] = Query(None, description="Filtrar por prioridad"),
+    include_archived: bool = Query(False, description="Incluir tareas archivadas"),
+    occurrences_until: Optional[datetime] = Query(None, description="Incluir ocurrencias de tareas recurrentes hasta esta fecha"),
+    fields: tuple = Depends(task_fields),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -27,49 +78,258 @@ def get_tasks(
     - estado: pending, in_progress, completed, cancelled
     - prioridad: low, medium, high, urgent
     
+    Con ?fields=id,titulo,estado sólo se leen y devuelven esos campos
+    (p. ej. para vistas de lista, sin descripcion ni original_input).
+    
+    Las tareas archivadas (terminadas hace tiempo) sólo se leen si se
+    pide explícitamente con include_archived=true.
+    
+    Las tareas recurrentes se expanden sólo si se indica occurrences_until:
+    se añaden sus ocurrencias pendientes entre ahora y esa fecha.
+    
+    Formatos (según Accept / Accept-Encoding):
+    - application/json (por defecto)
+    - application/msgpack
+    - JSON columnar (?layout=columnar)
+    - gzip / br por encima de un tamaño mínimo
+    
     Args:
+        request: Petición (para negociar formato y compresión)
         estado: Filtro opcional por estado
         prioridad: Filtro opcional por prioridad
+        include_archived: Si se incluyen las tareas de tasks_archive
+        occurrences_until: Fin de la ventana de ocurrencias recurrentes
+        fields: Campos a devolver (?fields=)
         db: Sesión de BD
         current_user: Usuario autenticado
         
     Returns:
         Lista de tareas del usuario
+        
+    Raises:
+        HTTPException 400: Si ?fields= incluye campos desconocidos
+        
+    Nota:
+        Selecciona sólo las columnas pedidas y las codifica directamente
+        a JSON, sin hidratar objetos ORM (ver app/api/responses.py).
     """
     
-    query = db.query(Task).filter(Task.user_id == current_user.id)
+    # fecha_limite hace falta para ordenar la unión y mezclar las
+    # ocurrencias aunque no se pida: se lee al final y se descarta
+    query_fields = fields
+    if (include_archived or occurrences_until) and "fecha_limite" not in fields:
+        query_fields = fields + ("fecha_limite",)
+    
+    query = _filtered_select(Task, response_columns(Task, query_fields), current_user.id, estado, prioridad)
+    
+    if include_archived:
+        archived = _filtered_select(
+            TaskArchive, response_columns(TaskArchive, query_fields), current_user.id, estado, prioridad
+        )
+        combined = union_all(query, archived).subquery()
+        query = select(*combined.c).order_by(combined.c.fecha_limite.asc().nullslast())
+    else:
+        query = query.order_by(Task.fecha_limite.asc().nullslast())
+    
+    rows = db.execute(query).all()
+    
+    # Las ocurrencias virtuales siempre están pendientes
+    if occurrences_until and estado in (None, TaskStatus.PENDING):
+        virtual = virtual_occurrences(db, current_user.id, datetime.now(), occurrences_until, prioridad)
+        rows = merge_by_fecha_limite(rows, virtual_rows(virtual, query_fields), query_fields)
+    
+    if query_fields != fields:
+        rows = [row[:len(fields)] for row in rows]
+    
+    return tasks_response(request, rows, fields)
+
+
+def _filtered_select(model, columns, user_id: int, estado, prioridad):
+    """SELECT de las columnas de respuesta con los filtros del listado"""
+    query = select(*columns).where(model.user_id == user_id)
     
     if estado:
-        query = query.filter(Task.estado == estado)
+        query = query.where(model.estado == estado)
     
     if prioridad:
-        query = query.filter(Task.prioridad == prioridad)
+        query = query.where(model.prioridad == prioridad)
+    
+    return query
+
+DURATION_UNITS = {"m": "minutes", "h": "hours", "d": "days"}
+
+
+def _parse_duration(value: str) -> timedelta:
+    """Convierte "90m", "24h" o "7d" en un timedelta"""
+    return timedelta(**{DURATION_UNITS[value[-1]]: int(value[:-1])})
+
+
+def _active_deadlines_select(user_id: int):
+    """
+    Tareas activas con fecha límite, en orden de vencimiento. Coincide con
+    el índice parcial idx_tasks_user_fecha_limite_activas.
+    """
+    return (
+        select(*TASK_RESPONSE_COLUMNS)
+        .where(
+            Task.user_id == user_id,
+            Task.estado.in_(ACTIVE_STATUSES),
+            Task.fecha_limite.is_not(None)
+        )
+        .order_by(Task.fecha_limite.asc(), Task.id.asc())
+    )
+
+def _active_task_texts(db: Session, user_id: int):
+    """Textos de las tareas activas, para construir el índice de duplicados"""
+    return db.execute(
+        select(Task.id, Task.titulo, Task.original_input)
+        .where(Task.user_id == user_id, Task.estado.in_(ACTIVE_STATUSES))
+    ).all()
+
+# ==========================================
+# GET /tasks/due - Tareas que vencen pronto
+# ==========================================
+@router.get("/due", response_model=list[TaskOccurrenceResponse], responses=TASK_LIST_RESPONSES, dependencies=[Depends(rate_limit_crud)])
+def get_due_tasks(
+    request: Request,
+    within: str = Query("24h", pattern=r"^[1-9][0-9]{0,4}[mhd]$", description="Ventana: 90m, 24h, 7d..."),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Lista las tareas activas que vencen entre ahora y ahora + within,
+    incluidas las ocurrencias de tareas recurrentes.
+    
+    Args:
+        request: Petición (para negociar formato y compresión)
+        within: Tamaño de la ventana (minutos, horas o días)
+        db: Sesión de BD
+        current_user: Usuario autenticado
+        
+    Returns:
+        Tareas pendientes o en progreso que vencen en la ventana
+    """
+    now = datetime.now()
+    hasta = now + _parse_duration(within)
+    query = _active_deadlines_select(current_user.id).where(
+        Task.fecha_limite >= now,
+        Task.fecha_limite < hasta
+    )
+    
+    virtual = virtual_occurrences(db, current_user.id, now, hasta)
+    rows = merge_by_fecha_limite(
+        db.execute(query).all(), virtual_rows(virtual, TASK_RESPONSE_FIELDS), TASK_RESPONSE_FIELDS
+    )
+    
+    return tasks_response(request, rows)
+
+# ==========================================
+# GET /tasks/overdue - Tareas vencidas
+# ==========================================
+@router.get("/overdue", response_model=list[TaskOccurrenceResponse], responses=TASK_LIST_RESPONSES, dependencies=[Depends(rate_limit_crud)])
+def get_overdue_tasks(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Lista las tareas activas cuya fecha límite ya pasó (las más antiguas primero).
+    
+    De las tareas recurrentes sólo se incluyen las ocurrencias pendientes de
+    los últimos settings.recurrence_overdue_lookback_days días.
+    
+    Args:
+        request: Petición (para negociar formato y compresión)
+        db: Sesión de BD
+        current_user: Usuario autenticado
+        
+    Returns:
+        Tareas pendientes o en progreso vencidas
+    """
+    now = datetime.now()
+    query = _active_deadlines_select(current_user.id).where(Task.fecha_limite < now)
+    
+    lookback = now - timedelta(days=settings.recurrence_overdue_lookback_days)
+    virtual = virtual_occurrences(db, current_user.id, lookback, now)
+    rows = merge_by_fecha_limite(
+        db.execute(query).all(), virtual_rows(virtual, TASK_RESPONSE_FIELDS), TASK_RESPONSE_FIELDS
+    )
+    
+    return tasks_response(request, rows)
+
+# ==========================================
+# GET /tasks/export - Exportación completa
+# ==========================================
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {media_type: {} for media_type in EXPORT_MEDIA_TYPES.values()}}},
+    dependencies=[Depends(rate_limit_crud)]
+)
+def export_tasks(
+    export_format: str = Query("jsonl", alias="format", pattern="^(jsonl|csv)$", description="jsonl o csv"),
+    include_archived: bool = Query(False, description="Incluir tareas archivadas"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Exporta todas las tareas del usuario en JSONL o CSV, en streaming.
+    
+    Las filas se leen de un cursor de servidor en lotes de
+    settings.export_batch_size (yield_per), así que la memoria no crece
+    con el número de tareas.
+    
+    Args:
+        export_format: Formato de salida (?format=jsonl o csv)
+        include_archived: Si se incluyen las tareas de tasks_archive
+        db: Sesión de BD (abierta hasta terminar el envío)
+        current_user: Usuario autenticado
+        
+    Returns:
+        Descarga con una tarea por línea, ordenadas por id
+    """
+    query = _filtered_select(Task, TASK_RESPONSE_COLUMNS, current_user.id, None, None)
     
-    query = query.order_by(Task.fecha_limite.asc().nullslast())
+    if include_archived:
+        archived = _filtered_select(TaskArchive, TASK_ARCHIVE_RESPONSE_COLUMNS, current_user.id, None, None)
+        combined = union_all(query, archived).subquery()
+        query = select(*combined.c).order_by(combined.c.id)
+    else:
+        query = query.order_by(Task.id)
     
-    tasks = query.all()
-    return tasks
+    # Sólo columnas: por la conexión (Core) se evita el procesado de filas del ORM
+    result = db.connection().execute(query, execution_options={"yield_per": settings.export_batch_size})
+    
+    return export_response(result.partitions(), export_format, f"tasks-{current_user.id}")
 
 # ==========================================
 # POST /tasks - Crear tarea manual
 # ==========================================
-@router.post("/", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/", response_model=TaskResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(rate_limit_crud)])
 def create_task(
     task_data: TaskCreate,
+    idempotency: IdempotentRequest = Depends(idempotency),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Crea una nueva tarea manualmente.
     
+    Admite la cabecera Idempotency-Key: un reintento con la misma clave
+    devuelve la tarea ya creada en lugar de crear otra.
+    
     Args:
         task_data: Datos de la tarea (título, descripción, fecha_límite, prioridad)
+        idempotency: Estado de la cabecera Idempotency-Key
         db: Sesión de BD
         current_user: Usuario autenticado
         
     Returns:
         Tarea creada
     """
+    if idempotency.replay is not None:
+        return idempotency.replay
+    
     new_task = Task(
         user_id=current_user.id,
         titulo=task_data.titulo,
@@ -81,25 +341,191 @@ def create_task(
     )
     
     db.add(new_task)
-    db.commit()
+    publish_task_change(db, current_user.id)
+    db.flush()
     db.refresh(new_task)
+    publish_task_event(db, current_user.id, TASK_CREATED, new_task.id)
+    response = TaskResponse.model_validate(new_task)
+    # La respuesta se guarda en la misma transacción que la tarea
+    idempotency.save(db, response, status.HTTP_201_CREATED)
+    db.commit()
+    similarity_index.sync_task(response)
+    
+    return response
+
+# ==========================================
+# POST /tasks/import - Importar tareas de un fichero
+# ==========================================
+@router.post(
+    "/import",
+    response_model=TaskImportResult,
+    responses={200: {"content": {"application/x-ndjson": {}}, "description": "Resumen, o progreso en streaming con Accept: application/x-ndjson"}},
+    dependencies=[Depends(rate_limit_crud)]
+)
+def import_tasks_file(
+    request: Request,
+    file: UploadFile = File(..., description="Fichero CSV, JSONL o ICS"),
+    import_format: Optional[str] = Query(None, alias="format", pattern="^(csv|jsonl|ics)$", description="csv, jsonl o ics (por defecto, según la extensión)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Importa tareas desde un fichero de otra herramienta.
+    
+    El fichero se lee registro a registro, cada uno se valida como en
+    POST /tasks y las filas válidas se guardan por lotes de
+    settings.import_batch_size (COPY en PostgreSQL), con un commit por lote.
+    Los registros inválidos no detienen la importación: se informan con
+    su número de fila.
+    
+    - CSV: cabecera con titulo, descripcion, estado, prioridad, fecha_limite
+      (admite el CSV de GET /tasks/export)
+    - JSONL: un objeto por línea con esos mismos campos
+    - ICS: cada VTODO/VEVENT (SUMMARY, DESCRIPTION, DUE, STATUS, PRIORITY)
     
-    return new_task
+    Con Accept: application/x-ndjson la respuesta es un stream de eventos:
+    un evento por registro rechazado, el progreso tras cada lote y el
+    resumen final ("terminado": true).
+    
+    Args:
+        request: Petición (para negociar la respuesta)
+        file: Fichero subido
+        import_format: Formato del fichero (?format=)
+        db: Sesión de BD
+        current_user: Usuario autenticado
+        
+    Returns:
+        Filas procesadas, importadas, rechazadas y el detalle de los errores
+        (hasta settings.import_max_errors)
+        
+    Raises:
+        HTTPException 400: Si no se reconoce el formato del fichero
+    """
+    if import_format is None:
+        try:
+            import_format = detect_format(file.filename, file.content_type)
+        except ImportFormatError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    
+    events = import_tasks(db, current_user.id, file.file, import_format)
+    
+    if prefers_media_type(request, EXPORT_MEDIA_TYPES["jsonl"]):
+        def stream():
+            for event in events:
+                yield orjson.dumps(event, option=orjson.OPT_APPEND_NEWLINE)
+            similarity_index.invalidate(current_user.id)
+        
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+    
+    errors = []
+    for event in events:
+        if "fila" in event:
+            if len(errors) < settings.import_max_errors:
+                errors.append(event)
+        else:
+            summary = event
+    similarity_index.invalidate(current_user.id)
+    
+    return {
+        "procesadas": summary["procesadas"],
+        "importadas": summary["importadas"],
+        "con_errores": summary["con_errores"],
+        "errores": errors
+    }
+
+# ==========================================
+# PATCH /tasks/bulk - Actualización masiva
+# ==========================================
+@router.patch("/bulk", response_model=TaskBulkResult, dependencies=[Depends(rate_limit_crud)])
+def bulk_update_tasks(
+    bulk_data: TaskBulkUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Actualiza muchas tareas con una sola sentencia UPDATE ... RETURNING.
+    
+    Las tareas se seleccionan por lista de IDs o por filtro (estado,
+    prioridad, rango de fecha límite), siempre dentro de las del usuario.
+    
+    Al completar (estado=completed) se fija completed_at a ahora, salvo en
+    las que ya lo tenían; al pasar a otro estado se limpia completed_at.
+    
+    Args:
+        bulk_data: ids o filtro, y los cambios a aplicar (como en PUT)
+        db: Sesión de BD
+        current_user: Usuario autenticado
+        
+    Returns:
+        IDs de las tareas actualizadas y cuántas son
+        
+    Raises:
+        HTTPException 400: Si no se indica ningún cambio
+    """
+    values = bulk_data.cambios.model_dump(exclude_unset=True)
+    
+    if not values:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No hay cambios que aplicar"
+        )
+    
+    if "estado" in values and "completed_at" not in values:
+        if values["estado"] == TaskStatus.COMPLETED:
+            values["completed_at"] = func.coalesce(Task.completed_at, datetime.utcnow())
+        else:
+            values["completed_at"] = None
+    
+    statement = update(Task).where(Task.user_id == current_user.id)
+    
+    if bulk_data.ids is not None:
+        statement = statement.where(Task.id.in_(bulk_data.ids))
+    else:
+        filtro = bulk_data.filtro
+        if filtro.estado:
+            statement = statement.where(Task.estado == filtro.estado)
+        if filtro.prioridad:
+            statement = statement.where(Task.prioridad == filtro.prioridad)
+        if filtro.fecha_limite_desde:
+            statement = statement.where(Task.fecha_limite >= filtro.fecha_limite_desde)
+        if filtro.fecha_limite_hasta:
+            statement = statement.where(Task.fecha_limite < filtro.fecha_limite_hasta)
+    
+    statement = statement.values(**values).returning(Task.id)
+    
+    updated_ids = db.execute(
+        statement, execution_options={"synchronize_session": False}
+    ).scalars().all()
+    if updated_ids:
+        publish_task_change(db, current_user.id)
+        publish_task_event(db, current_user.id, TASKS_CHANGED)
+    db.commit()
+    if updated_ids:
+        similarity_index.invalidate(current_user.id)
+    
+    return {"ids": sorted(updated_ids), "total": len(updated_ids)}
 
 # ==========================================
 # GET /tasks/{id} - Ver tarea específica
 # ==========================================
-@router.get("/{task_id}", response_model=TaskResponse)
+@router.get("/{task_id}", response_model=TaskResponse, dependencies=[Depends(rate_limit_crud)])
 def get_task(
     task_id: int,
+    fields: tuple = Depends(task_fields),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Obtiene una tarea específica por su ID.
     
+    Con ?fields= sólo se leen y devuelven esos campos.
+    
     Args:
         task_id: ID de la tarea
+        fields: Campos a devolver (?fields=)
         db: Sesión de BD
         current_user: Usuario autenticado
         
@@ -107,22 +533,26 @@ def get_task(
         Tarea solicitada
         
     Raises:
+        HTTPException 400: Si ?fields= incluye campos desconocidos
         HTTPException 404: Si la tarea no existe o no pertenece al usuario
     """
-    task = db.query(Task).filter(Task.id == task_id, Task.user_id == current_user.id).first()
+    row = db.execute(
+        select(*response_columns(Task, fields)).where(Task.id == task_id, Task.user_id == current_user.id)
+    ).first()
     
-    if not task:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Tarea no encontrada"
         )
     
-    return task
+    task = task_response_model(fields).model_validate(dict(row._mapping))
+    return Response(content=task.model_dump_json(), media_type="application/json")
 
 # ==========================================
 # PUT /tasks/{id} - Actualizar tarea
 # ==========================================
-@router.put("/{task_id}", response_model=TaskResponse)
+@router.put("/{task_id}", response_model=TaskResponse, dependencies=[Depends(rate_limit_crud)])
 def update_task(
     task_id: int,
     task_data: TaskUpdate,
@@ -159,15 +589,18 @@ def update_task(
     for field, value in update_data.items():
         setattr(task, field, value)
     
+    publish_task_change(db, current_user.id)
+    publish_task_event(db, current_user.id, TASK_UPDATED, task.id)
     db.commit()
     db.refresh(task)
+    similarity_index.sync_task(task)
     
     return task
 
 # ==========================================
 # DELETE /tasks/{id} - Eliminar tarea
 # ==========================================
-@router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(rate_limit_crud)])
 def delete_task(
     task_id: int,
     db: Session = Depends(get_db),
@@ -194,14 +627,17 @@ def delete_task(
         )
     
     db.delete(task)
+    publish_task_change(db, current_user.id)
+    publish_task_event(db, current_user.id, TASK_DELETED, task_id)
     db.commit()
+    similarity_index.remove_task(current_user.id, task_id)
     
     return None
 
 # ==========================================
 # PATCH /tasks/{id}/complete
 # ==========================================
-@router.patch("/{task_id}/complete", response_model=TaskResponse)
+@router.patch("/{task_id}/complete", response_model=TaskResponse, dependencies=[Depends(rate_limit_crud)])
 def complete_task(
     task_id: int,
     db: Session = Depends(get_db),
@@ -244,8 +680,11 @@ def complete_task(
     task.estado = TaskStatus.COMPLETED
     task.completed_at = datetime.utcnow()
     
+    publish_task_change(db, current_user.id)
+    publish_task_event(db, current_user.id, TASK_COMPLETED, task.id)
     db.commit()
     db.refresh(task)
+    similarity_index.sync_task(task)
     
     return task
 
@@ -254,9 +693,11 @@ def complete_task(
 # POST /tasks/create-smart - Crear con IA
 # ==========================================
 
-@router.post("/create-smart", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/create-smart", response_model=TaskResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(rate_limit_llm)])
 def create_task_smart(
     smart_data: TaskCreateSmart,
+    allow_duplicate: bool = Query(False, description="Crear aunque se parezca a una tarea activa"),
+    idempotency: IdempotentRequest = Depends(idempotency),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -268,8 +709,17 @@ def create_task_smart(
         → Gemini extrae: titulo, descripcion, fecha_limite, prioridad
         → Se crea la tarea automáticamente
     
+    Antes de llamar a Gemini se busca una tarea activa casi idéntica
+    (título o texto original); si la hay, se responde 409 con esa tarea
+    en lugar de pagar la llamada y crear un duplicado.
+    
+    Con la cabecera Idempotency-Key, un reintento (p. ej. tras un timeout)
+    devuelve la tarea ya creada sin volver a llamar a Gemini.
+    
     Args:
         smart_data: Solo contiene "input" (texto del usuario)
+        allow_duplicate: Saltarse la detección de duplicados
+        idempotency: Estado de la cabecera Idempotency-Key
         db: Sesión de BD
         current_user: Usuario autenticado
         
@@ -278,7 +728,25 @@ def create_task_smart(
         
     Raises:
         HTTPException 400: Si Gemini no puede procesar el texto
+        HTTPException 409: Si ya existe una tarea activa casi idéntica
     """
+    if idempotency.replay is not None:
+        return idempotency.replay
+    
+    if settings.duplicate_detection_enabled and not allow_duplicate:
+        match = similarity_index.find_duplicate(
+            current_user.id, smart_data.input, lambda: _active_task_texts(db, current_user.id)
+        )
+        existing = db.get(Task, match.task_id) if match else None
+        if existing is not None and existing.user_id == current_user.id and existing.estado in ACTIVE_STATUSES:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={
+                    "mensaje": "Posible tarea duplicada",
+                    "similitud": round(match.score, 3),
+                    "task": TaskResponse.model_validate(existing).model_dump(mode="json")
+                }
+            )
     
     try:
         extracted_data = extract_task_data(smart_data.input)
@@ -295,10 +763,16 @@ def create_task_smart(
         )
         
         db.add(new_task)
-        db.commit()
+        publish_task_change(db, current_user.id)
+        db.flush()
         db.refresh(new_task)
+        publish_task_event(db, current_user.id, TASK_CREATED, new_task.id)
+        response = TaskResponse.model_validate(new_task)
+        idempotency.save(db, response, status.HTTP_201_CREATED)
+        db.commit()
+        similarity_index.sync_task(response)
         
-        return new_task
+        return response
         
     except ValueError as e:
         raise HTTPException(
@@ -317,7 +791,7 @@ def create_task_smart(
 # POST /tasks/suggest-next - Sugerir acción
 # ==========================================
 
-@router.post("/suggest-next")
+@router.post("/suggest-next", dependencies=[Depends(rate_limit_llm)])
 def suggest_next_action(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -326,7 +800,8 @@ def suggest_next_action(
     Usa IA para sugerir qué tarea hacer ahora.
     
     Analiza todas las tareas del usuario y recomienda la más apropiada
-    según prioridad, fecha límite y estado.
+    según prioridad, fecha límite y estado. Si hay un resumen diario
+    vigente, elige entre sus candidatas sin llamar a Gemini.
     
     Args:
         db: Sesión de BD
@@ -340,6 +815,55 @@ def suggest_next_action(
         }
     """
     
+    # La sugerencia sólo cambia si cambian las tareas: las mutaciones la invalidan
+    cached = suggestion_cache.get(current_user.id)
+    if cached is not None:
+        return cached
+    
+    # De cada serie recurrente, su próxima ocurrencia pendiente (sin id)
+    now = datetime.now()
+    occurrences = [
+        {
+            "id": None,
+            "titulo": occurrence["titulo"],
+            "estado": occurrence["estado"].value,
+            "prioridad": occurrence["prioridad"].value,
+            "fecha_limite": occurrence["fecha_limite"],
+        }
+        for occurrence in virtual_occurrences(
+            db, current_user.id,
+            now - timedelta(days=settings.recurrence_overdue_lookback_days),
+            now + timedelta(days=settings.recurrence_suggest_horizon_days),
+            first_only=True
+        )
+    ]
+    
+    # Resumen diario vigente (app/jobs/daily_digest.py): sus candidatas se
+    # vuelven a puntuar junto a las ocurrencias, sin leer todas las tareas
+    # ni llamar a Gemini
+    candidates = digest_candidates(db, current_user.id)
+    if candidates:
+        options = [
+            {
+                "id": task.id,
+                "titulo": task.titulo,
+                "estado": task.estado.value,
+                "prioridad": task.prioridad.value,
+                "fecha_limite": task.fecha_limite,
+                "created_at": task.created_at,
+            }
+            for task in candidates
+        ] + occurrences
+        best = options[int(score_task_dicts(options).argmax())]
+        suggested_task = next((task for task in candidates if task.id == best["id"]), None)
+        response = {
+            "sugerencia": f"Te sugiero completar: '{best['titulo']}' (prioridad {best['prioridad']})",
+            "task_id": best["id"],
+            "task": TaskResponse.model_validate(suggested_task) if suggested_task else None
+        }
+        suggestion_cache.set(current_user.id, response)
+        return response
+    
     tasks = db.query(Task).filter(Task.user_id == current_user.id).all()
     
     tasks_dicts = [
@@ -351,7 +875,7 @@ def suggest_next_action(
             "fecha_limite": task.fecha_limite,
         }
         for task in tasks
-    ]
+    ] + occurrences
     
     suggestion = suggest_next_task(tasks_dicts)
     
@@ -362,8 +886,13 @@ def suggest_next_action(
             Task.user_id == current_user.id
         ).first()
     
-    return {
+    response = {
         "sugerencia": suggestion["sugerencia"],
         "task_id": suggestion["task_id"],
         "task": TaskResponse.model_validate(suggested_task) if suggested_task else None
-    }
\ No newline at end of file
+    }
+    # Las respuestas de respaldo (Gemini falló) no se cachean
+    if not suggestion.get("fallback"):
+        suggestion_cache.set(current_user.id, response)
+    
+    return response
\ No newline at end of file
@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Depends, Query, WebSocket, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.database import get_db
+from app.api.dependencies import user_from_token_payload
+from app.services.auth_service import decode_access_token
+from app.services.events_service import task_event_hub
+
+router = APIRouter(prefix="/ws", tags=["WebSocket"])
+
+
+def _bearer_token(websocket: WebSocket, token: Optional[str]) -> Optional[str]:
+    """JWT de ?token= (navegadores) o de la cabecera Authorization"""
+    if token:
+        return token
+    scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        return credentials
+    return None
+
+
+def _authenticate(payload: Optional[dict], db: Session):
+    """Usuario del token; cierra la sesión (la conexión puede durar horas)"""
+    try:
+        return user_from_token_payload(payload, db) if payload else None
+    finally:
+        db.close()
+
+# ==========================================
+# WS /ws/tasks - Eventos de tareas en tiempo real
+# ==========================================
+@router.websocket("/tasks")
+async def tasks_websocket(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None, description="JWT (si no se envía en Authorization)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Canal de eventos de las tareas del usuario, en lugar de sondear GET /tasks.
+
+    Mensajes (JSON, del servidor al cliente):
+        {"evento": "task.created" | "task.updated" | "task.completed" | "task.deleted", "task_id": 42}
+        {"evento": "tasks.changed"}  # cambios masivos: recargar la lista
+
+    Los eventos llegan de cualquier worker a través del bus de invalidación.
+    Los mensajes del cliente se ignoran (sirven de keepalive).
+
+    Args:
+        websocket: Conexión
+        token: JWT de /auth/login (o cabecera Authorization: Bearer)
+        db: Sesión de BD (sólo para autenticar; se cierra antes de esperar eventos)
+    """
+    bearer = _bearer_token(websocket, token)
+    payload = decode_access_token(bearer) if bearer else None
+    # Consulta síncrona a la BD: fuera del event loop
+    user = await run_in_threadpool(_authenticate, payload, db)
+
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    task_event_hub.connect(user.id, websocket)
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    finally:
+        task_event_hub.disconnect(user.id, websocket)
@@ -1,3 +1,5 @@
+from typing import Optional
+from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings
 
 
@@ -10,8 +12,103 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 1440
 
+    # Coste de bcrypt: fijo o calibrado al arrancar para tardar <= bcrypt_target_ms
+    bcrypt_rounds: Optional[int] = None  # si se indica, no se calibra
+    bcrypt_target_ms: float = 100
+    bcrypt_min_rounds: int = 10
+    bcrypt_max_rounds: int = 16
+    bcrypt_rounds_tolerance: int = 1  # rondas de más que se aceptan sin rehacer el hash
+
     # Gemini
     gemini_api_key: str
+    # Permite apuntar a un servidor local (stub) en tests y benchmarks
+    gemini_base_url: Optional[str] = None
+    # Escalera de modelos, del más barato al más capaz (separados por comas)
+    gemini_models: str = "gemini-2.5-flash-lite,gemini-2.5-flash"
+    gemini_router_enabled: bool = True  # si no, todo va al peldaño de peticiones complejas
+    gemini_simple_max_chars: int = 120  # textos de create-smart más cortos son "simples"
+    gemini_simple_max_tasks: int = 15  # suggest-next con menos tareas es "simple"
+    gemini_max_attempts: int = Field(2, ge=1)  # modelos que se prueban por petición
+    gemini_latency_slo_seconds: float = 8.0  # p95 por encima: el modelo se aparta
+    gemini_error_rate_threshold: float = 0.5
+    gemini_router_window: int = 20  # últimas llamadas que se evalúan por modelo
+    gemini_router_min_calls: int = 5
+    gemini_router_cooldown_seconds: float = 60
+    # Caché de contexto: las instrucciones fijas se suben una vez por modelo
+    gemini_context_cache_enabled: bool = True
+    gemini_context_cache_ttl_seconds: int = 3600
+    gemini_context_cache_refresh_seconds: int = 300  # se renueva al usarla en sus últimos 5 min
+    gemini_context_cache_min_tokens: int = 1024  # mínimo de la API; por debajo van como system_instruction
+    gemini_context_cache_retry_seconds: float = 600  # espera tras un fallo al crearla
+
+    # Prompt de suggest-next
+    suggest_prompt_max_tokens: int = 2000  # parte variable (las instrucciones van aparte)
+    suggest_title_max_chars: int = 80
+
+    # Profiling bajo demanda (deshabilitado si no hay token)
+    profiling_token: Optional[str] = None
+    profiling_interval_ms: float = 1.0
+    profiling_max_reports: int = 50
+    profiling_top_functions: int = 30
+
+    # Respuestas de listas de tareas
+    compression_min_bytes: int = 1024
+    gzip_level: int = 6
+    brotli_quality: int = 4
+    export_batch_size: int = 2000  # filas por lote en /tasks/export
+    import_batch_size: int = 2000  # filas por lote (y commit) en /tasks/import
+    import_max_errors: int = 100  # errores por fila detallados en la respuesta
+
+    # Rate limiting (token buckets por usuario y clase de endpoint)
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"  # "memory" (por proceso) o "database" (compartido)
+    rate_limit_llm_burst: int = 5
+    rate_limit_llm_per_minute: float = 10
+    rate_limit_llm_per_day: int = 200
+    rate_limit_crud_burst: int = 120
+    rate_limit_crud_per_minute: float = 600
+
+    # Archivado de tareas terminadas
+    archive_after_days: int = 30
+    archive_batch_size: int = 1000
+
+    # Cachés en proceso e invalidación entre workers
+    cache_enabled: bool = True
+    cache_max_entries: int = 10000
+    cache_user_ttl_seconds: float = 300
+    cache_suggestion_ttl_seconds: float = 600
+    invalidation_channel: str = "taskmaster_invalidation"
+    invalidation_poll_interval: float = 1.0  # fallback sin LISTEN/NOTIFY
+    invalidation_retention_seconds: int = 3600
+
+    # Detección de duplicados en create-smart (similitud de trigramas, 0-1)
+    duplicate_detection_enabled: bool = True
+    duplicate_similarity_threshold: float = 0.7
+
+    # Tareas recurrentes (ocurrencias calculadas al leer)
+    recurrence_max_occurrences: int = 1000  # por petición
+    recurrence_overdue_lookback_days: int = 7  # ocurrencias vencidas que se muestran
+    recurrence_suggest_horizon_days: int = 30
+
+    # Cabecera Idempotency-Key en POST /tasks y /tasks/create-smart
+    idempotency_enabled: bool = True
+    idempotency_ttl_seconds: int = 86400  # cuánto se guarda cada respuesta
+    idempotency_lock_seconds: float = 60  # una petición en curso más antigua se da por abandonada
+    idempotency_wait_seconds: float = 10  # espera máxima de un duplicado concurrente (luego 409)
+    idempotency_poll_interval: float = 0.05
+
+    # Resumen diario de suggest-next (app/jobs/daily_digest.py)
+    digest_top_k: int = 5  # candidatas guardadas por usuario
+    digest_batch_size: int = 50000  # filas por lote del escaneo
+    digest_max_age_hours: float = 24  # un resumen más antiguo se ignora
+
+    @field_validator("gemini_models")
+    @classmethod
+    def _models_not_empty(cls, value: str) -> str:
+        # Sin modelos en la escalera, las llamadas a Gemini no tendrían nada que probar
+        if not any(model.strip() for model in value.split(",")):
+            raise ValueError("GEMINI_MODELS debe incluir al menos un modelo")
+        return value
 
     class Config:
         env_file = ".env"
@@ -1,9 +1,14 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.schema import CreateColumn
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.services.metrics_service import instrument_engine
+from app.services.profiling_service import register_engine
 
 engine = create_engine(settings.database_url)
+instrument_engine(engine)
+register_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -18,4 +23,48 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# ==========================================
+# COLUMNAS NUEVAS EN TABLAS EXISTENTES
+# ==========================================
+# create_all crea las tablas que faltan, pero no altera las que ya existen.
+# Las columnas añadidas después a una tabla existente se listan aquí y
+# upgrade_schema las añade (con sus índices) al arrancar, si no están.
+
+SCHEMA_UPGRADES = {
+    "tasks": ("series_id", "occurrence_at"),
+    "cache_invalidations": ("origin",),
+}
+
+
+def _add_column_ddl(column, dialect) -> str:
+    ddl = f"ALTER TABLE {dialect.identifier_preparer.format_table(column.table)} ADD COLUMN "
+    ddl += str(CreateColumn(column).compile(dialect=dialect))
+    for foreign_key in column.foreign_keys:
+        target = foreign_key.column
+        ddl += f" REFERENCES {dialect.identifier_preparer.format_table(target.table)} ({target.name})"
+        if foreign_key.ondelete:
+            ddl += f" ON DELETE {foreign_key.ondelete}"
+    return ddl
+
+
+def upgrade_schema(bind) -> None:
+    """
+    Añade a las tablas existentes las columnas de SCHEMA_UPGRADES que les
+    falten y crea sus índices. Es idempotente: se ejecuta en cada arranque,
+    después de create_all.
+    """
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table_name, column_names in SCHEMA_UPGRADES.items():
+            if not inspector.has_table(table_name):
+                continue
+            table = Base.metadata.tables[table_name]
+            existing = {column["name"] for column in inspector.get_columns(table_name)}
+            for name in column_names:
+                if name not in existing:
+                    conn.execute(text(_add_column_ddl(table.c[name], bind.dialect)))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
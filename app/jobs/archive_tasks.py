@@ -0,0 +1,140 @@
+"""
+Job de archivado: mueve a `tasks_archive` las tareas completadas o
+canceladas hace más de N días, en lotes pequeños.
+
+Uso:
+    python -m app.jobs.archive_tasks --days 30 --batch-size 1000
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models.models import Task, TaskArchive, TaskStatus
+from app.services.cache_service import publish_task_change
+from app.services.events_service import TASKS_CHANGED, publish_task_event
+
+logger = logging.getLogger(__name__)
+
+ARCHIVABLE_STATUSES = (TaskStatus.COMPLETED, TaskStatus.CANCELLED)
+
+# Columnas que se copian tal cual de tasks a tasks_archive
+ARCHIVED_COLUMNS = (
+    "id", "user_id", "titulo", "descripcion", "estado", "prioridad", "fecha_limite",
+    "original_input", "created_by_ai", "created_at", "updated_at", "completed_at",
+    "series_id", "occurrence_at",
+)
+
+
+def archive_batch(db: Session, cutoff: datetime, batch_size: int) -> int:
+    """
+    Archiva un lote de tareas en una transacción corta.
+
+    Selecciona hasta `batch_size` ids (saltándose las filas bloqueadas por
+    otras transacciones en PostgreSQL), los copia a tasks_archive y los
+    borra de tasks.
+
+    Las tareas cuyo id ya está en tasks_archive se quedan en tasks: en
+    tablas SQLite creadas sin AUTOINCREMENT, una tarea nueva puede
+    reutilizar el id de una ya archivada.
+
+    Returns:
+        Número de tareas archivadas en el lote
+    """
+    # Las canceladas no tienen completed_at: se usa su última actualización
+    finished_at = func.coalesce(Task.completed_at, Task.updated_at)
+
+    rows = db.execute(
+        select(Task.id, Task.user_id)
+        .where(
+            Task.estado.in_(ARCHIVABLE_STATUSES),
+            finished_at < cutoff,
+            ~select(TaskArchive.id).where(TaskArchive.id == Task.id).exists()
+        )
+        .order_by(Task.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    ids = [row.id for row in rows]
+
+    if not ids:
+        db.rollback()
+        return 0
+
+    db.execute(
+        insert(TaskArchive).from_select(
+            ARCHIVED_COLUMNS,
+            select(*(getattr(Task, column) for column in ARCHIVED_COLUMNS)).where(Task.id.in_(ids))
+        )
+    )
+    db.execute(delete(Task).where(Task.id.in_(ids)))
+    for user_id in {row.user_id for row in rows}:
+        publish_task_change(db, user_id)
+        publish_task_event(db, user_id, TASKS_CHANGED)
+    db.commit()
+
+    return len(ids)
+
+
+def archive_tasks(
+    db: Session,
+    older_than_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    pause_seconds: float = 0.0,
+    now: Optional[datetime] = None
+) -> int:
+    """
+    Archiva todas las tareas terminadas antes del corte, lote a lote.
+
+    Args:
+        db: Sesión de BD
+        older_than_days: Días desde que se completó/canceló (por defecto, settings.archive_after_days)
+        batch_size: Tareas por lote (por defecto, settings.archive_batch_size)
+        pause_seconds: Pausa entre lotes para no competir con el tráfico
+        now: Instante de referencia (UTC)
+
+    Returns:
+        Total de tareas archivadas
+    """
+    if older_than_days is None:
+        older_than_days = settings.archive_after_days
+    if batch_size is None:
+        batch_size = settings.archive_batch_size
+
+    cutoff = (now or datetime.utcnow()) - timedelta(days=older_than_days)
+
+    total = 0
+    while True:
+        archived = archive_batch(db, cutoff, batch_size)
+        total += archived
+        if archived:
+            logger.info("Archivadas %d tareas (total %d)", archived, total)
+        if archived < batch_size:
+            return total
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archiva tareas completadas o canceladas")
+    parser.add_argument("--days", type=int, default=settings.archive_after_days)
+    parser.add_argument("--batch-size", type=int, default=settings.archive_batch_size)
+    parser.add_argument("--pause", type=float, default=0.1, help="Segundos entre lotes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    db = SessionLocal()
+    try:
+        total = archive_tasks(db, args.days, args.batch_size, args.pause)
+    finally:
+        db.close()
+    logger.info("Archivado terminado: %d tareas", total)
+
+
+if __name__ == "__main__":
+    main()
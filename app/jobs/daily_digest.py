@@ -0,0 +1,134 @@
+"""
+Job del resumen diario: calcula de una vez las mejores tareas de todos los
+usuarios para que suggest-next no tenga que consultar todas sus tareas ni
+llamar a Gemini.
+
+Las tareas activas se leen en un único escaneo ordenado por usuario (con
+cursor de servidor, en lotes), se puntúan con NumPy y de cada usuario se
+guardan las settings.digest_top_k mejores en `task_digests`.
+
+Uso:
+    python -m app.jobs.daily_digest --top-k 5 --batch-size 50000
+"""
+import argparse
+import logging
+import time
+from typing import Optional
+import numpy as np
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal
+from app.models.models import ACTIVE_STATUSES, Task, TaskDigest
+from app.services.digest_service import scan_columns, score_rows, top_k_per_user
+
+logger = logging.getLogger(__name__)
+
+
+def _top_rows(user_ids: np.ndarray, task_ids: np.ndarray, scores: np.ndarray, k: int) -> list[dict]:
+    chosen, rank = top_k_per_user(user_ids, task_ids, scores, k)
+    return [
+        {"user_id": user_id, "rank": position, "task_id": task_id, "score": score}
+        for user_id, position, task_id, score in zip(
+            user_ids[chosen].tolist(), rank.tolist(), task_ids[chosen].tolist(), scores[chosen].tolist()
+        )
+    ]
+
+
+def build_digests(
+    db: Session,
+    top_k: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    now: Optional[float] = None
+) -> dict:
+    """
+    Recalcula los resúmenes de todos los usuarios y reemplaza los anteriores.
+
+    Cada lote del escaneo se puntúa entero; las tareas del último usuario
+    del lote pueden seguir en el siguiente, así que sus mejores pasan a él
+    sin decidirse. La tabla se reemplaza en una sola transacción al final.
+
+    Args:
+        db: Sesión de BD
+        top_k: Candidatas por usuario (por defecto, settings.digest_top_k)
+        batch_size: Filas por lote (por defecto, settings.digest_batch_size)
+        now: Instante de referencia en segundos epoch (por defecto, time.time())
+
+    Returns:
+        {"tareas": puntuadas, "usuarios": con resumen}
+    """
+    if top_k is None:
+        top_k = settings.digest_top_k
+    if batch_size is None:
+        batch_size = settings.digest_batch_size
+    if now is None:
+        now = time.time()
+
+    # Reloj de la BD, el mismo que updated_at: los cambios posteriores al
+    # inicio del escaneo invalidan el resumen del usuario
+    generated_at = db.scalar(select(func.now()))
+
+    # Core (sin la capa ORM): las filas van directas a NumPy
+    result = db.connection().execute(
+        select(*scan_columns(db.get_bind().dialect.name))
+        .where(Task.estado.in_(ACTIVE_STATUSES))
+        .order_by(Task.user_id)
+        .execution_options(yield_per=batch_size)
+    )
+
+    digests = []
+    scored = 0
+    carry = None
+    for rows in result.partitions():
+        user_ids, task_ids, scores = score_rows(rows, now)
+        scored += len(rows)
+        if carry is not None:
+            user_ids = np.concatenate((carry[0], user_ids))
+            task_ids = np.concatenate((carry[1], task_ids))
+            scores = np.concatenate((carry[2], scores))
+
+        # El último usuario del lote puede continuar en el siguiente: pasan
+        # sólo sus k mejores, así la memoria no crece con usuarios enormes
+        pending = user_ids == user_ids[-1]
+        best, _ = top_k_per_user(user_ids[pending], task_ids[pending], scores[pending], top_k)
+        carry = (user_ids[pending][best], task_ids[pending][best], scores[pending][best])
+        done = ~pending
+        if done.any():
+            digests += _top_rows(user_ids[done], task_ids[done], scores[done], top_k)
+    if carry is not None:
+        digests += _top_rows(*carry, top_k)
+    result.close()
+
+    for row in digests:
+        row["generated_at"] = generated_at
+
+    db.execute(delete(TaskDigest))
+    if digests:
+        db.execute(insert(TaskDigest), digests)
+    db.commit()
+
+    return {"tareas": scored, "usuarios": len({row["user_id"] for row in digests})}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calcula el resumen diario de suggest-next")
+    parser.add_argument("--top-k", type=int, default=settings.digest_top_k)
+    parser.add_argument("--batch-size", type=int, default=settings.digest_batch_size)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        summary = build_digests(db, args.top_k, args.batch_size)
+    finally:
+        db.close()
+    logger.info(
+        "Resumen diario: %d tareas de %d usuarios en %.2f s",
+        summary["tareas"], summary["usuarios"], time.perf_counter() - start
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Escáner de fechas límite: recorre las tareas activas de todos los usuarios
+en orden de vencimiento para enviar recordatorios.
+
+Usa un cursor por clave (fecha_limite, id) sobre el índice parcial
+idx_tasks_fecha_limite_id_activas: cada lote es un range scan que empieza
+donde terminó el anterior, sin OFFSET ni recorridos de la tabla completa.
+
+Uso:
+    python -m app.jobs.deadline_scanner --lead 60 --interval 300
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Iterator
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.models import Task, ACTIVE_STATUSES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def scan_deadlines(db: Session, desde: datetime, hasta: datetime, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[tuple]:
+    """
+    Devuelve las tareas activas con fecha límite en [desde, hasta), en orden
+    (fecha_limite, id), consultando la BD por lotes.
+
+    Args:
+        db: Sesión de BD
+        desde: Inicio de la ventana (incluido)
+        hasta: Fin de la ventana (excluido)
+        batch_size: Filas por consulta
+
+    Yields:
+        Filas (id, user_id, titulo, fecha_limite)
+    """
+    base = (
+        select(Task.id, Task.user_id, Task.titulo, Task.fecha_limite)
+        .where(
+            Task.estado.in_(ACTIVE_STATUSES),
+            Task.fecha_limite < hasta
+        )
+        .order_by(Task.fecha_limite, Task.id)
+        .limit(batch_size)
+    )
+
+    query = base.where(Task.fecha_limite >= desde)
+    while True:
+        rows = db.execute(query).all()
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        last = rows[-1]
+        # Siguiente lote: estrictamente después de la última clave vista
+        query = base.where(tuple_(Task.fecha_limite, Task.id) > (last.fecha_limite, last.id))
+
+
+def notify_reminder(row) -> None:
+    """Punto de envío del recordatorio (de momento, sólo se registra)"""
+    logger.info(
+        "Recordatorio: tarea %d de usuario %d (%r) vence %s",
+        row.id, row.user_id, row.titulo, row.fecha_limite.isoformat()
+    )
+
+
+def run_once(db: Session, desde: datetime, hasta: datetime, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """
+    Envía los recordatorios de la ventana [desde, hasta).
+
+    Returns:
+        Número de recordatorios enviados
+    """
+    total = 0
+    for row in scan_deadlines(db, desde, hasta, batch_size):
+        notify_reminder(row)
+        total += 1
+    db.rollback()  # no deja la transacción de lectura abierta entre pasadas
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recordatorios de tareas que vencen pronto")
+    parser.add_argument("--lead", type=int, default=60, help="Minutos de antelación del recordatorio")
+    parser.add_argument("--interval", type=int, default=300, help="Segundos entre pasadas")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--once", action="store_true", help="Una sola pasada y salir")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    lead = timedelta(minutes=args.lead)
+    # La primera pasada cubre todo lo que vence dentro de la antelación; las
+    # siguientes, sólo lo que ha entrado en la ventana desde la anterior, así
+    # cada tarea se avisa una sola vez
+    desde = datetime.now()
+
+    db = SessionLocal()
+    try:
+        while True:
+            hasta = datetime.now() + lead
+            sent = run_once(db, desde, hasta, args.batch_size)
+            logger.info("Pasada terminada: %d recordatorios hasta %s", sent, hasta.isoformat())
+            if args.once:
+                return
+            desde = hasta
+            time.sleep(args.interval)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,48 @@
-from fastapi import FastAPI
-from app.database import Base, engine
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from app.database import Base, engine, upgrade_schema
 from app.models import models
-from app.api import auth, tasks
+from app.api import auth, tasks, series, ws, debug
+from app.middleware import MetricsMiddleware, ProfilingMiddleware
+from app.services.metrics_service import registry, CONTENT_TYPE_LATEST
+from app.services.cache_service import InvalidationListener
+from app.services.auth_service import configure_bcrypt
 
 Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sin gunicorn (p. ej. uvicorn en desarrollo); con él ya lo hizo el master
+    configure_bcrypt()
+    # Cada worker escucha las invalidaciones de caché de los demás
+    listener = InvalidationListener(engine).start()
+    yield
+    listener.stop()
+
 
 app = FastAPI(
     title="TaskMaster AI",
     description="Sistema de gestión de tareas con asistente IA",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# ==========================================
+# MIDDLEWARE
+# ==========================================
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 # ==========================================
 # REGISTRAR ROUTERS
 # ==========================================
 app.include_router(auth.router)
 app.include_router(tasks.router)
+app.include_router(series.router)
+app.include_router(ws.router)
+app.include_router(debug.router)
 
 
 @app.get("/")
@@ -28,4 +55,9 @@ def root():
 
 @app.get("/health")
 def health():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Métricas del proceso en formato Prometheus"""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE_LATEST)
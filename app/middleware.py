@@ -0,0 +1,110 @@
+import time
+from app.config import settings
+from app.services.profiling_service import RequestProfile, is_authorized
+from app.services.metrics_service import (
+    RequestStats,
+    current_request_stats,
+    http_requests_total,
+    http_request_duration_seconds,
+    http_request_db_queries,
+    http_request_db_seconds,
+)
+
+# ==========================================
+# MIDDLEWARE: MÉTRICAS POR ENDPOINT
+# ==========================================
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mide la latencia de cada petición y las consultas
+    SQL que ejecuta, etiquetando por la plantilla de ruta (/tasks/{task_id})
+    y no por la URL concreta, para no disparar la cardinalidad.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request_stats.reset(token)
+
+            # FastAPI deja la ruta resuelta en el scope tras el routing
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+
+            http_requests_total.inc(method=method, route=route_path, status=str(status_code))
+            http_request_duration_seconds.observe(elapsed, method=method, route=route_path)
+            http_request_db_queries.observe(stats.db_queries, method=method, route=route_path)
+            http_request_db_seconds.observe(stats.db_seconds, method=method, route=route_path)
+
+
+# ==========================================
+# MIDDLEWARE: PROFILING BAJO DEMANDA
+# ==========================================
+
+PROFILE_HEADER = b"x-profile-token"
+
+
+class ProfilingMiddleware:
+    """
+    Perfila una petición concreta cuando trae el token de administrador en
+    la cabecera X-Profile-Token. Sólo se acepta en cabecera: en la URL
+    acabaría en logs de acceso, proxies e historial.
+
+    La respuesta incluye X-Profile-Id; el informe se consulta en
+    GET /debug/profiles/{id}.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.profiling_token:
+            await self.app(scope, receive, send)
+            return
+
+        token = self._get_token(scope)
+        if token is None or not is_authorized(token):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile.id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profile.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.stop()
+
+    @staticmethod
+    def _get_token(scope):
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return value.decode("latin-1")
+        return None
@@ -6,8 +6,10 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     Enum,
+    Float,
     ForeignKey,
-    Index
+    Index,
+    LargeBinary
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -36,6 +38,14 @@ class TaskPriority(str, enum.Enum):
     URGENT = "urgent"
 
 
+class RecurrenceFrequency(str, enum.Enum):
+    """Frecuencias de una serie de tareas recurrentes"""
+
+    DAILY = "daily"
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
+
+
 # ==========================================
 # MODELO: User
 # ==========================================
@@ -74,10 +84,166 @@ class Task(Base):
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
     completed_at = Column(DateTime(timezone=True), nullable=True)
+    # Ocurrencia materializada de una serie recurrente (modificada o completada)
+    series_id = Column(Integer, ForeignKey("task_series.id", ondelete="SET NULL"), nullable=True)
+    occurrence_at = Column(DateTime, nullable=True)
 
     __table_args__ = (
         Index("idx_tasks_user_estado", "user_id", "estado"),
         Index("idx_tasks_fecha_limite", "fecha_limite"),
+        Index("idx_tasks_series_occurrence", "series_id", "occurrence_at", unique=True),
+        # AUTOINCREMENT: en SQLite, sin él, los ids de las tareas borradas o
+        # archivadas se reutilizan y chocan con los de tasks_archive
+        {"sqlite_autoincrement": True},
     )
 
     owner = relationship("User", back_populates="tasks")
+
+
+# Estados en los que una tarea sigue viva (cuenta para vencimientos)
+ACTIVE_STATUSES = (TaskStatus.PENDING, TaskStatus.IN_PROGRESS)
+
+# Índices parciales sobre tareas activas para las vistas de vencimientos:
+# - por usuario: GET /tasks/due y GET /tasks/overdue (range scan)
+# - global: el escáner de vencimientos recorre todos los usuarios en orden
+Index(
+    "idx_tasks_user_fecha_limite_activas",
+    Task.user_id,
+    Task.fecha_limite,
+    postgresql_where=Task.estado.in_(ACTIVE_STATUSES),
+    sqlite_where=Task.estado.in_(ACTIVE_STATUSES),
+)
+Index(
+    "idx_tasks_fecha_limite_id_activas",
+    Task.fecha_limite,
+    Task.id,
+    postgresql_where=Task.estado.in_(ACTIVE_STATUSES),
+    sqlite_where=Task.estado.in_(ACTIVE_STATUSES),
+)
+
+
+# ==========================================
+# MODELO: TaskSeries
+# ==========================================
+class TaskSeries(Base):
+    """
+    Tarea recurrente: una fila por serie con la regla de repetición. Las
+    ocurrencias se calculan al leer (app/services/recurrence_service.py);
+    sólo se guardan en `tasks` las que el usuario modifica o completa.
+    """
+
+    __tablename__ = "task_series"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    titulo = Column(String(200), nullable=False)
+    descripcion = Column(Text, nullable=True)
+    prioridad = Column(Enum(TaskPriority), default=TaskPriority.MEDIUM)
+    frecuencia = Column(Enum(RecurrenceFrequency), nullable=False)
+    intervalo = Column(Integer, nullable=False, default=1)  # cada N días/semanas/meses
+    dias_semana = Column(String(20), nullable=True)  # semanal: "0,2,4" (0 = lunes)
+    inicio = Column(DateTime, nullable=False)  # primera ocurrencia (fecha y hora)
+    fin = Column(DateTime, nullable=True)  # sin ocurrencias después de esta fecha
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+# ==========================================
+# MODELO: TaskArchive
+# ==========================================
+class TaskArchive(Base):
+    """
+    Tareas completadas o canceladas hace tiempo, movidas fuera de `tasks`
+    por el job de archivado (app/jobs/archive_tasks.py). Conserva el id
+    original de la tarea.
+    """
+
+    __tablename__ = "tasks_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    titulo = Column(String(200), nullable=False)
+    descripcion = Column(Text, nullable=True)
+    estado = Column(Enum(TaskStatus), nullable=False)
+    prioridad = Column(Enum(TaskPriority), nullable=False)
+    fecha_limite = Column(DateTime, nullable=True)
+    original_input = Column(Text, nullable=True)
+    created_by_ai = Column(Boolean, default=False)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    series_id = Column(Integer, nullable=True)
+    occurrence_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("idx_tasks_archive_user_fecha_limite", "user_id", "fecha_limite"),
+    )
+
+
+# ==========================================
+# MODELO: RateLimitBucket
+# ==========================================
+class RateLimitBucket(Base):
+    """Estado de un token bucket compartido entre workers (backend "database")"""
+
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String(200), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)  # epoch en segundos
+
+
+class CacheInvalidation(Base):
+    """
+    Eventos de invalidación de caché para bases de datos sin LISTEN/NOTIFY
+    (SQLite): cada worker sondea las filas con id mayor que la última vista.
+    """
+
+    __tablename__ = "cache_invalidations"
+    # AUTOINCREMENT: los ids no se reutilizan al purgar eventos antiguos
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    origin = Column(String(100), nullable=False, default="", server_default="")  # host:pid que lo publicó
+    namespace = Column(String(50), nullable=False)
+    key = Column(String(255), nullable=False)
+    created_at = Column(Float, nullable=False, index=True)  # epoch en segundos
+
+
+class IdempotencyKey(Base):
+    """
+    Respuesta guardada de un POST con cabecera Idempotency-Key. Mientras la
+    primera petición está en curso, status_code es NULL y expires_at marca
+    cuándo se da por abandonada; al terminar, cuándo caduca la respuesta.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, primary_key=True)
+    key = Column(String(255), primary_key=True)
+    endpoint = Column(String(100), nullable=False)  # "POST /tasks/"
+    request_hash = Column(String(64), nullable=False)  # sha256 del cuerpo
+    status_code = Column(Integer, nullable=True)
+    body = Column(LargeBinary, nullable=True)  # JSON de la respuesta
+    created_at = Column(Float, nullable=False)  # epoch en segundos
+    expires_at = Column(Float, nullable=False, index=True)
+
+
+class TaskDigest(Base):
+    """
+    Candidatas del resumen diario de "qué hacer ahora": las mejores tareas
+    activas de cada usuario según el job app/jobs/daily_digest.py, que
+    reemplaza la tabla entera en cada ejecución. suggest-next las usa
+    mientras ninguna tarea del usuario haya cambiado desde generated_at.
+    """
+
+    __tablename__ = "task_digests"
+
+    user_id = Column(Integer, primary_key=True)
+    rank = Column(Integer, primary_key=True)  # 0 = la mejor
+    task_id = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+    generated_at = Column(DateTime(timezone=True), nullable=False)  # inicio del escaneo (reloj de la BD)
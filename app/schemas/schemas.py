@@ -1,7 +1,7 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
 from datetime import datetime
 from typing import Optional
-from app.models.models import TaskStatus, TaskPriority
+from app.models.models import TaskStatus, TaskPriority, RecurrenceFrequency
 
 # ==========================================
 # USER SCHEMAS
@@ -58,6 +58,49 @@ class TaskUpdate(BaseModel):
     fecha_limite: Optional[datetime] = None
     completed_at: Optional[datetime] = None
 
+class TaskBulkFilter(BaseModel):
+    """Criterios para seleccionar tareas en una actualización masiva"""
+    estado: Optional[TaskStatus] = None
+    prioridad: Optional[TaskPriority] = None
+    fecha_limite_desde: Optional[datetime] = None
+    fecha_limite_hasta: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def check_not_empty(self):
+        # Un filtro vacío seleccionaría todas las tareas del usuario
+        if all(value is None for value in self.model_dump().values()):
+            raise ValueError("El filtro necesita al menos un criterio")
+        return self
+
+class TaskBulkUpdate(BaseModel):
+    """Schema para actualizar muchas tareas a la vez (por IDs o por filtro)"""
+    ids: Optional[list[int]] = Field(None, min_length=1, max_length=10000)
+    filtro: Optional[TaskBulkFilter] = None
+    cambios: TaskUpdate
+
+    @model_validator(mode="after")
+    def check_selector(self):
+        if (self.ids is None) == (self.filtro is None):
+            raise ValueError("Indica 'ids' o 'filtro' (uno de los dos)")
+        return self
+
+class TaskImportError(BaseModel):
+    """Registro rechazado en una importación"""
+    fila: int
+    errores: list[str]
+
+class TaskImportResult(BaseModel):
+    """Schema para devolver el resultado de una importación"""
+    procesadas: int
+    importadas: int
+    con_errores: int
+    errores: list[TaskImportError]
+
+class TaskBulkResult(BaseModel):
+    """Schema para devolver el resultado de una actualización masiva"""
+    ids: list[int]
+    total: int
+
 class TaskResponse(TaskBase):
     """Schema para devolver tarea"""
     id: int
@@ -67,6 +110,67 @@ class TaskResponse(TaskBase):
     created_at: datetime
     updated_at: datetime
     completed_at: Optional[datetime] = None
+    series_id: Optional[int] = None
+    occurrence_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class TaskOccurrenceResponse(TaskResponse):
+    """
+    Schema para los listados que incluyen ocurrencias de series recurrentes.
+
+    Las ocurrencias virtuales (aún no guardadas) tienen id = None; se
+    identifican por series_id + occurrence_at.
+    """
+    id: Optional[int] = None
+
+# ==========================================
+# RECURRING TASK SCHEMAS
+# ==========================================
+
+class TaskSeriesCreate(BaseModel):
+    """Schema para crear una serie de tareas recurrentes"""
+    titulo: str = Field(..., min_length=1, max_length=200)
+    descripcion: Optional[str] = Field(None, max_length=1000)
+    prioridad: TaskPriority = TaskPriority.MEDIUM
+    frecuencia: RecurrenceFrequency
+    intervalo: int = Field(1, ge=1, le=365)
+    dias_semana: Optional[list[int]] = Field(None, min_length=1, max_length=7)
+    inicio: datetime
+    fin: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def check_rule(self):
+        if self.dias_semana is not None:
+            if self.frecuencia != RecurrenceFrequency.WEEKLY:
+                raise ValueError("'dias_semana' sólo aplica a series semanales")
+            if any(d < 0 or d > 6 for d in self.dias_semana):
+                raise ValueError("'dias_semana' va de 0 (lunes) a 6 (domingo)")
+        if self.fin is not None and self.fin < self.inicio:
+            raise ValueError("'fin' no puede ser anterior a 'inicio'")
+        return self
+
+class TaskSeriesResponse(BaseModel):
+    """Schema para devolver una serie"""
+    id: int
+    user_id: int
+    titulo: str
+    descripcion: Optional[str] = None
+    prioridad: TaskPriority
+    frecuencia: RecurrenceFrequency
+    intervalo: int
+    dias_semana: Optional[list[int]] = None
+    inicio: datetime
+    fin: Optional[datetime] = None
+    created_at: datetime
+
+    @field_validator("dias_semana", mode="before")
+    @classmethod
+    def parse_dias_semana(cls, value):
+        if isinstance(value, str):
+            return [int(d) for d in value.split(",") if d]
+        return value
     
     class Config:
         from_attributes = True
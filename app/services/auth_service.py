@@ -1,15 +1,114 @@
+import logging
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from passlib.hash import bcrypt
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# CALIBRACIÓN DEL COSTE DE BCRYPT
+# ==========================================
+# Cada ronda de bcrypt duplica el tiempo de un hash. En lugar de un coste
+# fijo, se elige al arrancar el servidor el que hace que un hash tarde como
+# mucho settings.bcrypt_target_ms en esta máquina (en el master de gunicorn,
+# on_starting; sin gunicorn, en el lifespan de la app). Al importar el
+# módulo no se mide nada: los jobs y los tests usan el coste mínimo.
+#
+# El coste calibrado es un suelo: sólo se rehacen en el login los hashes
+# con menos rondas. La medida tiene ruido y otra máquina o reinicio puede
+# calibrar una ronda más o menos; los hashes sólo suben de coste y no van
+# y vienen entre procesos.
+
+def _hash_seconds(rounds: int, samples: int = 3) -> float:
+    """Mejor tiempo (en segundos) de un hash con `rounds` rondas"""
+    handler = bcrypt.using(rounds=rounds)
+    best = float("inf")
+    for _ in range(samples):
+        start = time.perf_counter()
+        handler.hash("calibration-password")
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def calibrate_bcrypt_rounds(
+    target_ms: float,
+    min_rounds: int,
+    max_rounds: int,
+    measure: Callable[[int], float] = _hash_seconds
+) -> int:
+    """
+    Rondas de bcrypt con las que un hash tarda como mucho `target_ms`.
+
+    Mide el coste mínimo y extrapola (cada ronda duplica el tiempo), así
+    que nunca se ejecuta un hash más caro que el objetivo.
+
+    Args:
+        target_ms: Latencia objetivo de un hash
+        min_rounds: Coste mínimo aceptable (aunque supere el objetivo)
+        max_rounds: Coste máximo
+        measure: Tiempo en segundos de un hash con N rondas
+
+    Returns:
+        Rondas entre min_rounds y max_rounds
+    """
+    elapsed_ms = measure(min_rounds) * 1000
+    rounds = min_rounds
+    while rounds < max_rounds and elapsed_ms * 2 <= target_ms:
+        rounds += 1
+        elapsed_ms *= 2
+    return rounds
+
+
+def _context_options(rounds: int) -> dict:
+    # Banda [rounds, rounds + tolerancia]: needs_update() marca los hashes por
+    # debajo (inseguros) y los muy por encima (logins más lentos de lo calibrado)
+    return {
+        "bcrypt__default_rounds": rounds,
+        "bcrypt__min_rounds": rounds,
+        "bcrypt__max_rounds": rounds + settings.bcrypt_rounds_tolerance,
+    }
+
+
+def password_context(rounds: int) -> CryptContext:
+    """CryptContext de bcrypt con coste `rounds` (y una banda de tolerancia por encima)"""
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", **_context_options(rounds))
+
 # ==========================================
 # CONFIGURACIÓN
 # ==========================================
 
+# Coste actual: el fijado en settings o, hasta calibrar, el mínimo
+bcrypt_rounds = settings.bcrypt_rounds or settings.bcrypt_min_rounds
+_bcrypt_configured = settings.bcrypt_rounds is not None
+
 # CryptContext gestiona el hashing de passwords con bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = password_context(bcrypt_rounds)
+
+
+def configure_bcrypt() -> int:
+    """
+    Calibra el coste de bcrypt (salvo que settings.bcrypt_rounds lo fije)
+    y lo aplica a pwd_context. Sólo mide la primera vez en cada proceso:
+    los workers de gunicorn heredan el valor del master.
+
+    Returns:
+        Rondas de bcrypt en uso
+    """
+    global bcrypt_rounds, _bcrypt_configured
+    if _bcrypt_configured:
+        return bcrypt_rounds
+
+    bcrypt_rounds = calibrate_bcrypt_rounds(
+        settings.bcrypt_target_ms, settings.bcrypt_min_rounds, settings.bcrypt_max_rounds
+    )
+    pwd_context.update(**_context_options(bcrypt_rounds))
+    _bcrypt_configured = True
+    logger.info("Coste de bcrypt calibrado: %s rondas (objetivo %s ms)", bcrypt_rounds, settings.bcrypt_target_ms)
+    return bcrypt_rounds
 
 # ==========================================
 # FUNCIONES DE PASSWORD
@@ -30,6 +129,24 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_rehash(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """
+    Verifica el password y, si su hash está fuera del coste actual, lo rehace.
+
+    Returns:
+        (coincide, nuevo hash o None si el guardado sigue valiendo)
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Indica si un hash se generó con un coste fuera de la banda actual (u otro
+    esquema) y debe rehacerse la próxima vez que se conozca el password.
+    """
+    return pwd_context.needs_update(hashed_password)
+
+
 # ==========================================
 # FUNCIONES DE JWT
 # ==========================================
@@ -0,0 +1,276 @@
+from collections import OrderedDict
+from typing import Any, Optional
+import logging
+import os
+import socket
+import threading
+import time
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.models import CacheInvalidation
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# CACHÉS EN PROCESO
+# ==========================================
+# Cada caché pertenece a un namespace ("users", "suggestions"...). Las
+# mutaciones publican eventos (namespace, key) en el bus de invalidación y
+# todos los workers borran esa entrada de sus cachés, así los TTL pueden
+# ser largos sin servir datos obsoletos escritos por otro proceso.
+
+# Clave comodín: vacía todo el namespace
+ALL_KEYS = "*"
+
+
+class TTLCache:
+    """Caché LRU con expiración por entrada, segura entre threads"""
+
+    def __init__(self, namespace: str, ttl_seconds: float, max_entries: int, clock=time.monotonic):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[Any]:
+        if not settings.cache_enabled:
+            return None
+        key = str(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < self.clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value) -> None:
+        if not settings.cache_enabled:
+            return
+        key = str(key)
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key) -> None:
+        key = str(key)
+        with self._lock:
+            if key == ALL_KEYS:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Suscriptores por namespace: cualquier objeto con invalidate(key) y clear()
+_caches: dict[str, list] = {}
+
+
+def subscribe(namespace: str, cache) -> None:
+    """Suscribe una caché a los eventos de invalidación de su namespace"""
+    _caches.setdefault(namespace, []).append(cache)
+
+
+def create_cache(namespace: str, ttl_seconds: float, max_entries: Optional[int] = None) -> TTLCache:
+    """Crea una caché y la suscribe a los eventos de su namespace"""
+    cache = TTLCache(namespace, ttl_seconds, max_entries or settings.cache_max_entries)
+    subscribe(namespace, cache)
+    return cache
+
+
+def evict(namespace: str, key) -> None:
+    """Aplica un evento de invalidación a las cachés locales"""
+    for cache in _caches.get(namespace, ()):
+        cache.invalidate(key)
+
+
+def clear_all() -> None:
+    """Vacía todas las cachés (p. ej. si se han podido perder eventos)"""
+    for caches in _caches.values():
+        for cache in caches:
+            cache.clear()
+
+
+# Cachés de la aplicación
+user_cache = create_cache("users", settings.cache_user_ttl_seconds)               # email -> User
+suggestion_cache = create_cache("suggestions", settings.cache_suggestion_ttl_seconds)  # user_id -> respuesta
+
+# ==========================================
+# PUBLICACIÓN DE EVENTOS
+# ==========================================
+
+def process_origin() -> str:
+    """
+    Identifica al proceso que publica un evento, para que su listener lo
+    ignore. Se calcula en cada llamada: con preload, los workers se crean
+    con fork después de importar este módulo.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# Formato de los eventos: "origen|namespace:clave" (en NOTIFY) o la
+# columna origin (en cache_invalidations). Los eventos sin origen (del
+# formato anterior, "namespace:clave") se aplican siempre. Un worker con
+# el formato anterior no entiende los nuevos: todos los workers deben
+# actualizarse a la vez.
+
+def _encode(origin: str, namespace: str, key) -> str:
+    return f"{origin}|{namespace}:{key}"
+
+
+def _decode(payload: str) -> tuple[str, str, str]:
+    origin, _, event = payload.rpartition("|")
+    namespace, _, key = event.partition(":")
+    return origin, namespace, key
+
+
+def publish(db: Session, namespace: str, key, evict_local: bool = True) -> None:
+    """
+    Publica una invalidación dentro de la transacción de `db`.
+
+    Sólo se entrega si la transacción hace commit: en PostgreSQL con
+    pg_notify (NOTIFY es transaccional); en otras BD, insertando el evento
+    en cache_invalidations. Las cachés del propio proceso se invalidan
+    justo después del commit, y su listener ignora el evento.
+
+    Args:
+        db: Sesión de la mutación
+        namespace: Caché afectada ("users", "suggestions"...)
+        key: Entrada afectada (o ALL_KEYS)
+        evict_local: False si el proceso actualiza su caché por su cuenta
+    """
+    origin = process_origin()
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_notify(settings.invalidation_channel, _encode(origin, namespace, key))))
+    else:
+        db.execute(insert(CacheInvalidation).values(
+            origin=origin, namespace=namespace, key=str(key), created_at=time.time()
+        ))
+    if evict_local:
+        db.info.setdefault("cache_invalidations", []).append((namespace, key))
+
+
+def publish_task_change(db: Session, user_id: int) -> None:
+    """
+    Invalida lo que depende de las tareas de un usuario. El índice de
+    similitud local se actualiza de forma incremental desde el endpoint;
+    el de los demás workers se descarta y se reconstruye al usarse.
+    """
+    publish(db, "suggestions", user_id)
+    publish(db, "similarity", user_id, evict_local=False)
+
+
+@event.listens_for(Session, "after_commit")
+def _evict_after_commit(session):
+    for namespace, key in session.info.pop("cache_invalidations", ()):
+        evict(namespace, key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("cache_invalidations", None)
+
+
+# ==========================================
+# LISTENER (UNO POR WORKER)
+# ==========================================
+
+class InvalidationListener:
+    """
+    Thread en segundo plano que recibe las invalidaciones de otros workers.
+
+    - PostgreSQL: LISTEN sobre una conexión dedicada fuera del pool.
+    - Resto: sondea cache_invalidations cada invalidation_poll_interval
+      segundos y purga los eventos más antiguos que la retención.
+
+    Si se pierde la conexión se vacían todas las cachés, porque los eventos
+    emitidos mientras tanto no se recibirán.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "InvalidationListener":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="cache-invalidation", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        listen = self._listen_postgres if self.engine.dialect.name == "postgresql" else self._poll_table
+        while not self._stop.is_set():
+            try:
+                listen()
+            except Exception:
+                logger.exception("Listener de invalidación caído, reintentando")
+                clear_all()
+                self._stop.wait(settings.invalidation_poll_interval)
+
+    def _listen_postgres(self) -> None:
+        channel = settings.invalidation_channel
+        if not channel.isidentifier():
+            raise ValueError(f"Canal de invalidación no válido: {channel}")
+
+        raw = self.engine.raw_connection()
+        raw.detach()  # conexión propia: no vuelve al pool
+        conn = raw.driver_connection
+        try:
+            conn.autocommit = True
+            conn.execute(f"LISTEN {channel}")
+            while not self._stop.is_set():
+                for notify in conn.notifies(timeout=settings.invalidation_poll_interval):
+                    origin, namespace, key = _decode(notify.payload)
+                    if origin != process_origin():
+                        evict(namespace, key)
+        finally:
+            raw.close()
+
+    def _poll_table(self) -> None:
+        with self.engine.connect() as conn:
+            last_id = conn.execute(select(func.max(CacheInvalidation.id))).scalar() or 0
+        last_purge = time.monotonic()
+
+        while not self._stop.wait(settings.invalidation_poll_interval):
+            with self.engine.connect() as conn:
+                rows = conn.execute(
+                    select(CacheInvalidation.id, CacheInvalidation.origin,
+                           CacheInvalidation.namespace, CacheInvalidation.key)
+                    .where(CacheInvalidation.id > last_id)
+                    .order_by(CacheInvalidation.id)
+                ).all()
+            origin = process_origin()
+            for row in rows:
+                if row.origin != origin:
+                    evict(row.namespace, row.key)
+                last_id = row.id
+
+            if time.monotonic() - last_purge > settings.invalidation_retention_seconds / 10:
+                with self.engine.begin() as conn:
+                    conn.execute(
+                        delete(CacheInvalidation)
+                        .where(CacheInvalidation.created_at < time.time() - settings.invalidation_retention_seconds)
+                    )
+                last_purge = time.monotonic()
@@ -0,0 +1,209 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import time
+import numpy as np
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.models import ACTIVE_STATUSES, Task, TaskDigest, TaskPriority, TaskStatus
+
+# ==========================================
+# PUNTUACIÓN VECTORIZADA DE TAREAS
+# ==========================================
+# Cada tarea activa recibe una puntuación calculada con arrays de NumPy
+# (miles de tareas por operación, sin bucles en Python):
+#   - prioridad: urgent 1.0 ... low 0.25
+#   - cercanía de la fecha límite: 1 si ya venció, 0.5 a un día, 0 sin fecha
+#   - en curso: las empezadas van antes que las pendientes
+#   - antigüedad: las olvidadas suben poco a poco (tope a los 30 días)
+#
+# Todos los instantes son segundos epoch reales. fecha_limite se guarda
+# sin zona en hora local (el resto de la app la compara con
+# datetime.now()); las marcas de la BD (created_at, updated_at) sin zona
+# están en UTC.
+
+PRIORITY_CODES = {TaskPriority.LOW: 0, TaskPriority.MEDIUM: 1, TaskPriority.HIGH: 2, TaskPriority.URGENT: 3}
+PRIORITY_WEIGHTS = np.array([0.25, 0.5, 0.75, 1.0])
+
+WEIGHT_PRIORITY = 1.0
+WEIGHT_DEADLINE = 1.5
+WEIGHT_IN_PROGRESS = 0.3
+WEIGHT_AGE = 0.2
+AGE_CAP_DAYS = 30
+
+
+def score_tasks(
+    priority: np.ndarray,
+    in_progress: np.ndarray,
+    deadline: np.ndarray,
+    created: np.ndarray,
+    now: float
+) -> np.ndarray:
+    """
+    Puntuación de un lote de tareas (mayor = hacer antes).
+
+    Args:
+        priority: Código de prioridad (PRIORITY_CODES)
+        in_progress: 1 si la tarea está en curso, 0 si está pendiente
+        deadline: Fecha límite en segundos epoch (NaN si no tiene)
+        created: Creación en segundos epoch (NaN si se desconoce)
+        now: Instante de referencia en segundos epoch
+
+    Returns:
+        Array de puntuaciones, en el orden de la entrada
+    """
+    days_left = np.maximum(deadline - now, 0.0) / 86400
+    proximity = np.nan_to_num(1.0 / (1.0 + days_left), nan=0.0)
+    age = np.nan_to_num(np.clip((now - created) / 86400 / AGE_CAP_DAYS, 0.0, 1.0), nan=0.0)
+
+    return (
+        WEIGHT_PRIORITY * PRIORITY_WEIGHTS[priority.astype(np.intp)]
+        + WEIGHT_DEADLINE * proximity
+        + WEIGHT_IN_PROGRESS * in_progress
+        + WEIGHT_AGE * age
+    )
+
+
+def top_k_per_user(user_ids: np.ndarray, task_ids: np.ndarray, scores: np.ndarray, k: int) -> tuple:
+    """
+    Las `k` mejores tareas de cada usuario, en una sola ordenación.
+
+    Returns:
+        (índices de las filas elegidas, su posición dentro del usuario), por
+        usuario y puntuación descendente (a igual puntuación, el id menor)
+    """
+    # lexsort ordena por la última clave primero: usuario, -score, id
+    order = np.lexsort((task_ids, -scores, user_ids))
+    sorted_users = user_ids[order]
+    starts = np.flatnonzero(np.r_[True, sorted_users[1:] != sorted_users[:-1]])
+    counts = np.diff(np.r_[starts, len(order)])
+    rank = np.arange(len(order)) - np.repeat(starts, counts)
+    keep = rank < k
+    return order[keep], rank[keep]
+
+# ==========================================
+# LECTURA PARA EL ESCANEO
+# ==========================================
+# La consulta devuelve sólo números (enums como códigos y fechas como
+# epoch), para convertir cada lote en un array de NumPy de una vez. La
+# BD convierte las fechas sin zona como si fueran UTC; fecha_limite se
+# corrige después con el desfase de la hora local.
+
+def epoch_seconds(column, dialect_name: str):
+    """Expresión SQL con los segundos epoch de una columna de fecha (NULL si es NULL)"""
+    if dialect_name == "postgresql":
+        return func.extract("epoch", column)
+    # SQLite guarda las fechas como texto ISO
+    return (func.julianday(column) - 2440587.5) * 86400
+
+
+def scan_columns(dialect_name: str) -> tuple:
+    """user_id, id, prioridad, en curso, fecha límite y creación (en este orden)"""
+    return (
+        Task.user_id,
+        Task.id,
+        # Comparaciones con la columna (no case(value=...)): así los enums se
+        # envían como se guardan, por nombre
+        case(*((Task.prioridad == priority, code) for priority, code in PRIORITY_CODES.items()), else_=1),
+        case((Task.estado == TaskStatus.IN_PROGRESS, 1), else_=0),
+        epoch_seconds(Task.fecha_limite, dialect_name),
+        epoch_seconds(Task.created_at, dialect_name),
+    )
+
+
+def local_utc_offset(now: float) -> float:
+    """Desfase (segundos) de la hora local respecto a UTC en el instante `now`"""
+    return datetime.fromtimestamp(now).astimezone().utcoffset().total_seconds()
+
+
+def score_rows(rows: list, now: float) -> tuple:
+    """
+    Puntúa filas de scan_columns().
+
+    Las fechas límite se pasan de hora local a epoch con el desfase de
+    `now` (las que caen al otro lado de un cambio de hora quedan a 1 h).
+
+    Returns:
+        (user_ids, task_ids, scores) como arrays
+    """
+    # Como tuplas: con objetos Row, NumPy busca en cada uno atributos del
+    # protocolo de arrays, y cada búsqueda fallida es cara
+    data = np.array([tuple(row) for row in rows], dtype=np.float64).reshape(-1, 6)
+    user_ids = data[:, 0].astype(np.int64)
+    task_ids = data[:, 1].astype(np.int64)
+    deadline = data[:, 4] - local_utc_offset(now)
+    scores = score_tasks(data[:, 2], data[:, 3], deadline, data[:, 5], now)
+    return user_ids, task_ids, scores
+
+# ==========================================
+# USO DESDE SUGGEST-NEXT
+# ==========================================
+
+def _epoch(value: Optional[datetime], naive_tz: Optional[timezone] = None) -> float:
+    """
+    Segundos epoch de una fecha (NaN si es None). Las fechas sin zona se
+    leen en `naive_tz`, o en hora local si no se indica.
+    """
+    if value is None:
+        return np.nan
+    if value.tzinfo is None and naive_tz is not None:
+        value = value.replace(tzinfo=naive_tz)
+    return value.timestamp()
+
+
+def score_task_dicts(tasks: list, now: Optional[datetime] = None) -> np.ndarray:
+    """
+    Puntúa tareas sueltas (dicts con prioridad, estado, fecha_limite y
+    opcionalmente created_at) con la misma fórmula que el job.
+
+    Args:
+        tasks: Tareas a puntuar
+        now: Instante de referencia (sin zona: hora local); por defecto, ahora
+    """
+    now_epoch = time.time() if now is None else _epoch(now)
+    return score_tasks(
+        np.array([PRIORITY_CODES[TaskPriority(t["prioridad"])] for t in tasks]),
+        np.array([1.0 if t["estado"] == TaskStatus.IN_PROGRESS else 0.0 for t in tasks]),
+        np.array([_epoch(t.get("fecha_limite")) for t in tasks]),
+        np.array([_epoch(t.get("created_at"), timezone.utc) for t in tasks]),
+        now_epoch
+    )
+
+
+def digest_candidates(db: Session, user_id: int, now: Optional[datetime] = None) -> Optional[list[Task]]:
+    """
+    Candidatas del último resumen del usuario, si sigue vigente.
+
+    Un resumen deja de valer si tiene más de settings.digest_max_age_hours
+    o si alguna tarea del usuario se creó o modificó desde que se generó.
+
+    Returns:
+        Tareas candidatas (aún activas) en el orden del resumen, o None si
+        no hay resumen vigente
+    """
+    generated_at = db.scalar(select(func.min(TaskDigest.generated_at)).where(TaskDigest.user_id == user_id))
+    if generated_at is None:
+        return None
+    if generated_at.tzinfo is None:
+        generated_at = generated_at.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    if now - generated_at > timedelta(hours=settings.digest_max_age_hours):
+        return None
+
+    # Comparación en epoch (en SQLite las fechas son texto con formatos
+    # distintos) con 1 s de margen: CURRENT_TIMESTAMP tiene resolución de
+    # segundos, así que ante la duda el resumen se descarta
+    updated_at = epoch_seconds(Task.updated_at, db.get_bind().dialect.name)
+    changed = db.scalar(
+        select(Task.id).where(Task.user_id == user_id, updated_at > generated_at.timestamp() - 1).limit(1)
+    )
+    if changed is not None:
+        return None
+
+    # Las tareas borradas desde entonces desaparecen con el join
+    return list(db.scalars(
+        select(Task)
+        .join(TaskDigest, TaskDigest.task_id == Task.id)
+        .where(TaskDigest.user_id == user_id, Task.user_id == user_id, Task.estado.in_(ACTIVE_STATUSES))
+        .order_by(TaskDigest.rank)
+    ))
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import threading
+from typing import Optional
+import orjson
+from sqlalchemy.orm import Session
+from app.services.cache_service import ALL_KEYS, publish, subscribe
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# EVENTOS DE TAREAS EN TIEMPO REAL
+# ==========================================
+# Las mutaciones publican un evento en el namespace "task_events" del bus
+# de invalidación (app/services/cache_service.py), en su misma transacción.
+# El bus lo entrega una vez en cada worker (en el propio tras el commit,
+# en los demás con NOTIFY o sondeando la tabla) y el hub lo envía a las
+# conexiones WebSocket del usuario que tenga ese worker.
+
+TASK_EVENTS = "task_events"
+
+TASK_CREATED = "task.created"
+TASK_UPDATED = "task.updated"
+TASK_COMPLETED = "task.completed"
+TASK_DELETED = "task.deleted"
+TASKS_CHANGED = "tasks.changed"  # cambios masivos: el cliente debe recargar la lista
+
+
+def publish_task_event(db: Session, user_id: int, evento: str, task_id: Optional[int] = None) -> None:
+    """
+    Publica un evento de tarea dentro de la transacción de `db`: sólo se
+    envía a los clientes si la transacción hace commit.
+
+    Args:
+        db: Sesión de la mutación
+        user_id: Usuario dueño de la tarea
+        evento: task.created, task.updated, task.completed, task.deleted o tasks.changed
+        task_id: Tarea afectada (None en tasks.changed)
+    """
+    publish(db, TASK_EVENTS, f"{user_id}:{evento}:{task_id if task_id is not None else ''}")
+
+
+def _decode(key: str) -> tuple[int, bytes]:
+    user_id, evento, task_id = key.split(":", 2)
+    message = {"evento": evento}
+    if task_id:
+        message["task_id"] = int(task_id)
+    return int(user_id), orjson.dumps(message)
+
+
+class TaskEventHub:
+    """
+    Conexiones WebSocket abiertas en este worker, por usuario.
+
+    Una conexión inactiva sólo ocupa su entrada en el diccionario: no hay
+    colas ni tareas por conexión. Cada evento crea una única tarea en el
+    event loop que lo envía, en orden, a las conexiones del usuario.
+    """
+
+    def __init__(self):
+        self._connections: dict[int, dict] = {}  # user_id -> {websocket: loop}
+        self._lock = threading.Lock()
+        self._pending: set = set()  # referencias a las tareas de envío en curso
+
+    def connect(self, user_id: int, websocket) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._connections.setdefault(user_id, {})[websocket] = loop
+
+    def disconnect(self, user_id: int, websocket) -> None:
+        with self._lock:
+            connections = self._connections.get(user_id)
+            if connections is not None:
+                connections.pop(websocket, None)
+                if not connections:
+                    del self._connections[user_id]
+
+    def connection_count(self) -> int:
+        with self._lock:
+            return sum(len(connections) for connections in self._connections.values())
+
+    def send(self, user_id: int, message: bytes) -> None:
+        """Envía un mensaje a las conexiones del usuario (desde cualquier thread)"""
+        with self._lock:
+            connections = self._connections.get(user_id)
+            if not connections:
+                return
+            by_loop: dict = {}
+            for websocket, loop in connections.items():
+                by_loop.setdefault(loop, []).append(websocket)
+
+        for loop, websockets in by_loop.items():
+            loop.call_soon_threadsafe(self._schedule, user_id, websockets, message)
+
+    def broadcast(self, message: bytes) -> None:
+        with self._lock:
+            user_ids = list(self._connections)
+        for user_id in user_ids:
+            self.send(user_id, message)
+
+    def _schedule(self, user_id: int, websockets: list, message: bytes) -> None:
+        task = asyncio.get_running_loop().create_task(self._send_all(user_id, websockets, message))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _send_all(self, user_id: int, websockets: list, message: bytes) -> None:
+        text = message.decode()
+        for websocket in websockets:
+            try:
+                await websocket.send_text(text)
+            except Exception:
+                # Conexión cerrada a medias: su endpoint la dará de baja
+                logger.debug("No se pudo enviar el evento a una conexión del usuario %s", user_id)
+
+    # Interfaz de suscriptor del bus de invalidación
+
+    def invalidate(self, key) -> None:
+        if str(key) == ALL_KEYS:
+            self.clear()
+            return
+        user_id, message = _decode(str(key))
+        self.send(user_id, message)
+
+    def clear(self) -> None:
+        # El bus perdió eventos (p. ej. se cayó el listener): todos recargan
+        self.broadcast(orjson.dumps({"evento": TASKS_CHANGED}))
+
+
+task_event_hub = TaskEventHub()
+subscribe(TASK_EVENTS, task_event_hub)
@@ -1,32 +1,358 @@
 from google import genai
 from app.config import settings
+from collections import deque
 from typing import Optional
 from datetime import datetime, timedelta
 import json
-from google.genai import types
+import logging
+import re
+import threading
+import time
+from google.genai import errors, types
+from app.services.metrics_service import record_llm_call
+
+logger = logging.getLogger(__name__)
 
 # ==========================================
 # CLIENTE GEMINI
 # ==========================================
 
-client = genai.Client(api_key=settings.gemini_api_key)
+client = genai.Client(
+    api_key=settings.gemini_api_key,
+    http_options=types.HttpOptions(base_url=settings.gemini_base_url) if settings.gemini_base_url else None
+)
+
+
+# ==========================================
+# ROUTER DE MODELOS
+# ==========================================
+# Escalera de modelos, del más barato al más capaz (settings.gemini_models).
+# Cada petición empieza en el peldaño que le toca por complejidad, que se
+# clasifica en local sin llamar a la API. Si el modelo falla o devuelve
+# JSON inválido, la petición sube al siguiente peldaño. Los modelos cuya
+# tasa de errores o latencia reciente supera los umbrales se apartan
+# durante un tiempo: sus peticiones suben (o bajan) a otro modelo sano.
+
+SIMPLE = 0
+COMPLEX = 1
+
+_SENTENCE_RE = re.compile(r"[.;!?\n]+")
+_TIME_RE = re.compile(
+    r"\b(\d{1,2}(:\d{2})?\s*(am|pm|h)|\d{1,2}/\d{1,2}|hoy|mañana|lunes|martes|miércoles|jueves"
+    r"|viernes|sábado|domingo|semana|mes|próximo|próxima)\b",
+    re.IGNORECASE
+)
+
+
+def classify_extract(user_input: str) -> int:
+    """
+    Complejidad de un texto de create-smart.
+
+    Es complejo si es largo, tiene varias frases o muchas referencias
+    temporales (varias fechas u horas que hay que resolver).
+    """
+    if not settings.gemini_router_enabled:
+        return COMPLEX
+    sentences = [s for s in _SENTENCE_RE.split(user_input) if len(s.split()) >= 3]
+    if (
+        len(user_input) > settings.gemini_simple_max_chars
+        or len(sentences) > 1
+        or len(_TIME_RE.findall(user_input)) > 2
+    ):
+        return COMPLEX
+    return SIMPLE
+
+
+def classify_suggest(task_count: int) -> int:
+    """Complejidad de suggest-next según las tareas incluidas en el prompt"""
+    if not settings.gemini_router_enabled or task_count > settings.gemini_simple_max_tasks:
+        return COMPLEX
+    return SIMPLE
+
+
+class _ModelStats:
+    def __init__(self, window: int):
+        self.calls: deque = deque(maxlen=window)  # (segundos, error)
+        self.unavailable_until = 0.0
+        self.probation = False  # recién readmitido: un error lo aparta de nuevo
+
+
+class ModelRouter:
+    """
+    Elige el modelo de cada llamada y lleva la latencia y los errores
+    recientes de cada uno (por proceso).
+    """
+
+    def __init__(self, models: list[str], clock=time.monotonic):
+        if not models:
+            raise ValueError("La escalera de modelos está vacía")
+        self.models = models
+        self.clock = clock
+        self._stats = {model: _ModelStats(settings.gemini_router_window) for model in models}
+        self._lock = threading.Lock()
+
+    def candidates(self, complexity: int) -> list[str]:
+        """
+        Modelos a probar, en orden: el del peldaño de la complejidad, los
+        superiores y, por último, los inferiores. Los apartados se saltan
+        (salvo que lo estén todos).
+        """
+        start = min(complexity, len(self.models) - 1)
+        order = self.models[start:] + self.models[:start][::-1]
+        now = self.clock()
+        with self._lock:
+            available = [model for model in order if self._stats[model].unavailable_until <= now]
+        return available or order
+
+    def record(self, model: str, elapsed: float, error: bool) -> None:
+        """Registra una llamada y aparta el modelo si supera los umbrales"""
+        with self._lock:
+            stats = self._stats.get(model)
+            if stats is None:
+                return
+            stats.calls.append((elapsed, error))
+
+            if stats.probation:
+                stats.probation = error
+                if error:
+                    self._set_aside(model, stats)
+                return
+
+            if len(stats.calls) < settings.gemini_router_min_calls:
+                return
+            latencies = sorted(seconds for seconds, _ in stats.calls)
+            p95 = latencies[int(0.95 * (len(latencies) - 1))]
+            error_rate = sum(1 for _, failed in stats.calls if failed) / len(stats.calls)
+            if error_rate > settings.gemini_error_rate_threshold or p95 > settings.gemini_latency_slo_seconds:
+                self._set_aside(model, stats)
+
+    def _set_aside(self, model: str, stats: _ModelStats) -> None:
+        logger.warning(
+            "Modelo %s apartado %.0fs (errores o latencia por encima del umbral)",
+            model, settings.gemini_router_cooldown_seconds
+        )
+        stats.calls.clear()
+        stats.unavailable_until = self.clock() + settings.gemini_router_cooldown_seconds
+        stats.probation = True
+
+    def status(self) -> dict:
+        """Estado de cada modelo (para depuración)"""
+        now = self.clock()
+        with self._lock:
+            return {
+                model: {
+                    "disponible": stats.unavailable_until <= now,
+                    "llamadas": len(stats.calls),
+                    "errores": sum(1 for _, failed in stats.calls if failed),
+                }
+                for model, stats in self._stats.items()
+            }
+
+
+model_router = ModelRouter([model.strip() for model in settings.gemini_models.split(",") if model.strip()])
+
+
+# ==========================================
+# CACHÉ DE CONTEXTO
+# ==========================================
+# Las instrucciones de cada operación son fijas: las fechas y el texto del
+# usuario van aparte, en el contenido. Se suben una vez por modelo como
+# contexto cacheado de Gemini y las llamadas lo referencian por nombre, así
+# la API no vuelve a procesar esos tokens y los cobra con descuento.
+# La caché caduca a los settings.gemini_context_cache_ttl_seconds; la renueva
+# la primera llamada que la usa en su último tramo, así que una caché que
+# nadie usa caduca sola. Si no se puede crear, o si las instrucciones no
+# llegan al mínimo de tokens que admite la API, se envían como
+# system_instruction (un prefijo estable, que la caché implícita de Gemini
+# también puede aprovechar).
+
+class _CachedContext:
+    def __init__(self, name: str, expires_at: float):
+        self.name = name
+        self.expires_at = expires_at
+
+
+class ContextCache:
+    """
+    Contextos cacheados de este proceso, por (modelo, operación).
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._contexts: dict[tuple, _CachedContext] = {}
+        self._retry_at: dict[tuple, float] = {}
+        self._key_locks: dict[tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def generation_config(self, model: str, operation: str, instructions: str, config: dict) -> dict:
+        """
+        Configuración de generate_content con las instrucciones: el
+        contexto cacheado si lo hay (creándolo o renovándolo si hace
+        falta) y si no, system_instruction.
+        """
+        name = self._context_name(model, operation, instructions)
+        if name is None:
+            return {**config, "system_instruction": instructions}
+        return {**config, "cached_content": name}
+
+    def invalidate(self, model: str, operation: str) -> None:
+        """Olvida el contexto (p. ej. si la API ya no lo encuentra): se recrea en la próxima llamada"""
+        with self._lock:
+            self._contexts.pop((model, operation), None)
+
+    def _usable(self, key: tuple, now: float) -> Optional[_CachedContext]:
+        context = self._contexts.get(key)
+        if context is not None and now < context.expires_at:
+            return context
+        return None
+
+    def _context_name(self, model: str, operation: str, instructions: str) -> Optional[str]:
+        if (
+            not settings.gemini_context_cache_enabled
+            or estimate_tokens(instructions) < settings.gemini_context_cache_min_tokens
+        ):
+            return None
+
+        key = (model, operation)
+        now = self.clock()
+        with self._lock:
+            context = self._usable(key, now)
+            if context is not None and now < context.expires_at - settings.gemini_context_cache_refresh_seconds:
+                return context.name
+            if self._retry_at.get(key, 0.0) > now:
+                return context.name if context is not None else None
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Un solo thread crea o renueva el contexto de cada modelo; los demás
+        # usan el vigente (o system_instruction) en lugar de esperar
+        if not key_lock.acquire(blocking=False):
+            return context.name if context is not None else None
+        try:
+            return self._refresh(key, instructions, context)
+        finally:
+            key_lock.release()
+
+    def _refresh(self, key: tuple, instructions: str, context: Optional[_CachedContext]) -> Optional[str]:
+        model, operation = key
+        ttl = settings.gemini_context_cache_ttl_seconds
+        # La caducidad se cuenta desde antes de la petición: nunca después que en la API
+        expires_at = self.clock() + ttl
+
+        if context is not None:
+            try:
+                client.caches.update(name=context.name, config=types.UpdateCachedContentConfig(ttl=f"{ttl}s"))
+                with self._lock:
+                    context.expires_at = expires_at
+                return context.name
+            except Exception as e:
+                logger.warning("No se pudo renovar el contexto cacheado %s (%s): %s", context.name, model, e)
+
+        try:
+            cached = client.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=instructions,
+                    ttl=f"{ttl}s",
+                    display_name=f"taskmaster-{operation}"
+                )
+            )
+        except Exception as e:
+            logger.warning(
+                "No se pudo crear el contexto cacheado de %s (%s), se reintenta en %.0fs: %s",
+                operation, model, settings.gemini_context_cache_retry_seconds, e
+            )
+            with self._lock:
+                self._retry_at[key] = self.clock() + settings.gemini_context_cache_retry_seconds
+                context = self._usable(key, self.clock())
+            return context.name if context is not None else None
+
+        with self._lock:
+            self._contexts[key] = _CachedContext(cached.name, expires_at)
+            self._retry_at.pop(key, None)
+        logger.info("Contexto cacheado de %s (%s): %s", operation, model, cached.name)
+        return cached.name
+
+
+context_cache = ContextCache()
+
+
+def _parse_json(text: str) -> dict:
+    """JSON de la respuesta, quitando el bloque de markdown si lo hay"""
+    text = text.strip()
+    if text.startswith("```json"):
+        text = text[7:]
+    if text.startswith("```"):
+        text = text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return json.loads(text.strip())
+
+
+def _generate_json(operation: str, complexity: int, instructions: str, contents, config: dict) -> dict:
+    """
+    Llama a Gemini con el modelo que elija el router y devuelve el JSON de
+    la respuesta. Si falla, se prueba el siguiente modelo candidato (hasta
+    settings.gemini_max_attempts). Registra latencia, tokens y errores.
+
+    Args:
+        operation: Operación de la app, para etiquetar métricas (extract, suggest)
+        complexity: SIMPLE o COMPLEX
+        instructions: Instrucciones fijas de la operación (van en el contexto cacheado)
+        contents: Contenido variable a enviar
+        config: Configuración de generación
+
+    Returns:
+        JSON de la respuesta
+
+    Raises:
+        El error del último modelo probado
+    """
+    last_error = None
+    for model in model_router.candidates(complexity)[:settings.gemini_max_attempts]:
+        call_config = context_cache.generation_config(model, operation, instructions, config)
+        start = time.perf_counter()
+        try:
+            response = client.models.generate_content(
+                model=model,
+                contents=contents,
+                config=call_config
+            )
+            data = _parse_json(response.text)
+        except Exception as e:
+            elapsed = time.perf_counter() - start
+            record_llm_call(model, operation, elapsed, error=True)
+            model_router.record(model, elapsed, error=True)
+            if "cached_content" in call_config and isinstance(e, errors.ClientError):
+                # El contexto pudo caducar o borrarse en la API
+                context_cache.invalidate(model, operation)
+            logger.warning("Gemini %s falló con %s: %s", operation, model, e)
+            last_error = e
+            continue
+
+        elapsed = time.perf_counter() - start
+        record_llm_call(model, operation, elapsed, usage=getattr(response, "usage_metadata", None))
+        model_router.record(model, elapsed, error=False)
+        return data
+
+    raise last_error
 
 # ==========================================
 # PROMPTS DEL SISTEMA
 # ==========================================
 
+# Instrucciones fijas (system instruction / contexto cacheado): no llevan
+# fechas ni datos del usuario, que van en el contenido de cada llamada.
+
 TASK_EXTRACTION_PROMPT = """Eres un asistente de productividad experto. Tu trabajo es extraer información estructurada de las solicitudes del usuario para crear tareas.
 
-Analiza el siguiente texto y extrae:
+Analiza el texto del usuario y extrae:
 - titulo: Un título conciso de la tarea (máximo 50 caracteres)
 - descripcion: Descripción detallada (opcional, puede ser null)
 - fecha_limite: Fecha y hora en formato ISO 8601 (YYYY-MM-DDTHH:MM:SS). Si no se menciona fecha específica, usa null.
 - prioridad: "low", "medium", "high" o "urgent" según el contexto
 
 Reglas para fecha_limite:
-- Hoy es {fecha_actual}
-- "mañana" = {fecha_manana}
-- "pasado mañana" = {fecha_pasado_manana}
+- Antes del texto del usuario se indican la fecha actual y las fechas de "mañana" y "pasado mañana"
 - "próximo lunes/martes/etc" = calcular según el día actual
 - "en 3 días" = sumar días a la fecha actual
 - Si no hay fecha mencionada, usa null
@@ -38,20 +364,24 @@ Reglas para prioridad:
 - "cuando pueda", "no corre prisa" → low
 
 Responde SOLO con un objeto JSON válido (sin markdown, sin explicaciones):
-{{
+{
   "titulo": "...",
   "descripcion": "..." o null,
   "fecha_limite": "YYYY-MM-DDTHH:MM:SS" o null,
   "prioridad": "low|medium|high|urgent"
-}}"""
+}"""
 
 
-SUGGEST_NEXT_PROMPT = """Eres un asistente de productividad. Analiza las tareas del usuario y sugiere cuál debería hacer ahora.
+TASK_EXTRACTION_CONTEXT = """Hoy es {fecha_actual}
+"mañana" = {fecha_manana}
+"pasado mañana" = {fecha_pasado_manana}
 
-Tareas del usuario:
-{tareas_json}
+Texto del usuario: {texto}"""
+
+
+SUGGEST_NEXT_PROMPT = """Eres un asistente de productividad. Analiza las tareas del usuario y sugiere cuál debería hacer ahora.
 
-Fecha y hora actual: {fecha_actual}
+Recibirás la fecha y hora actual y las tareas del usuario en JSON.
 
 Considera:
 1. Tareas con fecha_limite próxima (urgentes)
@@ -59,10 +389,118 @@ Considera:
 3. Tareas pendientes vs en progreso
 
 Responde SOLO con un objeto JSON:
-{{
+{
   "sugerencia": "Texto amigable explicando qué hacer y por qué",
   "task_id": ID de la tarea sugerida (int) o null si no hay tareas
-}}"""
+}"""
+
+
+SUGGEST_NEXT_CONTEXT = """Fecha y hora actual: {fecha_actual}
+
+Tareas del usuario:
+{tareas_json}"""
+
+
+SUGGEST_NEXT_QUESTION = "\n\nPregunta del usuario: ¿Qué tarea debería hacer ahora?"
+
+PRIORITY_ORDER = {"urgent": 0, "high": 1, "medium": 2, "low": 3}
+
+
+# ==========================================
+# PRESUPUESTO DE TOKENS
+# ==========================================
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estima los tokens de un texto sin llamar a la API.
+
+    Usa la aproximación habitual de ~4 caracteres por token, suficiente
+    para decidir cuántas tareas caben en el prompt.
+    """
+    return (len(text) + 3) // 4
+
+
+def _task_rank_key(task: dict) -> tuple:
+    """
+    Orden de relevancia de una tarea: fecha límite más próxima primero,
+    y a igual fecha, mayor prioridad primero.
+    """
+    return (
+        task.get("fecha_limite") or datetime.max,
+        PRIORITY_ORDER.get(task.get("prioridad"), 2)
+    )
+
+
+def _compact_task(task: dict, max_title_chars: int) -> str:
+    """
+    Serializa una tarea en JSON compacto (sin indentación ni espacios),
+    truncando el título y omitiendo la fecha límite si no existe.
+    """
+    titulo = task.get("titulo") or ""
+    if len(titulo) > max_title_chars:
+        titulo = titulo[:max_title_chars - 1] + "…"
+
+    compact = {
+        "id": task.get("id"),
+        "titulo": titulo,
+        "prioridad": task.get("prioridad"),
+        "estado": task.get("estado")
+    }
+    if task.get("fecha_limite"):
+        compact["fecha_limite"] = task["fecha_limite"].isoformat(timespec="minutes")
+
+    return json.dumps(compact, ensure_ascii=False, separators=(",", ":"))
+
+
+def build_suggest_prompt(
+    active_tasks: list,
+    max_tokens: Optional[int] = None,
+    max_title_chars: Optional[int] = None
+) -> tuple[str, int, int]:
+    """
+    Construye la parte variable del prompt de suggest-next (fecha, tareas y
+    pregunta) respetando un presupuesto de tokens. Las instrucciones
+    (SUGGEST_NEXT_PROMPT) van aparte, en el contexto cacheado.
+
+    Las tareas se ordenan por relevancia y se van añadiendo mientras el
+    prompt quepa en el presupuesto; las menos relevantes se descartan.
+    Siempre se incluye al menos la tarea más relevante.
+
+    Args:
+        active_tasks: Tareas activas (dicts con id, titulo, estado, etc.)
+        max_tokens: Presupuesto de tokens (por defecto, settings.suggest_prompt_max_tokens)
+        max_title_chars: Longitud máxima de título (por defecto, settings.suggest_title_max_chars)
+
+    Returns:
+        (prompt, tokens estimados, número de tareas incluidas)
+    """
+    if max_tokens is None:
+        max_tokens = settings.suggest_prompt_max_tokens
+    if max_title_chars is None:
+        max_title_chars = settings.suggest_title_max_chars
+
+    fecha_actual = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    base_chars = len(SUGGEST_NEXT_CONTEXT.format(tareas_json="[]", fecha_actual=fecha_actual))
+    base_chars += len(SUGGEST_NEXT_QUESTION)
+    max_chars = max_tokens * 4
+
+    entries = []
+    total_chars = base_chars
+    for task in sorted(active_tasks, key=_task_rank_key):
+        entry = _compact_task(task, max_title_chars)
+        # +1 por la coma separadora
+        if entries and total_chars + len(entry) + 1 > max_chars:
+            break
+        entries.append(entry)
+        total_chars += len(entry) + 1
+
+    prompt = SUGGEST_NEXT_CONTEXT.format(
+        tareas_json="[" + ",".join(entries) + "]",
+        fecha_actual=fecha_actual
+    ) + SUGGEST_NEXT_QUESTION
+
+    return prompt, estimate_tokens(prompt), len(entries)
 
 
 # ==========================================
@@ -79,7 +517,7 @@ def extract_task_data(user_input: str) -> dict:
         → {
             "titulo": "Llamar al dentista",
             "descripcion": null,
-            "fecha_limite": "2024-11-24T10:00:00",
+            "fecha_limite": datetime(2024, 11, 24, 10, 0),
             "prioridad": "medium"
           }
 
@@ -97,10 +535,11 @@ def extract_task_data(user_input: str) -> dict:
     manana = hoy + timedelta(days=1)
     pasado_manana = hoy + timedelta(days=2)
 
-    prompt = TASK_EXTRACTION_PROMPT.format(
+    contents = TASK_EXTRACTION_CONTEXT.format(
         fecha_actual=hoy.strftime("%Y-%m-%d %H:%M:%S"),
         fecha_manana=manana.strftime("%Y-%m-%d"),
         fecha_pasado_manana=pasado_manana.strftime("%Y-%m-%d"),
+        texto=user_input,
     )
 
     schema = {
@@ -115,30 +554,21 @@ def extract_task_data(user_input: str) -> dict:
     }
 
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt + "\n\nTexto del usuario: " + user_input,
+        data = _generate_json(
+            "extract",
+            classify_extract(user_input),
+            TASK_EXTRACTION_PROMPT,
+            contents=contents,
             config={
                 "response_mime_type": "application/json",
                 "response_json_schema": schema
             },
         )
 
-        response_text = response.text.strip()
-
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-
-        data = json.loads(response_text.strip())
-
         return {
             "titulo": data.get("titulo"),
             "descripcion": data.get("descripcion"),
-            "fecha_limite": data.get("fecha_limite"),
+            "fecha_limite": datetime.fromisoformat(data["fecha_limite"]) if data.get("fecha_limite") else None,
             "prioridad": data.get("prioridad"),
         }
 
@@ -158,14 +588,17 @@ def suggest_next_task(tasks: list) -> dict:
     Returns:
         {
           "sugerencia": "Deberías completar X porque...",
-          "task_id": 123 o null
+          "task_id": 123 o null,
+          "prompt_tokens": tokens estimados de la parte variable del prompt,
+          "fallback": True  # sólo si Gemini falló y se eligió por prioridad
         }
     """
     
     if not tasks:
         return {
             "sugerencia": "No tienes tareas pendientes. ¡Buen trabajo! ¿Quieres crear una nueva?",
-            "task_id": None
+            "task_id": None,
+            "prompt_tokens": 0
         }
     
     active_tasks = [
@@ -176,23 +609,14 @@ def suggest_next_task(tasks: list) -> dict:
     if not active_tasks:
         return {
             "sugerencia": "¡Todas tus tareas están completadas! 🎉",
-            "task_id": None
+            "task_id": None,
+            "prompt_tokens": 0
         }
     
-    tareas_simplificadas = [
-        {
-            "id": t.get("id"),
-            "titulo": t.get("titulo"),
-            "prioridad": t.get("prioridad"),
-            "fecha_limite": t.get("fecha_limite").isoformat() if t.get("fecha_limite") else None,
-            "estado": t.get("estado")
-        }
-        for t in active_tasks
-    ]
-    
-    prompt = SUGGEST_NEXT_PROMPT.format(
-        tareas_json=json.dumps(tareas_simplificadas, indent=2, ensure_ascii=False),
-        fecha_actual=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    prompt, prompt_tokens, incluidas = build_suggest_prompt(active_tasks)
+    logger.info(
+        "suggest-next: prompt de ~%d tokens (%d/%d tareas)",
+        prompt_tokens, incluidas, len(active_tasks)
     )
     
     schema = {
@@ -205,41 +629,29 @@ def suggest_next_task(tasks: list) -> dict:
     }
     
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt + "\n\nPregunta del usuario: ¿Qué tarea debería hacer ahora?",
+        data = _generate_json(
+            "suggest",
+            classify_suggest(incluidas),
+            SUGGEST_NEXT_PROMPT,
+            contents=prompt,
             config={
                 "response_mime_type": "application/json",
                 "response_json_schema": schema
             }
         )
         
-        response_text = response.text.strip()
-        
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        
-        data = json.loads(response_text.strip())
-        
         return {
             "sugerencia": data.get("sugerencia", "No pude generar una sugerencia"),
-            "task_id": data.get("task_id")
+            "task_id": data.get("task_id"),
+            "prompt_tokens": prompt_tokens
         }
         
     except Exception as e:
-        urgent_task = min(
-            active_tasks,
-            key=lambda t: (
-                t.get("fecha_limite") or datetime.max,
-                {"urgent": 0, "high": 1, "medium": 2, "low": 3}.get(t.get("prioridad"), 2)
-            )
-        )
+        urgent_task = min(active_tasks, key=_task_rank_key)
         
         return {
             "sugerencia": f"Te sugiero completar: '{urgent_task.get('titulo')}' (prioridad {urgent_task.get('prioridad')})",
-            "task_id": urgent_task.get("id")
+            "task_id": urgent_task.get("id"),
+            "prompt_tokens": prompt_tokens,
+            "fallback": True
         }
\ No newline at end of file
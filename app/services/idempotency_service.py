@@ -0,0 +1,176 @@
+from dataclasses import dataclass
+from typing import Optional
+import threading
+import time
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.models import IdempotencyKey
+
+# ==========================================
+# CLAVES DE IDEMPOTENCIA
+# ==========================================
+# La primera petición con una clave la reserva (fila con status_code NULL),
+# ejecuta el endpoint y guarda su respuesta en la misma transacción que sus
+# cambios. Los reintentos concurrentes esperan a que termine; los
+# posteriores reciben la respuesta guardada sin tocar la BD ni Gemini.
+# Si la petición falla, la reserva se borra y el reintento se ejecuta.
+
+
+@dataclass
+class StoredResponse:
+    status_code: int
+    body: bytes
+
+
+class IdempotencyConflict(Exception):
+    """La clave ya se usó con otro endpoint u otro cuerpo"""
+
+
+class IdempotencyInProgress(Exception):
+    """La petición original sigue en curso tras la espera máxima"""
+
+
+def _insert(conn):
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(IdempotencyKey)
+
+
+class IdempotencyStore:
+    """
+    Reservas y respuestas guardadas en la tabla idempotency_keys,
+    compartidas entre workers. Los duplicados del mismo proceso se
+    despiertan con un Event en cuanto termina la petición original; los
+    de otros workers sondean la fila.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._events: dict[tuple, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+    def _pk(self, user_id: int, key: str):
+        return (IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+
+    def _try_claim(self, conn, user_id: int, key: str, endpoint: str, request_hash: str, now: float) -> bool:
+        values = {
+            "endpoint": endpoint,
+            "request_hash": request_hash,
+            "status_code": None,
+            "body": None,
+            "created_at": now,
+            "expires_at": now + settings.idempotency_lock_seconds,
+        }
+        inserted = conn.execute(
+            _insert(conn)
+            .values(user_id=user_id, key=key, **values)
+            .on_conflict_do_nothing(index_elements=["user_id", "key"])
+        ).rowcount
+        if inserted:
+            return True
+
+        # Respuesta caducada o petición abandonada: se reutiliza la fila
+        return conn.execute(
+            update(IdempotencyKey)
+            .where(*self._pk(user_id, key), IdempotencyKey.expires_at < now)
+            .values(**values)
+        ).rowcount > 0
+
+    def claim(self, engine, user_id: int, key: str, endpoint: str, request_hash: str) -> Optional[StoredResponse]:
+        """
+        Reserva la clave para esta petición o devuelve la respuesta guardada.
+
+        Si otra petición con la misma clave está en curso, espera a que
+        termine (hasta settings.idempotency_wait_seconds).
+
+        Args:
+            engine: Engine de la BD (cada paso es una transacción corta)
+            user_id: Usuario (las claves son por usuario)
+            key: Valor de la cabecera Idempotency-Key
+            endpoint: Método y ruta de la petición
+            request_hash: Hash del cuerpo de la petición
+
+        Returns:
+            None si la petición debe ejecutarse, o la respuesta guardada
+
+        Raises:
+            IdempotencyConflict: Si la clave se usó con otra petición
+            IdempotencyInProgress: Si la original no termina a tiempo
+        """
+        self._maybe_purge(engine)
+        deadline = self.clock() + settings.idempotency_wait_seconds
+
+        while True:
+            now = self.clock()
+            with engine.begin() as conn:
+                if self._try_claim(conn, user_id, key, endpoint, request_hash, now):
+                    with self._lock:
+                        self._events[(user_id, key)] = threading.Event()
+                    return None
+                row = conn.execute(
+                    select(
+                        IdempotencyKey.endpoint,
+                        IdempotencyKey.request_hash,
+                        IdempotencyKey.status_code,
+                        IdempotencyKey.body,
+                    ).where(*self._pk(user_id, key))
+                ).first()
+
+            if row is None:
+                continue  # la original falló y liberó la clave: se reintenta la reserva
+            if row.endpoint != endpoint or row.request_hash != request_hash:
+                raise IdempotencyConflict()
+            if row.status_code is not None:
+                return StoredResponse(row.status_code, row.body)
+            if now >= deadline:
+                raise IdempotencyInProgress()
+
+            with self._lock:
+                event = self._events.get((user_id, key))
+            if event is not None:
+                event.wait(settings.idempotency_poll_interval)
+            else:
+                time.sleep(settings.idempotency_poll_interval)
+
+    def save(self, db: Session, user_id: int, key: str, status_code: int, body: bytes) -> None:
+        """Guarda la respuesta en la transacción de la sesión (sin commit)"""
+        db.execute(
+            update(IdempotencyKey)
+            .where(*self._pk(user_id, key))
+            .values(status_code=status_code, body=body, expires_at=self.clock() + settings.idempotency_ttl_seconds),
+            execution_options={"synchronize_session": False}
+        )
+
+    def release(self, engine, user_id: int, key: str) -> None:
+        """
+        Termina la petición original: borra la reserva si no se llegó a
+        guardar respuesta y despierta a los duplicados que esperan.
+        """
+        with engine.begin() as conn:
+            conn.execute(
+                delete(IdempotencyKey).where(*self._pk(user_id, key), IdempotencyKey.status_code.is_(None))
+            )
+        with self._lock:
+            event = self._events.pop((user_id, key), None)
+        if event is not None:
+            event.set()
+
+    def _maybe_purge(self, engine) -> None:
+        """Borra las respuestas caducadas, como mucho una vez por minuto y proceso"""
+        now = self.clock()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        with engine.begin() as conn:
+            conn.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.expires_at < now, IdempotencyKey.status_code.is_not(None)
+                )
+            )
+
+
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,343 @@
+import csv
+import io
+import re
+from datetime import datetime, timezone
+from typing import BinaryIO, Iterator, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.models import Task, TaskPriority, TaskStatus
+from app.schemas.schemas import TaskCreate
+from app.services.cache_service import publish_task_change
+from app.services.events_service import TASKS_CHANGED, publish_task_event
+
+# ==========================================
+# IMPORTACIÓN DE TAREAS
+# ==========================================
+# El fichero se lee línea a línea (nunca entero en memoria), cada registro
+# se valida con TaskCreate y las filas válidas se escriben por lotes:
+# COPY en PostgreSQL, INSERT con executemany en el resto.
+
+IMPORT_FORMATS = ("csv", "jsonl", "ics")
+
+_EXTENSIONS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".ics": "ics"}
+
+# Columnas que se escriben en cada fila importada
+IMPORT_COLUMNS = ("user_id", "titulo", "descripcion", "estado", "prioridad", "fecha_limite", "created_by_ai")
+
+
+class ImportFormatError(ValueError):
+    """El formato del fichero no se reconoce"""
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str] = None) -> str:
+    """
+    Formato del fichero por su extensión (o, si no la tiene, por su tipo).
+
+    Raises:
+        ImportFormatError: Si no es CSV, JSONL ni ICS
+    """
+    name = (filename or "").lower()
+    for extension, import_format in _EXTENSIONS.items():
+        if name.endswith(extension):
+            return import_format
+
+    content_type = (content_type or "").split(";")[0].strip()
+    if content_type == "text/csv":
+        return "csv"
+    if content_type in ("application/x-ndjson", "application/jsonl"):
+        return "jsonl"
+    if content_type == "text/calendar":
+        return "ics"
+    raise ImportFormatError("Formato no reconocido: usa un fichero .csv, .jsonl o .ics (o ?format=)")
+
+# ==========================================
+# LECTORES (registro a registro)
+# ==========================================
+# Cada lector devuelve (número de fila, dict con los campos de TaskCreate).
+# Un registro ilegible se devuelve como (fila, excepción).
+
+
+def _text(file: BinaryIO) -> io.TextIOWrapper:
+    # utf-8-sig: los CSV exportados desde hojas de cálculo suelen llevar BOM
+    return io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+
+
+def read_csv(file: BinaryIO) -> Iterator[tuple]:
+    """Cabecera con los nombres de campo de TaskCreate; las demás columnas se ignoran"""
+    reader = csv.DictReader(_text(file))
+    for record in reader:
+        yield reader.line_num, {key: value for key, value in record.items() if key and value != ""}
+
+
+def read_jsonl(file: BinaryIO) -> Iterator[tuple]:
+    """Un objeto JSON por línea; las líneas vacías se ignoran"""
+    for line_number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            yield line_number, e
+            continue
+        if not isinstance(record, dict):
+            yield line_number, ValueError("Se esperaba un objeto JSON")
+            continue
+        yield line_number, record
+
+
+# Correspondencias de iCalendar (RFC 5545) con los estados y prioridades
+_ICS_STATUS = {
+    "NEEDS-ACTION": TaskStatus.PENDING,
+    "TENTATIVE": TaskStatus.PENDING,
+    "CONFIRMED": TaskStatus.PENDING,
+    "IN-PROCESS": TaskStatus.IN_PROGRESS,
+    "COMPLETED": TaskStatus.COMPLETED,
+    "CANCELLED": TaskStatus.CANCELLED,
+}
+
+_ICS_ESCAPES = re.compile(r"\\([\\;,nN])")
+
+
+def _ics_priority(value: str) -> TaskPriority:
+    # 1 es la más alta y 9 la más baja; 0 = sin definir
+    priority = int(value)
+    if priority == 0:
+        return TaskPriority.MEDIUM
+    if priority <= 2:
+        return TaskPriority.URGENT
+    if priority <= 4:
+        return TaskPriority.HIGH
+    if priority == 5:
+        return TaskPriority.MEDIUM
+    return TaskPriority.LOW
+
+
+def _ics_datetime(value: str, params: dict) -> datetime:
+    """
+    20240115T090000Z (UTC), 20240115T090000 con o sin TZID, o 20240115
+    (día completo). Las fechas límite de la app son naive en hora local:
+    las horas en UTC o con TZID se convierten a la hora local.
+
+    Raises:
+        ValueError: Si la fecha no es válida o el TZID no se conoce
+    """
+    if "T" not in value:
+        return datetime.strptime(value, "%Y%m%d")
+    if value.endswith("Z"):
+        moment = datetime.strptime(value[:-1], "%Y%m%dT%H%M%S").replace(tzinfo=timezone.utc)
+    else:
+        moment = datetime.strptime(value, "%Y%m%dT%H%M%S")
+        if "TZID" not in params:
+            return moment  # hora "flotante": ya es local
+        try:
+            moment = moment.replace(tzinfo=ZoneInfo(params["TZID"]))
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Zona horaria desconocida: {params['TZID']}")
+    return moment.astimezone().replace(tzinfo=None)
+
+
+def _ics_params(name: str) -> dict:
+    """Parámetros de una propiedad: DUE;TZID=Europe/Madrid -> {"TZID": "Europe/Madrid"}"""
+    params = {}
+    for param in name.split(";")[1:]:
+        key, _, value = param.partition("=")
+        params[key.upper()] = value.strip('"')
+    return params
+
+
+def _ics_lines(file: BinaryIO) -> Iterator[tuple]:
+    """Líneas lógicas (deshaciendo el plegado de líneas largas) con su número"""
+    pending = None
+    start = 0
+    for line_number, line in enumerate(_text(file), start=1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and pending is not None:
+            pending += line[1:]
+            continue
+        if pending is not None:
+            yield start, pending
+        pending, start = line, line_number
+    if pending is not None:
+        yield start, pending
+
+
+def read_ics(file: BinaryIO) -> Iterator[tuple]:
+    """Cada VTODO o VEVENT es una tarea (SUMMARY, DESCRIPTION, DUE/DTEND/DTSTART, STATUS, PRIORITY)"""
+    component = None
+    start = 0
+    for line_number, line in _ics_lines(file):
+        raw_name, _, value = line.partition(":")
+        name = raw_name.split(";")[0].upper()
+
+        if name == "BEGIN" and value.upper() in ("VTODO", "VEVENT"):
+            component, params, start = {}, {}, line_number
+        elif component is None:
+            continue
+        elif name == "END" and value.upper() in ("VTODO", "VEVENT"):
+            try:
+                yield start, _ics_record(component, params)
+            except ValueError as e:
+                yield start, e
+            component = None
+        elif name not in component:
+            component[name] = value
+            params[name] = _ics_params(raw_name)
+
+
+def _ics_record(component: dict, params: dict) -> dict:
+    record = {}
+    if "SUMMARY" in component:
+        record["titulo"] = _ICS_ESCAPES.sub(_ics_unescape, component["SUMMARY"])
+    if component.get("DESCRIPTION"):
+        record["descripcion"] = _ICS_ESCAPES.sub(_ics_unescape, component["DESCRIPTION"])
+    for name in ("DUE", "DTEND", "DTSTART"):
+        if component.get(name):
+            record["fecha_limite"] = _ics_datetime(component[name], params[name])
+            break
+    if component.get("STATUS", "").upper() in _ICS_STATUS:
+        record["estado"] = _ICS_STATUS[component["STATUS"].upper()]
+    if component.get("PRIORITY"):
+        record["prioridad"] = _ics_priority(component["PRIORITY"])
+    return record
+
+
+def _ics_unescape(match: re.Match) -> str:
+    char = match.group(1)
+    return "\n" if char in "nN" else char
+
+
+READERS = {
+    "csv": read_csv,
+    "jsonl": read_jsonl,
+    "ics": read_ics,
+}
+
+# ==========================================
+# ESCRITURA POR LOTES
+# ==========================================
+
+def _copy_rows(db: Session, rows: list[dict]) -> None:
+    """COPY ... FROM STDIN dentro de la transacción de la sesión (psycopg 3)"""
+    connection = db.connection().connection.driver_connection
+    columns = ", ".join(IMPORT_COLUMNS)
+    with connection.cursor() as cursor:
+        with cursor.copy(f"COPY {Task.__tablename__} ({columns}) FROM STDIN") as copy:
+            for row in rows:
+                # Los enums se guardan por nombre (PENDING, HIGH...)
+                copy.write_row(tuple(
+                    value.name if isinstance(value, (TaskStatus, TaskPriority)) else value
+                    for value in (row[column] for column in IMPORT_COLUMNS)
+                ))
+
+
+def write_rows(db: Session, rows: list[dict]) -> None:
+    """Inserta un lote de filas (sin commit)"""
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        _copy_rows(db, rows)
+    else:
+        db.execute(insert(Task.__table__), rows)
+
+# ==========================================
+# IMPORTACIÓN
+# ==========================================
+
+def _errors(error: Exception) -> list[str]:
+    if isinstance(error, ValidationError):
+        return [
+            f"{'.'.join(str(part) for part in e['loc']) or 'fila'}: {e['msg']}"
+            for e in error.errors(include_url=False)
+        ]
+    return [str(error)]
+
+
+def import_tasks(
+    db: Session,
+    user_id: int,
+    file: BinaryIO,
+    import_format: str,
+    batch_size: Optional[int] = None
+) -> Iterator[dict]:
+    """
+    Importa las tareas de un fichero, con un commit por lote.
+
+    Los registros sin estado o sin prioridad se importan como pending y
+    medium. A diferencia de POST /tasks, el estado del fichero se respeta
+    (p. ej. tareas ya completadas en otra herramienta).
+
+    Args:
+        db: Sesión de BD
+        user_id: Usuario al que se asignan las tareas
+        file: Fichero binario abierto (se lee de forma incremental)
+        import_format: csv, jsonl o ics
+        batch_size: Filas por lote (por defecto, settings.import_batch_size)
+
+    Yields:
+        Eventos: {"fila", "errores"} por cada registro inválido,
+        {"procesadas", "importadas", "con_errores"} tras cada lote y, al
+        final, el mismo resumen con "terminado": True
+    """
+    if batch_size is None:
+        batch_size = settings.import_batch_size
+
+    processed = imported = failed = 0
+    batch = []
+
+    def flush():
+        nonlocal imported, batch
+        if batch:
+            write_rows(db, batch)
+            publish_task_change(db, user_id)
+            publish_task_event(db, user_id, TASKS_CHANGED)
+            db.commit()
+        imported += len(batch)
+        batch = []
+        return {"procesadas": processed, "importadas": imported, "con_errores": failed}
+
+    records = READERS[import_format](file)
+    last_line = 0
+    while True:
+        try:
+            line_number, record = next(records)
+        except StopIteration:
+            break
+        except (UnicodeDecodeError, csv.Error) as e:
+            # El resto del fichero no se puede leer: se informa como error de
+            # la fila siguiente y la importación termina con lo ya leído
+            processed += 1
+            failed += 1
+            yield {"fila": last_line + 1, "errores": [f"Fichero ilegible a partir de esta fila: {e}"]}
+            break
+        last_line = line_number
+        processed += 1
+        try:
+            if isinstance(record, Exception):
+                raise record
+            record.setdefault("estado", TaskStatus.PENDING)
+            record.setdefault("prioridad", TaskPriority.MEDIUM)
+            task = TaskCreate.model_validate(record)
+        except (ValidationError, ValueError) as e:
+            failed += 1
+            yield {"fila": line_number, "errores": _errors(e)}
+            continue
+
+        batch.append({
+            "user_id": user_id,
+            "titulo": task.titulo,
+            "descripcion": task.descripcion,
+            "estado": task.estado,
+            "prioridad": task.prioridad,
+            "fecha_limite": task.fecha_limite,
+            "created_by_ai": False,
+        })
+        if len(batch) >= batch_size:
+            yield flush()
+
+    summary = flush()
+    summary["terminado"] = True
+    yield summary
@@ -0,0 +1,281 @@
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+import threading
+import time
+
+# ==========================================
+# MÉTRICAS EN FORMATO PROMETHEUS
+# ==========================================
+# Registro mínimo de contadores e histogramas, sin dependencias externas.
+# Las métricas son por proceso: con varios workers, Prometheus debe
+# scrapear cada uno (o agregarlas por instancia).
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple, extra: Optional[tuple] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Contador monótono con etiquetas"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram:
+    """Histograma acumulativo con etiquetas"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # key -> [counts por bucket..., suma, total]
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def get_count(self, **labels) -> int:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        state = self._values.get(key)
+        return state[-1] if state else 0
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for i, bound in enumerate(self.buckets):
+                cumulative += state[i]
+                le = ("le", _format_value(bound))
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {state[-1]}")
+        return lines
+
+
+class Registry:
+    """Conjunto de métricas expuestas en /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# ==========================================
+# MÉTRICAS DE LA APLICACIÓN
+# ==========================================
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total",
+    "Peticiones HTTP atendidas",
+    ("method", "route", "status")
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "Latencia de las peticiones HTTP por ruta",
+    ("method", "route")
+))
+http_request_db_queries = registry.register(Histogram(
+    "http_request_db_queries",
+    "Consultas SQL ejecutadas por petición (detecta N+1)",
+    ("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+))
+http_request_db_seconds = registry.register(Histogram(
+    "http_request_db_seconds",
+    "Tiempo total en BD por petición",
+    ("method", "route")
+))
+db_queries_total = registry.register(Counter(
+    "db_queries_total",
+    "Consultas SQL ejecutadas",
+    ("operation",)
+))
+db_query_duration_seconds = registry.register(Histogram(
+    "db_query_duration_seconds",
+    "Latencia de cada consulta SQL",
+    ("operation",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+))
+llm_request_duration_seconds = registry.register(Histogram(
+    "llm_request_duration_seconds",
+    "Latencia de las llamadas a Gemini",
+    ("model", "operation"),
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+))
+llm_tokens_total = registry.register(Counter(
+    "llm_tokens_total",
+    "Tokens consumidos en Gemini",
+    ("model", "operation", "type")
+))
+llm_errors_total = registry.register(Counter(
+    "llm_errors_total",
+    "Llamadas a Gemini fallidas",
+    ("model", "operation")
+))
+
+# ==========================================
+# ESTADÍSTICAS POR PETICIÓN
+# ==========================================
+
+@dataclass
+class RequestStats:
+    """Consultas SQL acumuladas durante una petición"""
+    db_queries: int = 0
+    db_seconds: float = 0.0
+
+
+# El middleware crea un RequestStats por petición; los threads del
+# threadpool heredan el contexto, así que comparten el mismo objeto.
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "current_request_stats", default=None
+)
+
+
+def record_db_query(statement: str, elapsed: float) -> None:
+    """
+    Registra una consulta SQL en las métricas globales y en las de la
+    petición en curso (si la hay).
+    """
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    db_queries_total.inc(operation=operation)
+    db_query_duration_seconds.observe(elapsed, operation=operation)
+
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_seconds += elapsed
+
+
+def instrument_engine(engine) -> None:
+    """
+    Engancha eventos de SQLAlchemy al engine para contar consultas y
+    medir su duración.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["query_start_time"].pop()
+        record_db_query(statement, time.perf_counter() - start)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start_time"):
+            conn.info["query_start_time"].pop()
+
+
+def record_llm_call(
+    model: str,
+    operation: str,
+    elapsed: float,
+    usage=None,
+    error: bool = False
+) -> None:
+    """
+    Registra una llamada a Gemini: latencia, tokens consumidos y errores.
+
+    Args:
+        model: Modelo usado
+        operation: Operación de la app (extract, suggest...)
+        elapsed: Segundos que tardó la llamada
+        usage: usage_metadata de la respuesta (si la hay)
+        error: Si la llamada falló
+    """
+    llm_request_duration_seconds.observe(elapsed, model=model, operation=operation)
+    if error:
+        llm_errors_total.inc(model=model, operation=operation)
+    if usage is not None:
+        prompt_tokens = getattr(usage, "prompt_token_count", None) or 0
+        output_tokens = getattr(usage, "candidates_token_count", None) or 0
+        llm_tokens_total.inc(prompt_tokens, model=model, operation=operation, type="prompt")
+        llm_tokens_total.inc(output_tokens, model=model, operation=operation, type="output")
+        # Parte de los de prompt que la API leyó del contexto cacheado
+        cached_tokens = getattr(usage, "cached_content_token_count", None) or 0
+        llm_tokens_total.inc(cached_tokens, model=model, operation=operation, type="cached")
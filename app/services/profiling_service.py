@@ -0,0 +1,255 @@
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from typing import Optional
+import hmac
+import sys
+import threading
+import time
+import uuid
+from app.config import settings
+
+# ==========================================
+# PROFILING BAJO DEMANDA
+# ==========================================
+# Un profiler de muestreo (estilo pyinstrument): un thread captura cada
+# pocos ms la pila de los threads que están trabajando para la petición
+# perfilada. Los endpoints síncronos se ejecutan en el threadpool, por eso
+# los threads se registran al usarse desde el contexto de la petición
+# (middleware, checkout de conexión y cada consulta SQL).
+#
+# Los listeners del engine sólo se enganchan mientras hay algún perfil
+# activo: sin perfiles, el coste para el resto de peticiones es nulo.
+
+# Funciones hoja que indican que el thread está ocioso (esperando trabajo)
+IDLE_FUNCTIONS = {"select", "poll", "epoll", "wait", "_wait_for_tstate_lock", "get", "run_forever"}
+
+current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+_reports: "OrderedDict[str, dict]" = OrderedDict()
+_reports_lock = threading.Lock()
+
+_active_profiles = 0
+_engines: list = []
+_listeners_lock = threading.Lock()
+
+
+def is_authorized(token: Optional[str]) -> bool:
+    """
+    Comprueba el token de administrador que habilita el profiling.
+    Si no hay token configurado, el profiling está deshabilitado.
+    """
+    if not settings.profiling_token or not token:
+        return False
+    return hmac.compare_digest(token, settings.profiling_token)
+
+
+# ==========================================
+# HOOKS DEL ENGINE
+# ==========================================
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    profile = current_profile.get()
+    if profile is not None:
+        profile.register_current_thread()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    if profile is not None:
+        profile.register_current_thread()
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    starts = conn.info.get("profile_query_start")
+    if profile is not None and starts:
+        profile.record_sql(statement, time.perf_counter() - starts.pop())
+
+
+def register_engine(engine) -> None:
+    """Registra un engine cuyas consultas se incluirán en los perfiles"""
+    _engines.append(engine)
+
+
+def _attach_listeners() -> None:
+    from sqlalchemy import event
+
+    for engine in _engines:
+        event.listen(engine.pool, "checkout", _on_checkout)
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _detach_listeners() -> None:
+    from sqlalchemy import event
+
+    for engine in _engines:
+        event.remove(engine.pool, "checkout", _on_checkout)
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ==========================================
+# PERFIL DE UNA PETICIÓN
+# ==========================================
+
+class RequestProfile:
+    """
+    Perfil de muestreo de una única petición.
+
+    Uso:
+        profile = RequestProfile("GET", "/tasks")
+        profile.start()
+        ...
+        report = profile.stop()
+    """
+
+    def __init__(self, method: str, path: str, interval: Optional[float] = None):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.interval = interval if interval is not None else settings.profiling_interval_ms / 1000
+        self.thread_ids: set[int] = set()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.sql: list[dict] = []
+        self._stop_event = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._token = None
+        self._start = 0.0
+
+    def register_current_thread(self) -> None:
+        self.thread_ids.add(threading.get_ident())
+
+    def record_sql(self, statement: str, elapsed: float) -> None:
+        self.sql.append({
+            "statement": " ".join(statement.split()),
+            "duration_ms": round(elapsed * 1000, 3)
+        })
+
+    def start(self) -> None:
+        global _active_profiles
+
+        with _listeners_lock:
+            if _active_profiles == 0:
+                _attach_listeners()
+            _active_profiles += 1
+
+        self._token = current_profile.set(self)
+        self.register_current_thread()
+        self._start = time.perf_counter()
+        self._sampler = threading.Thread(target=self._sample_loop, name=f"profiler-{self.id}", daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> dict:
+        global _active_profiles
+
+        duration = time.perf_counter() - self._start
+        self._stop_event.set()
+        self._sampler.join()
+        current_profile.reset(self._token)
+
+        with _listeners_lock:
+            _active_profiles -= 1
+            if _active_profiles == 0:
+                _detach_listeners()
+
+        report = self.build_report(duration)
+        store_report(report)
+        return report
+
+    def _sample_loop(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id in list(self.thread_ids):
+                if thread_id == own_id or thread_id not in frames:
+                    continue
+                stack = _extract_stack(frames[thread_id])
+                if stack and stack[-1][2] not in IDLE_FUNCTIONS:
+                    self.stacks[stack] += 1
+                    self.samples += 1
+
+    def build_report(self, duration: float) -> dict:
+        """
+        Agrega las muestras en un informe: funciones con más tiempo propio y
+        acumulado, pilas colapsadas (formato flamegraph) y consultas SQL.
+        """
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            self_counts[_format_frame(stack[-1])] += count
+            for frame in set(stack):
+                total_counts[_format_frame(frame)] += count
+
+        top = settings.profiling_top_functions
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "duration_ms": round(duration * 1000, 3),
+            "interval_ms": round(self.interval * 1000, 3),
+            "samples": self.samples,
+            "top_self": [
+                {"function": name, "samples": count}
+                for name, count in self_counts.most_common(top)
+            ],
+            "top_total": [
+                {"function": name, "samples": count}
+                for name, count in total_counts.most_common(top)
+            ],
+            "collapsed_stacks": [
+                f"{';'.join(frame[2] for frame in stack)} {count}"
+                for stack, count in self.stacks.most_common(top)
+            ],
+            "sql_count": len(self.sql),
+            "sql_total_ms": round(sum(q["duration_ms"] for q in self.sql), 3),
+            "sql": self.sql,
+        }
+
+
+def _extract_stack(frame) -> tuple:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_filename, frame.f_lineno, code.co_name))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def _format_frame(frame: tuple) -> str:
+    filename, lineno, name = frame
+    return f"{name} ({filename}:{lineno})"
+
+
+# ==========================================
+# ALMACÉN DE INFORMES
+# ==========================================
+
+def store_report(report: dict) -> None:
+    """Guarda un informe, descartando los más antiguos"""
+    with _reports_lock:
+        _reports[report["id"]] = report
+        while len(_reports) > settings.profiling_max_reports:
+            _reports.popitem(last=False)
+
+
+def get_report(profile_id: str) -> Optional[dict]:
+    return _reports.get(profile_id)
+
+
+def list_reports() -> list[dict]:
+    with _reports_lock:
+        reports = list(_reports.values())
+    return [
+        {
+            "id": r["id"],
+            "method": r["method"],
+            "path": r["path"],
+            "duration_ms": r["duration_ms"],
+            "sql_count": r["sql_count"],
+        }
+        for r in reversed(reports)
+    ]
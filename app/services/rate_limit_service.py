@@ -0,0 +1,196 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+import math
+import threading
+import time
+from sqlalchemy import delete, select, update
+from app.config import settings
+from app.models.models import RateLimitBucket
+
+# ==========================================
+# TOKEN BUCKETS
+# ==========================================
+# Cada bucket tiene una capacidad (ráfaga máxima) y se rellena a un ritmo
+# constante. Una petición consume `cost` tokens; si no hay suficientes, se
+# rechaza y se calcula cuánto falta para que los haya (Retry-After).
+
+
+@dataclass(frozen=True)
+class BucketPolicy:
+    """Capacidad y ritmo de recarga de un bucket"""
+    name: str
+    capacity: float
+    refill_per_second: float
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    remaining: float
+    retry_after: float  # segundos hasta poder repetir (0 si se permitió)
+
+
+def refill(tokens: float, updated_at: float, now: float, policy: BucketPolicy) -> float:
+    """Tokens disponibles en `now` partiendo del estado guardado"""
+    elapsed = max(0.0, now - updated_at)
+    return min(policy.capacity, tokens + elapsed * policy.refill_per_second)
+
+
+def consume(tokens: float, cost: float, policy: BucketPolicy) -> RateLimitResult:
+    """Intenta consumir `cost` tokens de un bucket ya recargado"""
+    if tokens >= cost:
+        return RateLimitResult(True, tokens - cost, 0.0)
+    missing = cost - tokens
+    retry_after = missing / policy.refill_per_second if policy.refill_per_second > 0 else math.inf
+    return RateLimitResult(False, tokens, retry_after)
+
+
+# ==========================================
+# BACKEND EN MEMORIA (POR PROCESO)
+# ==========================================
+
+class MemoryBackend:
+    """
+    Buckets en memoria del proceso. Rápido, pero cada worker tiene los
+    suyos: con N workers el límite efectivo se multiplica por N.
+    """
+
+    def __init__(self, max_keys: int = 100_000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, policy: BucketPolicy, cost: float = 1) -> RateLimitResult:
+        now = self.clock()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (policy.capacity, now))
+            tokens = refill(tokens, updated_at, now, policy)
+            result = consume(tokens, cost, policy)
+            self._buckets[key] = (result.remaining, now)
+            self._buckets.move_to_end(key)
+            # Los buckets menos usados se descartan (equivalen a buckets llenos)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+# ==========================================
+# BACKEND EN BD (COMPARTIDO ENTRE WORKERS)
+# ==========================================
+
+class DatabaseBackend:
+    """
+    Buckets en la tabla rate_limit_buckets, compartidos por todos los
+    workers e instancias. Cada operación es una transacción corta que
+    bloquea la fila del bucket (SELECT ... FOR UPDATE en PostgreSQL).
+    """
+
+    def __init__(self, engine, clock=time.time):
+        self.engine = engine
+        self.clock = clock
+
+    def _insert_if_missing(self, conn, key: str, policy: BucketPolicy, now: float) -> None:
+        if conn.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        conn.execute(
+            insert(RateLimitBucket)
+            .values(key=key, tokens=policy.capacity, updated_at=now)
+            .on_conflict_do_nothing(index_elements=["key"])
+        )
+
+    def take(self, key: str, policy: BucketPolicy, cost: float = 1) -> RateLimitResult:
+        now = self.clock()
+        with self.engine.begin() as conn:
+            self._insert_if_missing(conn, key, policy, now)
+            tokens, updated_at = conn.execute(
+                select(RateLimitBucket.tokens, RateLimitBucket.updated_at)
+                .where(RateLimitBucket.key == key)
+                .with_for_update()
+            ).one()
+            tokens = refill(tokens, updated_at, now, policy)
+            result = consume(tokens, cost, policy)
+            conn.execute(
+                update(RateLimitBucket)
+                .where(RateLimitBucket.key == key)
+                .values(tokens=result.remaining, updated_at=now)
+            )
+        return result
+
+    def reset(self) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(delete(RateLimitBucket))
+
+
+# ==========================================
+# LIMITADOR
+# ==========================================
+
+def policies_for(endpoint_class: str) -> list[BucketPolicy]:
+    """
+    Buckets que se aplican a cada clase de endpoint.
+
+    - llm: ráfaga corta + cuota diaria (protege la cuota de Gemini)
+    - crud: ráfaga amplia, sin cuota diaria
+    """
+    if endpoint_class == "llm":
+        return [
+            BucketPolicy("llm", settings.rate_limit_llm_burst, settings.rate_limit_llm_per_minute / 60),
+            BucketPolicy("llm-day", settings.rate_limit_llm_per_day, settings.rate_limit_llm_per_day / 86400),
+        ]
+    if endpoint_class == "crud":
+        return [
+            BucketPolicy("crud", settings.rate_limit_crud_burst, settings.rate_limit_crud_per_minute / 60),
+        ]
+    raise ValueError(f"Clase de endpoint desconocida: {endpoint_class}")
+
+
+class RateLimiter:
+    """Aplica las políticas de una clase de endpoint sobre un backend"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def check(self, user_id: int, endpoint_class: str) -> RateLimitResult:
+        """
+        Consume un token de cada bucket de la clase para el usuario.
+
+        Si algún bucket lo rechaza, devuelve su Retry-After. Los buckets
+        anteriores ya consumidos no se devuelven: una petición rechazada
+        también cuenta, lo que frena a los clientes en bucle.
+        """
+        remaining = math.inf
+        for policy in policies_for(endpoint_class):
+            result = self.backend.take(f"{policy.name}:{user_id}", policy)
+            if not result.allowed:
+                return result
+            remaining = min(remaining, result.remaining)
+        return RateLimitResult(True, remaining, 0.0)
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Limitador del proceso, con el backend configurado en settings"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        # Las dependencias síncronas corren en el threadpool: sin el lock,
+        # dos peticiones simultáneas crearían limitadores (y buckets) distintos
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                if settings.rate_limit_backend == "database":
+                    from app.database import engine
+                    backend = DatabaseBackend(engine)
+                else:
+                    backend = MemoryBackend()
+                _rate_limiter = RateLimiter(backend)
+    return _rate_limiter
@@ -0,0 +1,275 @@
+from calendar import monthrange
+from datetime import datetime, timedelta
+from heapq import merge
+from typing import Iterator, Optional
+from sqlalchemy import or_, select, union_all
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.models import (
+    RecurrenceFrequency,
+    Task,
+    TaskArchive,
+    TaskPriority,
+    TaskSeries,
+    TaskStatus,
+)
+
+# ==========================================
+# EXPANSIÓN DE OCURRENCIAS
+# ==========================================
+# Una serie guarda sólo su regla (frecuencia, intervalo, días, inicio/fin).
+# Las ocurrencias de una ventana se calculan saltando directamente al
+# primer periodo de la ventana, sin recorrer la serie desde su inicio.
+
+
+def weekdays(series: TaskSeries) -> list[int]:
+    """Días de la semana de una serie semanal (0 = lunes)"""
+    if series.dias_semana:
+        return sorted(int(d) for d in series.dias_semana.split(","))
+    return [series.inicio.weekday()]
+
+
+def _daily(series: TaskSeries, start: datetime) -> Iterator[datetime]:
+    step = timedelta(days=series.intervalo)
+    # Primer paso >= start (división entera por arriba)
+    k = max(0, -((series.inicio - start) // step))
+    occurrence = series.inicio + k * step
+    while True:
+        yield occurrence
+        occurrence += step
+
+
+def _weekly(series: TaskSeries, start: datetime) -> Iterator[datetime]:
+    days = weekdays(series)
+    monday = series.inicio - timedelta(days=series.inicio.weekday())
+    week = max(0, (start - monday).days // 7)
+    week -= week % series.intervalo
+    while True:
+        for day in days:
+            occurrence = monday + timedelta(weeks=week, days=day)
+            if occurrence >= start:
+                yield occurrence
+        week += series.intervalo
+
+
+def _monthly(series: TaskSeries, start: datetime) -> Iterator[datetime]:
+    inicio = series.inicio
+    month = max(0, (start.year - inicio.year) * 12 + start.month - inicio.month)
+    month -= month % series.intervalo
+    while True:
+        year, month0 = divmod(inicio.month - 1 + month, 12)
+        year += inicio.year
+        # Los meses sin ese día (p. ej. 31) no tienen ocurrencia
+        if inicio.day <= monthrange(year, month0 + 1)[1]:
+            occurrence = inicio.replace(year=year, month=month0 + 1)
+            if occurrence >= start:
+                yield occurrence
+        month += series.intervalo
+
+
+_EXPANDERS = {
+    RecurrenceFrequency.DAILY: _daily,
+    RecurrenceFrequency.WEEKLY: _weekly,
+    RecurrenceFrequency.MONTHLY: _monthly,
+}
+
+
+def occurrences(series: TaskSeries, desde: datetime, hasta: datetime) -> Iterator[datetime]:
+    """
+    Ocurrencias de la serie en [desde, hasta), en orden.
+
+    Args:
+        series: Serie recurrente
+        desde: Inicio de la ventana (incluido)
+        hasta: Fin de la ventana (excluido)
+
+    Yields:
+        Fecha y hora de cada ocurrencia (también su fecha límite)
+    """
+    start = max(desde, series.inicio)
+    for occurrence in _EXPANDERS[series.frecuencia](series, start):
+        if occurrence >= hasta or (series.fin is not None and occurrence > series.fin):
+            return
+        yield occurrence
+
+
+def is_occurrence(series: TaskSeries, occurrence_at: datetime) -> bool:
+    return next(occurrences(series, occurrence_at, occurrence_at + timedelta(microseconds=1)), None) == occurrence_at
+
+# ==========================================
+# OCURRENCIAS VIRTUALES
+# ==========================================
+
+def _series_in_window(db: Session, user_id: int, desde: datetime, hasta: datetime,
+                      prioridad: Optional[TaskPriority] = None) -> list:
+    query = select(TaskSeries).where(
+        TaskSeries.user_id == user_id,
+        TaskSeries.inicio < hasta,
+        or_(TaskSeries.fin.is_(None), TaskSeries.fin >= desde)
+    )
+    if prioridad:
+        query = query.where(TaskSeries.prioridad == prioridad)
+    return db.execute(query).scalars().all()
+
+
+def _materialized(db: Session, series_ids: list, desde: datetime, hasta: datetime) -> set:
+    """(series_id, occurrence_at) ya guardadas en tasks o en tasks_archive"""
+    keys = union_all(*(
+        select(model.series_id, model.occurrence_at).where(
+            model.series_id.in_(series_ids),
+            model.occurrence_at >= desde,
+            model.occurrence_at < hasta
+        )
+        for model in (Task, TaskArchive)
+    ))
+    return {(row.series_id, row.occurrence_at) for row in db.execute(keys)}
+
+
+def virtual_values(series: TaskSeries, occurrence_at: datetime) -> dict:
+    """Campos de TaskResponse de una ocurrencia no guardada"""
+    return {
+        "id": None,
+        "user_id": series.user_id,
+        "titulo": series.titulo,
+        "descripcion": series.descripcion,
+        "estado": TaskStatus.PENDING,
+        "prioridad": series.prioridad,
+        "fecha_limite": occurrence_at,
+        "original_input": None,
+        "created_by_ai": False,
+        "created_at": series.created_at,
+        "updated_at": series.updated_at,
+        "completed_at": None,
+        "series_id": series.id,
+        "occurrence_at": occurrence_at,
+    }
+
+
+def virtual_occurrences(
+    db: Session,
+    user_id: int,
+    desde: datetime,
+    hasta: datetime,
+    prioridad: Optional[TaskPriority] = None,
+    first_only: bool = False,
+    limit: Optional[int] = None
+) -> list[dict]:
+    """
+    Ocurrencias pendientes y no guardadas de las series del usuario en
+    [desde, hasta), ordenadas por fecha límite.
+
+    Args:
+        db: Sesión de BD
+        user_id: Usuario
+        desde: Inicio de la ventana (incluido)
+        hasta: Fin de la ventana (excluido)
+        prioridad: Filtro opcional por prioridad de la serie
+        first_only: Sólo la primera ocurrencia pendiente de cada serie
+        limit: Máximo de ocurrencias (por defecto, settings.recurrence_max_occurrences)
+
+    Returns:
+        Dicts con los campos de TaskResponse (id = None)
+    """
+    if limit is None:
+        limit = settings.recurrence_max_occurrences
+
+    series_list = _series_in_window(db, user_id, desde, hasta, prioridad)
+    if not series_list:
+        return []
+    materialized = _materialized(db, [s.id for s in series_list], desde, hasta)
+
+    result = []
+    for series in series_list:
+        result += _pending_values(series, desde, hasta, materialized, 1 if first_only else limit)
+
+    result.sort(key=lambda values: values["fecha_limite"])
+    return result[:limit]
+
+
+def series_virtual_occurrences(
+    db: Session,
+    series: TaskSeries,
+    desde: datetime,
+    hasta: datetime,
+    limit: Optional[int] = None
+) -> list[dict]:
+    """
+    Ocurrencias pendientes y no guardadas de una sola serie en [desde, hasta),
+    en orden. Sólo expande esa serie: el tope no lo reparten las demás.
+
+    Args:
+        limit: Máximo de ocurrencias (por defecto, settings.recurrence_max_occurrences)
+    """
+    if limit is None:
+        limit = settings.recurrence_max_occurrences
+    materialized = _materialized(db, [series.id], desde, hasta)
+    return _pending_values(series, desde, hasta, materialized, limit)
+
+
+def _pending_values(series: TaskSeries, desde: datetime, hasta: datetime, materialized: set, limit: int) -> list[dict]:
+    """Hasta `limit` ocurrencias de la serie que no están en `materialized`"""
+    result = []
+    for occurrence in occurrences(series, desde, hasta):
+        if (series.id, occurrence) in materialized:
+            continue
+        result.append(virtual_values(series, occurrence))
+        if len(result) >= limit:
+            break
+    return result
+
+
+def virtual_rows(values: list[dict], fields: tuple) -> list[tuple]:
+    """Ocurrencias virtuales como tuplas en el orden de `fields`"""
+    return [tuple(v[field] for field in fields) for v in values]
+
+
+def merge_by_fecha_limite(rows, virtual: list, fields: tuple) -> list:
+    """
+    Mezcla filas de la BD y ocurrencias virtuales, ambas ya ordenadas por
+    fecha límite (las tareas sin fecha, al final).
+    """
+    index = fields.index("fecha_limite")
+
+    def key(row):
+        return (row[index] is None, row[index] or datetime.min)
+
+    return list(merge(rows, virtual, key=key))
+
+# ==========================================
+# MATERIALIZACIÓN
+# ==========================================
+
+def materialize(db: Session, series: TaskSeries, occurrence_at: datetime) -> Task:
+    """
+    Guarda una ocurrencia como tarea normal (para modificarla o completarla).
+    Si ya estaba guardada, devuelve esa tarea. No hace commit.
+
+    Raises:
+        ValueError: Si la fecha no es una ocurrencia de la serie
+    """
+    if not is_occurrence(series, occurrence_at):
+        raise ValueError("La fecha no corresponde a ninguna ocurrencia de la serie")
+
+    existing = db.query(Task).filter(Task.series_id == series.id, Task.occurrence_at == occurrence_at).first()
+    if existing is not None:
+        return existing
+
+    task = Task(
+        user_id=series.user_id,
+        titulo=series.titulo,
+        descripcion=series.descripcion,
+        estado=TaskStatus.PENDING,
+        prioridad=series.prioridad,
+        fecha_limite=occurrence_at,
+        created_by_ai=False,
+        series_id=series.id,
+        occurrence_at=occurrence_at
+    )
+    try:
+        # Savepoint: otra petición puede haberla guardado a la vez (índice único)
+        with db.begin_nested():
+            db.add(task)
+    except IntegrityError:
+        return db.query(Task).filter(Task.series_id == series.id, Task.occurrence_at == occurrence_at).one()
+    return task
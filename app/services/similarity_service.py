@@ -0,0 +1,204 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+import math
+import re
+import threading
+import unicodedata
+from app.config import settings
+from app.models.models import ACTIVE_STATUSES
+from app.services.cache_service import ALL_KEYS, subscribe
+
+# ==========================================
+# DETECCIÓN DE DUPLICADOS
+# ==========================================
+# Índice invertido de trigramas de caracteres por usuario, sobre el título y
+# el texto original de sus tareas activas. La similitud es el índice de
+# Jaccard entre conjuntos de trigramas: robusta a mayúsculas, acentos,
+# puntuación y pequeños cambios de redacción. Cada consulta sólo recorre
+# las listas de los trigramas más raros del texto buscado.
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sin acentos ni puntuación, espacios simples"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def trigrams(text: str) -> frozenset:
+    """Trigramas de caracteres del texto normalizado (con bordes de palabra)"""
+    normalized = normalize(text)
+    if not normalized:
+        return frozenset()
+    padded = f"  {normalized} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+@dataclass
+class Match:
+    task_id: int
+    score: float
+
+
+class UserIndex:
+    """Índice de trigramas de las tareas activas de un usuario"""
+
+    def __init__(self):
+        self._postings: dict[str, set] = {}       # trigrama -> documentos
+        self._docs: dict[tuple, frozenset] = {}   # (task_id, campo) -> trigramas
+        self._task_docs: dict[int, list] = {}     # task_id -> documentos
+
+    def add(self, task_id: int, texts: Iterable[Optional[str]]) -> None:
+        self.remove(task_id)
+        for field, text in enumerate(texts):
+            grams = trigrams(text) if text else frozenset()
+            if not grams:
+                continue
+            doc = (task_id, field)
+            self._docs[doc] = grams
+            self._task_docs.setdefault(task_id, []).append(doc)
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(doc)
+
+    def remove(self, task_id: int) -> None:
+        for doc in self._task_docs.pop(task_id, ()):
+            for gram in self._docs.pop(doc):
+                posting = self._postings.get(gram)
+                if posting is not None:
+                    posting.discard(doc)
+                    if not posting:
+                        del self._postings[gram]
+
+    def best_match(self, text: str, threshold: float = 0.0) -> Optional[Match]:
+        """
+        Tarea más parecida al texto (máximo sobre título y texto original).
+
+        Con threshold > 0 se aplica un filtro por prefijo: un documento con
+        Jaccard >= threshold comparte al menos ceil(threshold * |q|) trigramas
+        con la consulta, así que contiene alguno de los
+        |q| - ceil(threshold * |q|) + 1 trigramas más raros. Sólo esos
+        candidatos se comparan, y los trigramas frecuentes no se recorren.
+        """
+        query = trigrams(text)
+        if not query:
+            return None
+
+        ordered = sorted(query, key=lambda gram: len(self._postings.get(gram, ())))
+        prefix = len(query) - math.ceil(threshold * len(query)) + 1 if threshold > 0 else len(query)
+        candidates = set()
+        for gram in ordered[:prefix]:
+            candidates.update(self._postings.get(gram, ()))
+
+        # Filtro por longitud: Jaccard >= t exige t*|q| <= |d| <= |q|/t
+        min_len = threshold * len(query)
+        max_len = len(query) / threshold if threshold > 0 else math.inf
+
+        best = None
+        for doc in candidates:
+            grams = self._docs[doc]
+            if not min_len <= len(grams) <= max_len:
+                continue
+            shared = len(query & grams)
+            score = shared / (len(query) + len(grams) - shared)
+            if best is None or score > best.score:
+                best = Match(doc[0], score)
+        return best
+
+    def __len__(self) -> int:
+        return len(self._task_docs)
+
+
+class SimilarityIndex:
+    """
+    Índices por usuario, construidos bajo demanda con `loader` y
+    actualizados de forma incremental en cada alta, cambio o baja.
+
+    Se suscribe al namespace "similarity" del bus de invalidación: cuando
+    otro worker modifica las tareas de un usuario, su índice se descarta
+    y se reconstruye en la siguiente consulta.
+    """
+
+    def __init__(self, max_users: int):
+        self.max_users = max_users
+        self._indexes: "OrderedDict[int, UserIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, user_id: int, loader: Callable[[], Iterable[tuple]]) -> UserIndex:
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._indexes.move_to_end(user_id)
+                return index
+
+        index = UserIndex()
+        for task_id, *texts in loader():
+            index.add(task_id, texts)
+
+        with self._lock:
+            self._indexes[user_id] = index
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+        return index
+
+    def find_duplicate(self, user_id: int, text: str, loader: Callable[[], Iterable[tuple]],
+                       threshold: Optional[float] = None) -> Optional[Match]:
+        """
+        Busca una tarea activa del usuario casi idéntica al texto.
+
+        Args:
+            user_id: Usuario
+            text: Texto a comparar (p. ej. el input de create-smart)
+            loader: Devuelve (task_id, titulo, original_input) de las tareas
+                activas, para construir el índice si no está en memoria
+            threshold: Similitud mínima (por defecto, settings.duplicate_similarity_threshold)
+
+        Returns:
+            La coincidencia más parecida si supera el umbral, o None
+        """
+        if threshold is None:
+            threshold = settings.duplicate_similarity_threshold
+        index = self._get(user_id, loader)
+        with self._lock:
+            match = index.best_match(text, threshold)
+        if match is not None and match.score >= threshold:
+            return match
+        return None
+
+    def upsert_task(self, user_id: int, task_id: int, texts: Iterable[Optional[str]]) -> None:
+        """Añade o reindexa una tarea activa (sólo si el índice está cargado)"""
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                index.add(task_id, texts)
+
+    def remove_task(self, user_id: int, task_id: int) -> None:
+        """Quita una tarea (borrada, completada o cancelada)"""
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                index.remove(task_id)
+
+    def sync_task(self, task) -> None:
+        """Tras crear o modificar una tarea: la reindexa si sigue activa y si no, la quita"""
+        if task.estado in ACTIVE_STATUSES:
+            self.upsert_task(task.user_id, task.id, (task.titulo, task.original_input))
+        else:
+            self.remove_task(task.user_id, task.id)
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            if str(key) == ALL_KEYS:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(int(key), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+
+
+similarity_index = SimilarityIndex(max_users=settings.cache_max_entries)
+subscribe("similarity", similarity_index)
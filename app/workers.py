@@ -0,0 +1,24 @@
+from uvicorn.workers import UvicornWorker as BaseUvicornWorker
+
+# ==========================================
+# WORKER DE GUNICORN
+# ==========================================
+
+class UvicornWorker(BaseUvicornWorker):
+    """
+    Worker uvicorn para gunicorn con uvloop (bucle de eventos) y httptools
+    (parser HTTP). keepalive, backlog y max_requests (+ jitter) se toman de
+    la configuración de gunicorn (gunicorn.conf.py).
+
+    WebSockets (/ws/tasks) sin permessage-deflate: los eventos son JSON de
+    unas decenas de bytes y el estado de zlib costaba ~90 KB por conexión
+    inactiva. Los mensajes del cliente se ignoran, así que se limitan a 4 KB.
+    """
+
+    CONFIG_KWARGS = {
+        "loop": "uvloop",
+        "http": "httptools",
+        "lifespan": "on",
+        "ws_per_message_deflate": False,
+        "ws_max_size": 4096,
+    }
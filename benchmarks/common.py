@@ -0,0 +1,118 @@
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+
+# ==========================================
+# MEDICIÓN
+# ==========================================
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Percentil por el método del rango más cercano (valores ya ordenados)"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: list, elapsed: float, **extra) -> dict:
+    """
+    Resume una serie de latencias (en segundos) medidas durante `elapsed`.
+
+    Returns:
+        Dict con n, ops_per_sec y latencias en ms (mean, p50, p95, p99)
+    """
+    ordered = sorted(latencies)
+    result = {
+        "n": len(ordered),
+        "ops_per_sec": round(len(ordered) / elapsed, 2) if elapsed > 0 else 0.0,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 4),
+    }
+    result.update(extra)
+    return result
+
+
+def measure(fn, iterations: int, warmup: int = 0, **extra) -> dict:
+    """
+    Ejecuta `fn` `iterations` veces (tras `warmup` ejecuciones descartadas)
+    y resume sus latencias.
+    """
+    for _ in range(warmup):
+        fn()
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - start, **extra)
+
+
+# ==========================================
+# RESULTADOS
+# ==========================================
+
+# Dirección de cada métrica al comparar ejecuciones
+HIGHER_IS_BETTER = {"ops_per_sec", "rows_per_sec", "mb_per_sec", "speedup"}
+LOWER_IS_BETTER = {"mean_ms", "p50_ms", "p95_ms", "p99_ms", "encode_ms", "bytes", "bytes_per_conn", "ratio_vs_baseline", "peak_kb"}
+
+
+def environment() -> dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def save_results(path: str, results: dict, meta: dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2, sort_keys=True)
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    Compara dos ejecuciones y devuelve las regresiones que superan el umbral.
+
+    Args:
+        current: Resultados actuales ({benchmark: {métrica: valor}})
+        baseline: Resultados de referencia
+        threshold: Variación relativa tolerada (0.10 = 10%)
+
+    Returns:
+        Lista de dicts con benchmark, métrica, valor de referencia, actual y variación
+    """
+    regressions = []
+    for name, base_metrics in sorted(baseline.items()):
+        metrics = current.get(name)
+        if metrics is None:
+            continue
+        for metric, base_value in base_metrics.items():
+            value = metrics.get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(base_value, (int, float)):
+                continue
+            if base_value == 0:
+                continue
+            change = (value - base_value) / base_value
+            if (metric in HIGHER_IS_BETTER and change < -threshold) or \
+                    (metric in LOWER_IS_BETTER and change > threshold):
+                regressions.append({
+                    "benchmark": name,
+                    "metric": metric,
+                    "baseline": base_value,
+                    "current": value,
+                    "change": round(change, 4),
+                })
+    return regressions
@@ -0,0 +1,90 @@
+import time
+from datetime import datetime, timedelta
+from google import genai
+from google.genai import types
+from app.config import settings
+from app.services import gemini_service
+from app.services.metrics_service import llm_tokens_total
+from benchmarks.common import summarize
+from benchmarks.gemini_stub import GeminiStubServer
+
+# ==========================================
+# CACHÉ DE CONTEXTO DE GEMINI
+# ==========================================
+# Llamadas de create-smart y suggest-next contra un stub cuya latencia
+# crece con los tokens de entrada no cacheados, con las instrucciones como
+# system_instruction y como contexto cacheado. Por cada llamada se mide la
+# latencia y los tokens de entrada que la API tiene que procesar (los del
+# prompt menos los leídos de la caché).
+#
+# Las instrucciones actuales no llegan al mínimo de la API para cachearse,
+# así que aquí se baja settings.gemini_context_cache_min_tokens a 0.
+
+PREFILL_MS_PER_1K_TOKENS = 200.0
+SUGGEST_TASKS = 20
+
+
+def _tasks() -> list:
+    base = datetime.now() + timedelta(days=1)
+    return [
+        {
+            "id": i,
+            "titulo": f"Tarea de prueba {i}",
+            "estado": "pending",
+            "prioridad": ("low", "medium", "high", "urgent")[i % 4],
+            "fecha_limite": base + timedelta(hours=i),
+        }
+        for i in range(1, SUGGEST_TASKS + 1)
+    ]
+
+
+def _input_tokens(operation: str) -> tuple[float, float]:
+    """(prompt, cacheados) acumulados de la operación en todos los modelos"""
+    prompt = cached = 0.0
+    for model in gemini_service.model_router.models:
+        prompt += llm_tokens_total.get(model=model, operation=operation, type="prompt")
+        cached += llm_tokens_total.get(model=model, operation=operation, type="cached")
+    return prompt, cached
+
+
+def _measure(operation: str, call, iterations: int) -> tuple[list, float]:
+    prompt_before, cached_before = _input_tokens(operation)
+    latencies = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - t0)
+    prompt_after, cached_after = _input_tokens(operation)
+    uncached = (prompt_after - prompt_before) - (cached_after - cached_before)
+    return latencies, uncached / iterations
+
+
+def run(args) -> dict:
+    iterations = 10 if args.quick else 50
+    tasks = _tasks()
+    operations = {
+        "extract": lambda: gemini_service.extract_task_data("Llamar al dentista mañana a las 10am"),
+        "suggest": lambda: gemini_service.suggest_next_task(tasks),
+    }
+
+    original = (gemini_service.client, gemini_service.context_cache, settings.gemini_context_cache_min_tokens)
+    results = {}
+    with GeminiStubServer(latency_ms=args.llm_latency_ms, prefill_ms_per_1k_tokens=PREFILL_MS_PER_1K_TOKENS) as stub:
+        gemini_service.client = genai.Client(
+            api_key=settings.gemini_api_key, http_options=types.HttpOptions(base_url=stub.url)
+        )
+        try:
+            for mode, min_tokens in (("system_instruction", 10 ** 9), ("cached", 0)):
+                settings.gemini_context_cache_min_tokens = min_tokens
+                gemini_service.context_cache = gemini_service.ContextCache()
+                for operation, call in operations.items():
+                    call()  # calentamiento (y creación del contexto)
+                    latencies, input_tokens = _measure(operation, call, iterations)
+                    results[f"context_cache.{operation}.{mode}"] = summarize(
+                        latencies, sum(latencies),
+                        input_tokens_per_call=round(input_tokens, 1),
+                        prefill_ms_per_1k_tokens=PREFILL_MS_PER_1K_TOKENS,
+                    )
+        finally:
+            gemini_service.client, gemini_service.context_cache, settings.gemini_context_cache_min_tokens = original
+    return results
@@ -0,0 +1,104 @@
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select
+from app.models.models import User, Task, TaskStatus, TaskPriority
+from app.services.auth_service import hash_password
+
+# ==========================================
+# GENERADOR DE DATOS CON SEMILLA
+# ==========================================
+
+WORDS = (
+    "llamar revisar preparar enviar comprar reunión informe presupuesto "
+    "dentista cliente proyecto factura equipo presentación contrato correo "
+    "documentación despliegue entrevista viaje"
+).split()
+
+STATUS_WEIGHTS = (
+    (TaskStatus.PENDING, 50),
+    (TaskStatus.IN_PROGRESS, 15),
+    (TaskStatus.COMPLETED, 30),
+    (TaskStatus.CANCELLED, 5),
+)
+
+BENCH_PASSWORD = "benchmark-password"
+
+
+def _title(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))).capitalize()
+
+
+def generate_tasks(user_id: int, count: int, rng: random.Random, now: datetime) -> list:
+    """
+    Genera `count` filas de tareas para un usuario con una mezcla realista
+    de estados, prioridades y fechas límite (pasadas, próximas y nulas).
+    """
+    statuses = [s for s, _ in STATUS_WEIGHTS]
+    weights = [w for _, w in STATUS_WEIGHTS]
+    priorities = list(TaskPriority)
+
+    rows = []
+    for _ in range(count):
+        estado = rng.choices(statuses, weights)[0]
+        fecha_limite = None
+        if rng.random() < 0.8:
+            fecha_limite = now + timedelta(minutes=rng.randint(-60 * 24 * 30, 60 * 24 * 60))
+        created_by_ai = rng.random() < 0.4
+        rows.append({
+            "user_id": user_id,
+            "titulo": _title(rng),
+            "descripcion": _title(rng) if rng.random() < 0.5 else None,
+            "estado": estado,
+            "prioridad": rng.choice(priorities),
+            "fecha_limite": fecha_limite,
+            "original_input": _title(rng) if created_by_ai else None,
+            "created_by_ai": created_by_ai,
+            "completed_at": now if estado == TaskStatus.COMPLETED else None,
+        })
+    return rows
+
+
+def seed(engine, tasks_per_user: list, seed: int = 42, batch_size: int = 5000) -> list:
+    """
+    Crea un usuario por cada tamaño de `tasks_per_user` con ese número de
+    tareas. Los datos son deterministas para una misma semilla.
+
+    Args:
+        engine: Engine de SQLAlchemy (con las tablas ya creadas)
+        tasks_per_user: Ej. [10, 1_000, 100_000]
+        seed: Semilla del generador
+        batch_size: Filas por INSERT
+
+    Returns:
+        Lista de dicts {"id", "email", "tasks"} de los usuarios creados
+    """
+    rng = random.Random(seed)
+    now = datetime(2030, 1, 1, 9, 0)
+    password_hash = hash_password(BENCH_PASSWORD)
+
+    users = []
+    with engine.begin() as conn:
+        for i, count in enumerate(tasks_per_user):
+            email = f"bench-{seed}-{i}-{count}@example.com"
+            user_id = conn.execute(
+                insert(User).values(email=email, password_hash=password_hash, nombre=f"Bench {count}")
+                .returning(User.id)
+            ).scalar_one()
+
+            for offset in range(0, count, batch_size):
+                rows = generate_tasks(user_id, min(batch_size, count - offset), rng, now)
+                conn.execute(insert(Task), rows)
+
+            users.append({"id": user_id, "email": email, "tasks": count})
+    return users
+
+
+def task_ids(engine, user_id: int, estados: list = None, limit: int = None) -> list:
+    """IDs de tareas de un usuario (para escenarios de get/update/complete)"""
+    query = select(Task.id).where(Task.user_id == user_id).order_by(Task.id)
+    if estados:
+        query = query.where(Task.estado.in_(estados))
+    if limit:
+        query = query.limit(limit)
+    with engine.connect() as conn:
+        return list(conn.execute(query).scalars())
@@ -0,0 +1,68 @@
+import random
+import time
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+from app.jobs.daily_digest import build_digests
+from app.models.models import TaskDigest
+from app.services.digest_service import score_rows, top_k_per_user
+from benchmarks.common import measure
+
+# ==========================================
+# RESUMEN DIARIO (PUNTUACIÓN VECTORIZADA)
+# ==========================================
+# Coste de puntuar y elegir las k mejores de N tareas con NumPy (filas
+# sintéticas, tal como las devuelve el escaneo) y del job completo sobre
+# la BD sembrada, lectura incluida.
+
+SCORING_SIZES = (100_000, 1_000_000)
+TASKS_PER_USER = 100
+
+
+def synthetic_rows(count: int, now: float, seed: int = 42) -> list:
+    """Filas de scan_columns(): user_id, id, prioridad, en curso, fecha límite, creación"""
+    rng = random.Random(seed)
+    return [
+        (
+            i // TASKS_PER_USER,
+            i,
+            rng.randrange(4),
+            rng.random() < 0.2,
+            now + rng.uniform(-5, 30) * 86400 if rng.random() < 0.6 else None,
+            now - rng.uniform(0, 90) * 86400,
+        )
+        for i in range(count)
+    ]
+
+
+def run(args) -> dict:
+    from app.database import engine
+
+    results = {}
+    now = time.time()
+    iterations = 1 if args.quick else 3
+
+    for size in SCORING_SIZES[:1] if args.quick else SCORING_SIZES:
+        rows = synthetic_rows(size, now, args.seed)
+
+        def score():
+            user_ids, task_ids, scores = score_rows(rows, now)
+            top_k_per_user(user_ids, task_ids, scores, 5)
+
+        result = measure(score, iterations, warmup=1)
+        result["rows_per_sec"] = round(size / (result["mean_ms"] / 1000), 2)
+        results[f"digest.score.{size}"] = result
+
+    with Session(engine) as db:
+        start = time.perf_counter()
+        summary = build_digests(db)
+        elapsed = time.perf_counter() - start
+        results["digest.job"] = {
+            "tareas": summary["tareas"],
+            "usuarios": summary["usuarios"],
+            "mean_ms": round(elapsed * 1000, 2),
+            "rows_per_sec": round(summary["tareas"] / elapsed, 2),
+        }
+        # suggest-next de las demás suites no debe servirse del resumen
+        db.execute(delete(TaskDigest))
+        db.commit()
+    return results
@@ -0,0 +1,104 @@
+import asyncio
+import time
+import tracemalloc
+import httpx
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from app.api.responses import EXPORT_ENCODERS, TASK_RESPONSE_COLUMNS
+from app.config import settings
+from app.models.models import Task
+from benchmarks.load import auth_headers
+
+# ==========================================
+# EXPORTACIÓN EN STREAMING E IMPORTACIÓN
+# ==========================================
+# Throughput de GET /tasks/export (por la app ASGI, de extremo a extremo)
+# y pico de memoria del codificador leyendo de la BD por lotes: el pico
+# debe depender del tamaño de lote, no del número de filas. La importación
+# se mide subiendo a POST /tasks/import lo que se acaba de exportar.
+
+FORMATS = ("jsonl", "csv")
+
+
+async def _stream(client: httpx.AsyncClient, headers: dict, export_format: str) -> int:
+    size = 0
+    async with client.stream("GET", f"/tasks/export?format={export_format}", headers=headers) as response:
+        async for chunk in response.aiter_bytes():
+            size += len(chunk)
+    return size
+
+
+async def _import(client: httpx.AsyncClient, headers: dict, export_format: str, content: bytes) -> dict:
+    start = time.perf_counter()
+    response = await client.post(
+        "/tasks/import", headers=headers, files={"file": (f"tasks.{export_format}", content)}
+    )
+    elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    return {
+        "rows_per_sec": round(response.json()["importadas"] / elapsed, 2),
+        "mb_per_sec": round(len(content) / elapsed / 1e6, 2),
+    }
+
+
+async def _throughput(user: dict, runs: int) -> dict:
+    from app.main import app
+
+    results = {}
+    headers = auth_headers(user["email"])
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for export_format in FORMATS:
+            await _stream(client, headers, export_format)  # calentamiento
+            start = time.perf_counter()
+            for _ in range(runs):
+                size = await _stream(client, headers, export_format)
+            elapsed = (time.perf_counter() - start) / runs
+            results[f"export.{export_format}.{user['tasks']}"] = {
+                "rows_per_sec": round(user["tasks"] / elapsed, 2),
+                "mb_per_sec": round(size / elapsed / 1e6, 2),
+                "bytes": size,
+            }
+
+        # Se exporta todo antes de importar nada: cada importación añade filas
+        exported = {
+            export_format: (await client.get(f"/tasks/export?format={export_format}", headers=headers)).content
+            for export_format in FORMATS
+        }
+        for export_format, content in exported.items():
+            results[f"import.{export_format}.{user['tasks']}"] = await _import(client, headers, export_format, content)
+    return results
+
+
+def _peak_memory(engine, user: dict, export_format: str) -> int:
+    """Pico de memoria (bytes) de codificar toda la exportación por lotes"""
+    query = select(*TASK_RESPONSE_COLUMNS).where(Task.user_id == user["id"]).order_by(Task.id)
+    with Session(engine) as db:
+        tracemalloc.start()
+        result = db.execute(query, execution_options={"yield_per": settings.export_batch_size})
+        for _ in EXPORT_ENCODERS[export_format](result.partitions()):
+            pass
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return peak
+
+
+def run(args) -> dict:
+    from app.database import engine
+
+    user = max(args.users, key=lambda u: u["tasks"])
+    with Session(engine) as db:
+        last_id = db.execute(select(func.max(Task.id))).scalar()
+    try:
+        results = asyncio.run(_throughput(user, 1 if args.quick else 3))
+    finally:
+        # Deja la BD como estaba para las demás suites
+        with Session(engine) as db:
+            db.execute(delete(Task).where(Task.id > last_id))
+            db.commit()
+
+    # Con el usuario más pequeño y el más grande: el pico debe ser similar
+    for sized_user in (min(args.users, key=lambda u: u["tasks"]), user):
+        for export_format in FORMATS:
+            peak = _peak_memory(engine, sized_user, export_format)
+            results.setdefault(f"export.{export_format}.{sized_user['tasks']}", {})["peak_kb"] = round(peak / 1024, 1)
+    return results
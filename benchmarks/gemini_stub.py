@@ -0,0 +1,303 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==========================================
+# SERVIDOR GEMINI SIMULADO
+# ==========================================
+# Responde a POST /{version}/models/{model}:generateContent con el formato
+# de la API de Gemini, tras una latencia configurable. Para usarlo desde la
+# app basta con GEMINI_BASE_URL=http://127.0.0.1:{port}.
+#
+# También implementa los contextos cacheados (POST, PATCH y DELETE de
+# /{version}/cachedContents): una llamada con cachedContent no paga el
+# tiempo de procesado de esos tokens (prefill_ms_per_1k_tokens) y los
+# devuelve en cachedContentTokenCount, como la API.
+
+TASK_ID_RE = re.compile(r'"id":\s*(\d+)')
+TTL_RE = re.compile(r"^(\d+(?:\.\d+)?)s$")
+
+
+class StubState:
+    """Configuración y contadores del stub (compartidos entre threads)"""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 failing_models: tuple = (), prefill_ms_per_1k_tokens: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        # Modelos que siempre responden 503 (simula la caída de un modelo)
+        self.failing_models = set(failing_models)
+        # Latencia extra por cada 1000 tokens de entrada no cacheados
+        self.prefill_ms_per_1k_tokens = prefill_ms_per_1k_tokens
+        self.requests: dict[str, int] = {}
+        # name -> {"model", "text", "tokens", "expires_at"}
+        self.caches: dict[str, dict] = {}
+        self.cache_operations: dict[str, int] = {}  # create, update, delete
+        self.cached_calls = 0
+        self._next_cache = 0
+        self._lock = threading.Lock()
+
+    def count(self, model: str) -> None:
+        with self._lock:
+            self.requests[model] = self.requests.get(model, 0) + 1
+
+    def count_cache_operation(self, operation: str) -> None:
+        with self._lock:
+            self.cache_operations[operation] = self.cache_operations.get(operation, 0) + 1
+
+    def create_cache(self, model: str, text: str, ttl_seconds: float) -> str:
+        with self._lock:
+            self._next_cache += 1
+            name = f"cachedContents/stub-{self._next_cache}"
+            self.caches[name] = {
+                "model": model,
+                "text": text,
+                "tokens": _tokens(text),
+                "expires_at": time.time() + ttl_seconds,
+            }
+        self.count_cache_operation("create")
+        return name
+
+    def cache(self, name: str):
+        """Contexto cacheado vigente (None si no existe o caducó)"""
+        with self._lock:
+            cache = self.caches.get(name)
+            if cache is not None and cache["expires_at"] <= time.time():
+                del self.caches[name]
+                return None
+            return cache
+
+    def delete_cache(self, name: str) -> None:
+        with self._lock:
+            self.caches.pop(name, None)
+        self.count_cache_operation("delete")
+
+    def use_cache(self, name: str, model: str):
+        """Contexto cacheado para una llamada a `model` (None si no vale)"""
+        cache = self.cache(name)
+        if cache is None or cache["model"] != model:
+            return None
+        with self._lock:
+            self.cached_calls += 1
+        return cache
+
+
+def _tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def _parts_text(content: dict) -> str:
+    return "\n".join(part.get("text", "") for part in content.get("parts", []))
+
+
+def _request_text(body: dict) -> str:
+    return "\n".join(_parts_text(content) for content in body.get("contents", []))
+
+
+def _ttl_seconds(body: dict) -> float:
+    match = TTL_RE.match(str(body.get("ttl", "3600s")))
+    return float(match.group(1)) if match else 3600.0
+
+
+def _expire_time(cache: dict) -> str:
+    return datetime.fromtimestamp(cache["expires_at"], timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _cache_resource(name: str, cache: dict) -> dict:
+    return {
+        "name": name,
+        "model": f"models/{cache['model']}",
+        "expireTime": _expire_time(cache),
+        "usageMetadata": {"totalTokenCount": cache["tokens"]},
+    }
+
+
+def build_reply(text: str) -> dict:
+    """Genera una respuesta plausible según el tipo de prompt recibido"""
+    if "Texto del usuario:" in text:
+        user_input = text.rsplit("Texto del usuario:", 1)[1].strip()
+        fecha = (datetime.now() + timedelta(days=1)).replace(hour=10, minute=0, second=0, microsecond=0)
+        return {
+            "titulo": user_input[:50] or "Tarea",
+            "descripcion": None,
+            "fecha_limite": fecha.isoformat(),
+            "prioridad": "urgent" if "urgente" in user_input.lower() else "medium",
+        }
+
+    match = TASK_ID_RE.search(text)
+    task_id = int(match.group(1)) if match else None
+    return {
+        "sugerencia": f"Te recomiendo empezar por la tarea {task_id}",
+        "task_id": task_id,
+    }
+
+
+def make_handler(state: StubState):
+    class GeminiStubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, payload: dict) -> None:
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_error(self, status: int, message: str, reason: str) -> None:
+            self._send_json(status, {"error": {"code": status, "message": message, "status": reason}})
+
+        def _read_body(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def _cache_name(self) -> str:
+            return "cachedContents/" + self.path.split("?", 1)[0].rsplit("/cachedContents/", 1)[-1]
+
+        def do_POST(self):
+            body = self._read_body()
+            if self.path.split("?", 1)[0].endswith("/cachedContents"):
+                self._create_cache(body)
+            else:
+                self._generate_content(body)
+
+        def do_PATCH(self):
+            body = self._read_body()
+            name = self._cache_name()
+            cache = state.cache(name)
+            if cache is None:
+                self._send_error(404, f"CachedContent not found: {name}", "NOT_FOUND")
+                return
+            cache["expires_at"] = time.time() + _ttl_seconds(body)
+            state.count_cache_operation("update")
+            self._send_json(200, _cache_resource(name, cache))
+
+        def do_DELETE(self):
+            self._read_body()
+            state.delete_cache(self._cache_name())
+            self._send_json(200, {})
+
+        def _create_cache(self, body: dict) -> None:
+            model = body.get("model", "").removeprefix("models/")
+            text = _parts_text(body.get("systemInstruction") or {})
+            name = state.create_cache(model, text, _ttl_seconds(body))
+            self._send_json(200, _cache_resource(name, state.cache(name)))
+
+        def _generate_content(self, body: dict) -> None:
+            model = self.path.rsplit("/models/", 1)[-1].split(":", 1)[0]
+            state.count(model)
+
+            # Instrucciones: del contexto cacheado (ya procesadas) o de la petición
+            cached_tokens = 0
+            if body.get("cachedContent"):
+                cache = state.use_cache(body["cachedContent"], model)
+                if cache is None:
+                    self._send_error(403, "CachedContent not found (or permission denied)", "PERMISSION_DENIED")
+                    return
+                cached_tokens = cache["tokens"]
+                instructions = cache["text"]
+            else:
+                instructions = _parts_text(body.get("systemInstruction") or {})
+
+            text = _request_text(body)
+            prompt_tokens = _tokens(instructions) + _tokens(text)
+
+            delay = state.latency_ms + random.uniform(0, state.jitter_ms)
+            delay += state.prefill_ms_per_1k_tokens * (prompt_tokens - cached_tokens) / 1000
+            if delay > 0:
+                time.sleep(delay / 1000)
+
+            if model in state.failing_models or (state.error_rate and random.random() < state.error_rate):
+                self._send_error(503, "stub overloaded", "UNAVAILABLE")
+                return
+
+            reply = json.dumps(build_reply(text), ensure_ascii=False)
+            usage = {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": _tokens(reply),
+                "totalTokenCount": prompt_tokens + _tokens(reply),
+            }
+            if cached_tokens:
+                usage["cachedContentTokenCount"] = cached_tokens
+            self._send_json(200, {
+                "candidates": [{
+                    "content": {"role": "model", "parts": [{"text": reply}]},
+                    "finishReason": "STOP",
+                }],
+                "usageMetadata": usage,
+                "modelVersion": model,
+            })
+
+    return GeminiStubHandler
+
+
+class GeminiStubServer:
+    """
+    Servidor stub en un thread en segundo plano.
+
+    Uso:
+        with GeminiStubServer(latency_ms=300) as stub:
+            os.environ["GEMINI_BASE_URL"] = stub.url
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **state_kwargs):
+        self.state = StubState(**state_kwargs)
+        self.server = ThreadingHTTPServer((host, port), make_handler(self.state))
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "GeminiStubServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor Gemini simulado")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--fail-model", action="append", default=[], help="Modelo que siempre responde 503")
+    parser.add_argument("--prefill-ms-per-1k-tokens", type=float, default=0.0,
+                        help="Latencia extra por cada 1000 tokens de entrada no cacheados")
+    args = parser.parse_args()
+
+    stub = GeminiStubServer(
+        args.host, args.port,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        failing_models=args.fail_model, prefill_ms_per_1k_tokens=args.prefill_ms_per_1k_tokens
+    )
+    print(f"Gemini stub escuchando en {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import asyncio
+import itertools
+import random
+import time
+import httpx
+from app.models.models import TaskStatus
+from app.services.auth_service import create_access_token
+from benchmarks.common import summarize
+from benchmarks.data import task_ids
+
+# ==========================================
+# ESCENARIOS DE CARGA (CLIENTE ASGI EN PROCESO)
+# ==========================================
+
+
+async def run_scenario(client: httpx.AsyncClient, make_request, total: int, concurrency: int) -> dict:
+    """
+    Lanza `total` peticiones con `concurrency` workers concurrentes.
+
+    Args:
+        client: Cliente httpx contra la app ASGI
+        make_request: Función (client, i) -> coroutine que devuelve la respuesta
+        total: Número de peticiones
+        concurrency: Workers concurrentes
+
+    Returns:
+        Resumen de latencias, throughput y errores (status >= 400)
+    """
+    counter = itertools.count()
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while True:
+            i = next(counter)
+            if i >= total:
+                return
+            t0 = time.perf_counter()
+            response = await make_request(client, i)
+            latencies.append(time.perf_counter() - t0)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start, errors=errors)
+
+
+def auth_headers(email: str) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+
+async def run_async(args) -> dict:
+    from app.main import app
+    from app.database import engine
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    total = args.requests
+    concurrency = args.concurrency
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # GET /tasks para cada tamaño de backlog
+        for user in args.users:
+            headers = auth_headers(user["email"])
+            # Menos repeticiones cuanto mayor es el backlog
+            list_total = max(5, min(total, 100_000 // max(1, user["tasks"])))
+            results[f"load.list.{user['tasks']}"] = await run_scenario(
+                client,
+                lambda c, i: c.get("/tasks/", headers=headers),
+                list_total, concurrency
+            )
+
+        # Escenarios por tarea sobre el usuario de tamaño intermedio
+        user = args.users[len(args.users) // 2]
+        headers = auth_headers(user["email"])
+        ids = task_ids(engine, user["id"])
+        rng = random.Random(args.seed)
+
+        results["load.get"] = await run_scenario(
+            client,
+            lambda c, i: c.get(f"/tasks/{rng.choice(ids)}", headers=headers),
+            total, concurrency
+        )
+        results["load.update"] = await run_scenario(
+            client,
+            lambda c, i: c.put(f"/tasks/{rng.choice(ids)}", json={"prioridad": "high"}, headers=headers),
+            total, concurrency
+        )
+
+        # Cada tarea sólo puede completarse una vez: se usan IDs distintos
+        active_ids = task_ids(engine, user["id"], estados=[TaskStatus.PENDING, TaskStatus.IN_PROGRESS])
+        pending = rng.sample(active_ids, min(total, len(active_ids)))
+        results["load.complete"] = await run_scenario(
+            client,
+            lambda c, i: c.patch(f"/tasks/{pending[i]}/complete", headers=headers),
+            len(pending), concurrency
+        )
+
+        # Endpoints con LLM contra el stub de Gemini
+        llm_total = max(1, total // 10)
+        results["load.create_smart"] = await run_scenario(
+            client,
+            lambda c, i: c.post(
+                "/tasks/create-smart",
+                json={"input": f"Revisar el informe número {i} mañana a las 10"},
+                headers=headers
+            ),
+            llm_total, concurrency
+        )
+        results["load.suggest_next"] = await run_scenario(
+            client,
+            lambda c, i: c.post("/tasks/suggest-next", headers=headers),
+            llm_total, concurrency
+        )
+
+    return results
+
+
+def run(args) -> dict:
+    return asyncio.run(run_async(args))
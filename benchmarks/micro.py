@@ -0,0 +1,103 @@
+import json
+import random
+from datetime import datetime
+from pydantic import TypeAdapter
+from app.models.models import Task
+from app.schemas.schemas import TaskResponse
+from app.api.responses import TASK_RESPONSE_FIELDS, encode_tasks_json
+from app.services.similarity_service import UserIndex
+from app.services.auth_service import (
+    configure_bcrypt,
+    hash_password,
+    verify_password,
+    create_access_token,
+    decode_access_token,
+)
+from benchmarks.common import measure
+from benchmarks.data import generate_tasks
+
+# ==========================================
+# MICRO-BENCHMARKS
+# ==========================================
+
+SERIALIZATION_SIZES = (100, 1_000, 10_000)
+SIMILARITY_SIZES = (100, 1_000)
+
+
+def build_task_objects(count: int, seed: int = 42) -> list:
+    """Tareas ORM (sin sesión) con todos los campos de TaskResponse rellenos"""
+    rng = random.Random(seed)
+    now = datetime(2030, 1, 1, 9, 0)
+    tasks = []
+    for i, row in enumerate(generate_tasks(1, count, rng, now), start=1):
+        tasks.append(Task(id=i, created_at=now, updated_at=now, **row))
+    return tasks
+
+
+def serialize_fastapi_default(tasks: list) -> bytes:
+    """
+    Lo que hace FastAPI con response_model=list[TaskResponse]: validar
+    desde atributos, volcar a tipos JSON y codificar con json.dumps.
+    """
+    adapter = _task_list_adapter
+    validated = adapter.validate_python(tasks, from_attributes=True)
+    content = adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+_task_list_adapter = TypeAdapter(list[TaskResponse])
+
+
+def as_rows(tasks: list) -> list:
+    """Las mismas tareas como tuplas de columnas (lo que devuelve la consulta)"""
+    return [tuple(getattr(t, field) for field in TASK_RESPONSE_FIELDS) for t in tasks]
+
+
+def run(args) -> dict:
+    results = {}
+    iterations = 3 if args.quick else 10
+
+    # Mismo coste que el servidor (calibrado al arrancar)
+    bcrypt_rounds = configure_bcrypt()
+    password = "benchmark-password"
+    hashed = hash_password(password)
+    results["auth.hash_password"] = measure(
+        lambda: hash_password(password), iterations, warmup=1, rounds=bcrypt_rounds
+    )
+    results["auth.verify_password"] = measure(
+        lambda: verify_password(password, hashed), iterations, warmup=1, rounds=bcrypt_rounds
+    )
+
+    token = create_access_token({"sub": "bench@example.com"})
+    results["auth.decode_access_token"] = measure(
+        lambda: decode_access_token(token), 200 if args.quick else 5_000, warmup=50
+    )
+
+    for size in SERIALIZATION_SIZES:
+        tasks = build_task_objects(size)
+        runs = max(3, 20_000 // size) if not args.quick else 3
+        stats = measure(lambda: serialize_fastapi_default(tasks), runs, warmup=1)
+        stats["rows_per_sec"] = round(stats["ops_per_sec"] * size, 2)
+        stats["bytes"] = len(serialize_fastapi_default(tasks))
+        results[f"serialize.fastapi_default.{size}"] = stats
+
+        rows = as_rows(tasks)
+        stats = measure(lambda: encode_tasks_json(rows), runs, warmup=1)
+        stats["rows_per_sec"] = round(stats["ops_per_sec"] * size, 2)
+        stats["bytes"] = len(encode_tasks_json(rows))
+        results[f"serialize.fast_path.{size}"] = stats
+
+    # Detección de duplicados: consulta sobre el índice de un usuario
+    for size in SIMILARITY_SIZES:
+        index = UserIndex()
+        tasks = build_task_objects(size)
+        for task in tasks:
+            index.add(task.id, (task.titulo, task.original_input))
+        queries = [task.titulo.lower() + " mañana" for task in tasks[:50]]
+        counter = iter(range(10**9))
+        results[f"similarity.lookup.{size}"] = measure(
+            lambda: index.best_match(queries[next(counter) % len(queries)], threshold=0.7),
+            200 if args.quick else 2_000, warmup=20
+        )
+
+    return results
@@ -0,0 +1,70 @@
+import time
+from app.api.responses import (
+    TASK_RESPONSE_FIELDS,
+    compress,
+    encode_tasks_json,
+    encode_tasks_columnar,
+    encode_tasks_msgpack,
+    parse_fields,
+)
+from benchmarks.micro import build_task_objects, as_rows, serialize_fastapi_default
+
+# ==========================================
+# TAMAÑO DE PAYLOAD Y COSTE DE CODIFICACIÓN
+# ==========================================
+# Compara la salida actual (JSON de FastAPI sin comprimir) con las
+# representaciones negociables de GET /tasks.
+
+PAYLOAD_SIZES = (100, 1_000, 10_000)
+
+ENCODERS = {
+    "json": encode_tasks_json,
+    "columnar": encode_tasks_columnar,
+    "msgpack": encode_tasks_msgpack,
+    "msgpack_columnar": lambda rows: encode_tasks_msgpack(rows, columnar=True),
+}
+
+# Vista de lista con ?fields= (la proyección la hace el SELECT)
+LIST_VIEW_FIELDS = parse_fields("id,titulo,estado,fecha_limite")
+LIST_VIEW_INDEXES = [TASK_RESPONSE_FIELDS.index(field) for field in LIST_VIEW_FIELDS]
+
+
+def _timed(fn, runs: int):
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = fn()
+    return result, (time.perf_counter() - start) / runs
+
+
+def run(args) -> dict:
+    results = {}
+    for size in PAYLOAD_SIZES:
+        tasks = build_task_objects(size)
+        rows = as_rows(tasks)
+        list_rows = [tuple(row[i] for i in LIST_VIEW_INDEXES) for row in rows]
+        runs = 2 if args.quick else max(3, 10_000 // size)
+
+        baseline, baseline_time = _timed(lambda: serialize_fastapi_default(tasks), runs)
+        results[f"payload.baseline.{size}"] = {
+            "bytes": len(baseline),
+            "encode_ms": round(baseline_time * 1000, 4),
+        }
+
+        for name, encoder in ENCODERS.items():
+            body, encode_time = _timed(lambda: encoder(rows), runs)
+            for encoding in ("identity", "gzip", "br"):
+                compressed, compress_time = _timed(lambda: compress(body, encoding), runs)
+                total_time = encode_time + (compress_time if encoding != "identity" else 0)
+                results[f"payload.{name}.{encoding}.{size}"] = {
+                    "bytes": len(compressed),
+                    "ratio_vs_baseline": round(len(compressed) / len(baseline), 4),
+                    "encode_ms": round(total_time * 1000, 4),
+                }
+
+        body, encode_time = _timed(lambda: encode_tasks_json(list_rows, LIST_VIEW_FIELDS), runs)
+        results[f"payload.json_fields.identity.{size}"] = {
+            "bytes": len(body),
+            "ratio_vs_baseline": round(len(body) / len(baseline), 4),
+            "encode_ms": round(encode_time * 1000, 4),
+        }
+    return results
@@ -0,0 +1,112 @@
+"""
+Suite de benchmarks de TaskMaster AI.
+
+Uso:
+    python -m benchmarks.run --output bench_results.json
+    python -m benchmarks.run --compare baseline.json --threshold 0.15
+    python -m benchmarks.run --suite micro --quick
+    python -m benchmarks.run --suite scaling   # gunicorn con 1..N workers
+    python -m benchmarks.run --suite websocket # memoria por conexión de /ws/tasks
+    python -m benchmarks.run --suite context_cache  # instrucciones de Gemini cacheadas
+
+Por defecto usa una BD SQLite temporal y un stub local de Gemini; para
+medir contra PostgreSQL, exporta DATABASE_URL apuntando a una BD de pruebas.
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import tempfile
+
+SUITES = ("micro", "payload", "load", "export", "digest", "context_cache", "scaling", "websocket")
+# scaling y websocket arrancan procesos de gunicorn: sólo se ejecutan si se piden
+DEFAULT_SUITES = ("micro", "payload", "load", "export", "digest", "context_cache")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de TaskMaster AI")
+    parser.add_argument("--suite", default=",".join(DEFAULT_SUITES),
+                        help=f"Suites a ejecutar, separadas por comas ({', '.join(SUITES)})")
+    parser.add_argument("--sizes", default="10,1000,10000",
+                        help="Tareas por usuario sembrado (ej. 10,1000,100000)")
+    parser.add_argument("--requests", type=int, default=200, help="Peticiones por escenario de carga")
+    parser.add_argument("--concurrency", type=int, default=8, help="Peticiones concurrentes")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="Latencia del stub de Gemini")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--quick", action="store_true", help="Menos iteraciones (smoke test)")
+    parser.add_argument("--output", default="bench_results.json", help="Fichero JSON de resultados")
+    parser.add_argument("--compare", help="Resultados de referencia con los que comparar")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Regresión relativa tolerada al comparar (0.15 = 15%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    suites = [s.strip() for s in args.suite.split(",") if s.strip()]
+    args.sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    from benchmarks.gemini_stub import GeminiStubServer
+
+    stub = GeminiStubServer(latency_ms=args.llm_latency_ms).start()
+
+    # La configuración se lee al importar app.*: hay que fijarla antes
+    tmpdir = tempfile.mkdtemp(prefix="taskmaster-bench-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tmpdir}/bench.db")
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark-key")
+    os.environ["GEMINI_BASE_URL"] = stub.url
+    # Los escenarios de carga superan a propósito los límites por usuario
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    from benchmarks.common import environment, save_results, load_results, compare
+
+    # Suites que necesitan la BD sembrada
+    if {"load", "export", "digest", "scaling", "websocket"} & set(suites):
+        import app.main  # noqa: F401  (crea las tablas)
+        from app.database import engine
+        from benchmarks.data import seed
+
+        args.users = seed(engine, args.sizes, seed=args.seed)
+
+    results = {}
+    for name in suites:
+        module = importlib.import_module(f"benchmarks.{name}")
+        print(f"== {name}", file=sys.stderr)
+        suite_results = module.run(args)
+        for key, value in suite_results.items():
+            print(f"{key:45s} {json.dumps(value)}", file=sys.stderr)
+        results.update(suite_results)
+
+    stub.stop()
+
+    meta = environment()
+    meta.update({
+        "suites": suites,
+        "sizes": args.sizes,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "llm_latency_ms": args.llm_latency_ms,
+        "database": os.environ["DATABASE_URL"].split("://", 1)[0],
+    })
+    save_results(args.output, results, meta)
+    print(f"Resultados guardados en {args.output}", file=sys.stderr)
+
+    if args.compare:
+        regressions = compare(results, load_results(args.compare), args.threshold)
+        for r in regressions:
+            print(
+                f"REGRESIÓN {r['benchmark']}.{r['metric']}: "
+                f"{r['baseline']} -> {r['current']} ({r['change']:+.1%})",
+                file=sys.stderr
+            )
+        if regressions:
+            return 1
+        print("Sin regresiones respecto a la referencia", file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
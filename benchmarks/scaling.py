@@ -0,0 +1,123 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import httpx
+from benchmarks.common import summarize
+from benchmarks.load import auth_headers
+
+# ==========================================
+# ESCALADO CON WORKERS DE GUNICORN
+# ==========================================
+# Arranca gunicorn (gunicorn.conf.py) con 1, 2, 4... workers y mide el
+# throughput de GET /tasks por HTTP real. La carga la generan tantos
+# procesos cliente como workers, para que el cliente no sea el cuello de
+# botella. Con SQLite las escrituras no escalan: por eso sólo se mide lectura.
+#
+# Como referencia se mide también el arranque anterior (uvicorn a secas,
+# un proceso): "vs_uvicorn" compara cada configuración con él.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    """gunicorn con `workers` workers, o uvicorn a secas si workers es 0"""
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), GUNICORN_BIND=f"127.0.0.1:{port}",
+               GUNICORN_LOGLEVEL="warning")
+    if workers:
+        command = [sys.executable, "-m", "gunicorn", "app.main:app", "-c", "gunicorn.conf.py"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "app.main:app",
+                   "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    process = subprocess.Popen(command, cwd=ROOT, env=env)
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"el servidor no arrancó con {workers} workers")
+
+
+async def _client_async(url: str, headers: dict, total: int, concurrency: int) -> tuple[list, int]:
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async with httpx.AsyncClient(base_url=url, headers=headers) as client:
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                t0 = time.perf_counter()
+                response = await client.get("/tasks/")
+                latencies.append(time.perf_counter() - t0)
+                if response.status_code >= 400:
+                    errors += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def _client(url: str, headers: dict, total: int, concurrency: int) -> tuple[list, int]:
+    return asyncio.run(_client_async(url, headers, total, concurrency))
+
+
+def measure_workers(workers: int, headers: dict, total: int, concurrency: int) -> dict:
+    """Throughput de GET /tasks con `workers` workers de gunicorn (0: uvicorn a secas)"""
+    port = _free_port()
+    process = start_server(workers, port)
+    url = f"http://127.0.0.1:{port}"
+    clients = max(workers, 1)
+    try:
+        # Calentamiento (conexiones, cachés de cada worker)
+        _client(url, headers, clients * 20, concurrency)
+
+        per_client = max(1, total // clients)
+        with ProcessPoolExecutor(max_workers=clients) as pool:
+            start = time.perf_counter()
+            futures = [pool.submit(_client, url, headers, per_client, concurrency) for _ in range(clients)]
+            outcomes = [f.result() for f in futures]
+            elapsed = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait(30)
+
+    latencies = [latency for client_latencies, _ in outcomes for latency in client_latencies]
+    errors = sum(client_errors for _, client_errors in outcomes)
+    return summarize(latencies, elapsed, errors=errors, workers=workers)
+
+
+def run(args) -> dict:
+    cpu_count = os.cpu_count() or 1
+    worker_counts = [n for n in (1, 2, 4, 8, 16) if n <= cpu_count] or [1]
+    if cpu_count not in worker_counts and cpu_count <= 16:
+        worker_counts.append(cpu_count)
+
+    # El usuario con menos tareas: mide el coste por petición, no el de la consulta
+    user = args.users[0]
+    headers = auth_headers(user["email"])
+    total = args.requests * 5
+
+    uvicorn = measure_workers(0, headers, total, args.concurrency)
+    results = {"scaling.uvicorn": uvicorn}
+    baseline = None
+    for workers in worker_counts:
+        result = measure_workers(workers, headers, total, args.concurrency)
+        baseline = baseline or result["ops_per_sec"]
+        result["speedup"] = round(result["ops_per_sec"] / baseline, 2) if baseline else 0.0
+        result["vs_uvicorn"] = round(result["ops_per_sec"] / uvicorn["ops_per_sec"], 2) if uvicorn["ops_per_sec"] else 0.0
+        results[f"scaling.workers.{workers}"] = result
+    return results
@@ -0,0 +1,114 @@
+import asyncio
+import time
+import httpx
+from websockets.asyncio.client import connect
+from benchmarks.common import summarize
+from benchmarks.load import auth_headers
+from benchmarks.scaling import _free_port, start_server
+
+# ==========================================
+# CONEXIONES WEBSOCKET (/ws/tasks)
+# ==========================================
+# Arranca gunicorn con un worker, abre N conexiones inactivas y mide cuánta
+# memoria residente (RSS) añade cada una al worker. Con ellas abiertas,
+# mide la latencia desde el commit de POST /tasks hasta que el evento
+# llega al cliente.
+
+CONNECTIONS = (100, 1000, 5000)
+
+
+def _worker_pid(master_pid: int) -> int:
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+        return int(f.read().split()[0])
+
+
+def _rss_bytes(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+async def _open(url: str, token: str, count: int, batch: int = 100) -> list:
+    websockets = []
+    for start in range(0, count, batch):
+        websockets += await asyncio.gather(*(
+            connect(f"{url}?token={token}", ping_interval=None, max_queue=4)
+            for _ in range(min(batch, count - start))
+        ))
+    return websockets
+
+
+async def _delivery(http_url: str, ws_url: str, email: str, events: int) -> list:
+    """Latencia (s) desde que se envía POST /tasks hasta recibir task.created"""
+    headers = auth_headers(email)
+    token = headers["Authorization"].split()[1]
+    latencies = []
+    task_ids = []
+    async with connect(f"{ws_url}?token={token}", ping_interval=None) as websocket:
+        async with httpx.AsyncClient(base_url=http_url, headers=headers) as client:
+            for i in range(events):
+                t0 = time.perf_counter()
+                response = await client.post("/tasks/", json={
+                    "titulo": f"Evento {i}", "estado": "pending", "prioridad": "medium"
+                })
+                response.raise_for_status()
+                await websocket.recv()
+                latencies.append(time.perf_counter() - t0)
+                task_ids.append(response.json()["id"])
+            # Las tareas del benchmark no deben afectar a las demás suites
+            for task_id in task_ids:
+                await client.delete(f"/tasks/{task_id}")
+    return latencies
+
+
+async def _measure(port: int, worker_pid: int, counts: list, email: str, listener_email: str, events: int) -> dict:
+    ws_url = f"ws://127.0.0.1:{port}/ws/tasks"
+    http_url = f"http://127.0.0.1:{port}"
+    token = auth_headers(email)["Authorization"].split()[1]
+
+    # Calentamiento: importaciones perezosas y buffers del primer uso
+    for websocket in await _open(ws_url, token, 10):
+        await websocket.close()
+    await _delivery(http_url, ws_url, listener_email, 5)
+    await asyncio.sleep(0.5)
+
+    results = {}
+    for count in counts:
+        rss_before = _rss_bytes(worker_pid)
+        start = time.perf_counter()
+        websockets = await _open(ws_url, token, count)
+        connect_elapsed = time.perf_counter() - start
+        await asyncio.sleep(1)
+        rss_after = _rss_bytes(worker_pid)
+
+        latencies = await _delivery(http_url, ws_url, listener_email, events)
+        results[f"websocket.idle.{count}"] = summarize(
+            latencies, sum(latencies),
+            connections=count,
+            connect_per_sec=round(count / connect_elapsed, 2),
+            bytes_per_conn=round((rss_after - rss_before) / count),
+        )
+
+        await asyncio.gather(*(websocket.close() for websocket in websockets))
+        await asyncio.sleep(0.5)
+    return results
+
+
+def run(args) -> dict:
+    counts = [100, 500] if args.quick else list(CONNECTIONS)
+    events = 20 if args.quick else 100
+
+    port = _free_port()
+    process = start_server(1, port)
+    try:
+        worker_pid = _worker_pid(process.pid)
+        # Las conexiones inactivas son de un usuario y los eventos de otro:
+        # la latencia no incluye el reparto a las N conexiones
+        return asyncio.run(_measure(
+            port, worker_pid, counts, args.users[0]["email"], args.users[-1]["email"], events
+        ))
+    finally:
+        process.terminate()
+        process.wait(30)
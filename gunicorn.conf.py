@@ -0,0 +1,72 @@
+"""
+Configuración de gunicorn para producción.
+
+Uso:
+    gunicorn app.main:app -c gunicorn.conf.py
+
+Todo se puede ajustar por variables de entorno (WEB_CONCURRENCY,
+GUNICORN_MAX_REQUESTS, GUNICORN_KEEPALIVE...).
+"""
+import multiprocessing
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+# ==========================================
+# WORKERS
+# ==========================================
+# Un worker por núcleo: cada uno es un proceso con su propio bucle de
+# eventos y su threadpool para los endpoints síncronos. El tope evita
+# agotar las conexiones de PostgreSQL (cada worker tiene su pool).
+workers = _env_int("WEB_CONCURRENCY", 0) or min(
+    multiprocessing.cpu_count(), _env_int("GUNICORN_MAX_WORKERS", 8)
+)
+worker_class = "app.workers.UvicornWorker"
+
+# preload: app.main se importa una vez en el master y los workers la
+# heredan con fork (memoria compartida copy-on-write)
+preload_app = True
+
+# Reciclado: cada worker se reinicia tras N peticiones (con jitter para que
+# no lo hagan todos a la vez), acotando el crecimiento de memoria
+max_requests = _env_int("GUNICORN_MAX_REQUESTS", 10000)
+max_requests_jitter = _env_int("GUNICORN_MAX_REQUESTS_JITTER", 1000)
+
+# ==========================================
+# RED
+# ==========================================
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+backlog = _env_int("GUNICORN_BACKLOG", 2048)
+keepalive = _env_int("GUNICORN_KEEPALIVE", 5)
+timeout = _env_int("GUNICORN_TIMEOUT", 60)
+graceful_timeout = _env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+
+accesslog = os.environ.get("GUNICORN_ACCESSLOG")  # None = sin log de acceso
+loglevel = os.environ.get("GUNICORN_LOGLEVEL", "info")
+
+
+# ==========================================
+# HOOKS
+# ==========================================
+
+def on_starting(server):
+    """
+    Calibra el coste de bcrypt una vez, en el master: los workers heredan
+    el valor con fork (con preload_app la app ya está importada aquí).
+    """
+    from app.services.auth_service import configure_bcrypt
+    configure_bcrypt()
+
+
+def post_fork(server, worker):
+    """
+    Las conexiones abiertas por el master (create_all al importar) no se
+    pueden compartir entre procesos: cada worker descarta las heredadas
+    sin cerrarlas y abre las suyas.
+    """
+    from app.database import engine
+    engine.dispose(close=False)
@@ -0,0 +1,53 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database import Base, get_db
+from app.services.cache_service import clear_all
+from app.services.rate_limit_service import get_rate_limiter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# ==========================================
+# CONFIGURACIÓN COMÚN DE TESTS
+# ==========================================
+# BD de pruebas, cliente y usuarios autenticados compartidos por todos los
+# módulos (from tests.conftest import client, TestingSessionLocal, ...).
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+test_engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    """Cada test empieza con la BD vacía y sin cachés ni buckets de rate limiting"""
+    app.dependency_overrides[get_db] = override_get_db
+    Base.metadata.create_all(bind=test_engine)
+    clear_all()
+    get_rate_limiter().backend.reset()
+    yield
+    clear_all()
+    get_rate_limiter().backend.reset()
+    Base.metadata.drop_all(bind=test_engine)
+
+
+def login(email="user@example.com", nombre="Test User"):
+    """Registra al usuario (si no existe) y devuelve su JWT"""
+    client.post(
+        "/auth/register",
+        json={"email": email, "password": "password123", "nombre": nombre}
+    )
+    response = client.post("/auth/login", json={"email": email, "password": "password123"})
+    return response.json()["access_token"]
+
+
+def auth_headers(email="user@example.com", nombre="Test User"):
+    return {"Authorization": f"Bearer {login(email, nombre)}"}
@@ -1,33 +1,8 @@
-import pytest
-from fastapi.testclient import TestClient
-from app.main import app
-from app.database import Base, engine, get_db
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-
-# ==========================================
-# CONFIGURACIÓN DE TESTS
-# ==========================================
-
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
-test_engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
-
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-app.dependency_overrides[get_db] = override_get_db
-client = TestClient(app)
-
-@pytest.fixture(autouse=True)
-def setup_database():
-    Base.metadata.create_all(bind=test_engine)
-    yield
-    Base.metadata.drop_all(bind=test_engine)
+from app.models.models import User
+from app.services import auth_service
+from app.services.auth_service import calibrate_bcrypt_rounds, password_needs_rehash
+from passlib.hash import bcrypt
+from tests.conftest import TestingSessionLocal, client
 
 # ==========================================
 # TESTS
@@ -158,4 +133,71 @@ def test_get_me_with_token():
 def test_get_me_without_token():
     """Test: Acceder a /auth/me sin token debe fallar"""
     response = client.get("/auth/me")
-    assert response.status_code == 401
\ No newline at end of file
+    assert response.status_code == 401
+
+
+def test_calibrate_bcrypt_rounds():
+    """Test: La calibración elige el mayor coste que no supera el objetivo"""
+    # 10 ms con 10 rondas: 11 -> 20 ms, 12 -> 40 ms, 13 -> 80 ms, 14 -> 160 ms
+    measure = lambda rounds: 0.010 * 2 ** (rounds - 10)
+
+    assert calibrate_bcrypt_rounds(100, 10, 16, measure) == 13
+    assert calibrate_bcrypt_rounds(100, 10, 12, measure) == 12
+    # Máquina lenta: nunca por debajo del mínimo
+    assert calibrate_bcrypt_rounds(5, 10, 16, measure) == 10
+
+
+def test_login_rehashes_password_with_lower_cost():
+    """Test: El login rehace con el coste actual un hash guardado con menos rondas"""
+    client.post(
+        "/auth/register",
+        json={"email": "rehash@example.com", "password": "password123", "nombre": "Rehash User"}
+    )
+    db = TestingSessionLocal()
+    user = db.query(User).filter(User.email == "rehash@example.com").first()
+    user.password_hash = bcrypt.using(rounds=4).hash("password123")
+    db.commit()
+
+    response = client.post("/auth/login", json={"email": "rehash@example.com", "password": "password123"})
+
+    assert response.status_code == 200
+    db.expire_all()
+    rehashed = user.password_hash
+    assert bcrypt.from_string(rehashed).rounds == auth_service.bcrypt_rounds
+
+    # Con el coste actual ya no se rehace
+    client.post("/auth/login", json={"email": "rehash@example.com", "password": "password123"})
+    db.expire_all()
+    assert user.password_hash == rehashed
+    db.close()
+
+
+def test_hashes_outside_the_cost_band_are_rehashed():
+    """Test: Se conservan los hashes del coste actual (+ tolerancia); los demás se rehacen"""
+    current = 4
+    context = auth_service.password_context(current)
+    tolerance = auth_service.settings.bcrypt_rounds_tolerance
+
+    assert context.needs_update(bcrypt.using(rounds=current).hash("password123")) is False
+    assert context.needs_update(bcrypt.using(rounds=current + tolerance).hash("password123")) is False
+    assert context.needs_update(bcrypt.using(rounds=current + tolerance + 2).hash("password123"))
+    assert password_needs_rehash(bcrypt.using(rounds=auth_service.bcrypt_rounds + tolerance + 2).hash("password123"))
+
+
+def test_login_rehashes_password_with_higher_cost_down():
+    """Test: Un hash con varias rondas más que el coste actual se rehace a la baja en el login"""
+    client.post(
+        "/auth/register",
+        json={"email": "slow@example.com", "password": "password123", "nombre": "Slow User"}
+    )
+    db = TestingSessionLocal()
+    user = db.query(User).filter(User.email == "slow@example.com").first()
+    user.password_hash = bcrypt.using(rounds=auth_service.bcrypt_rounds + 3).hash("password123")
+    db.commit()
+
+    response = client.post("/auth/login", json={"email": "slow@example.com", "password": "password123"})
+
+    assert response.status_code == 200
+    db.expire_all()
+    assert bcrypt.from_string(user.password_hash).rounds == auth_service.bcrypt_rounds
+    db.close()
@@ -0,0 +1,99 @@
+import time
+from app.config import settings
+from app.models.models import CacheInvalidation
+from app.services.cache_service import (
+    InvalidationListener,
+    TTLCache,
+    suggestion_cache,
+    user_cache,
+)
+from app.database import upgrade_schema
+from sqlalchemy import create_engine, inspect, insert, select, text
+from tests.conftest import auth_headers, client, test_engine
+
+# ==========================================
+# TESTS
+# ==========================================
+
+def test_ttl_cache_expires_and_evicts_lru():
+    """Test: Las entradas caducan por TTL y se descartan las menos usadas"""
+    now = [0.0]
+    cache = TTLCache("test", ttl_seconds=10, max_entries=2, clock=lambda: now[0])
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)  # expulsa "b", la menos usada
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    now[0] = 11
+    assert cache.get("a") is None
+
+
+def test_user_is_cached_after_first_request():
+    """Test: get_current_user sirve el usuario desde la caché tras la primera petición"""
+    headers = auth_headers("cache@example.com")
+
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    assert user_cache.get("cache@example.com").email == "cache@example.com"
+    assert client.get("/auth/me", headers=headers).json()["email"] == "cache@example.com"
+
+
+def test_task_mutation_publishes_invalidation():
+    """Test: Crear una tarea invalida la sugerencia cacheada y deja el evento para otros workers"""
+    headers = auth_headers()
+    user_id = client.get("/auth/me", headers=headers).json()["id"]
+    suggestion_cache.set(user_id, {"sugerencia": "obsoleta"})
+
+    response = client.post(
+        "/tasks/",
+        json={"titulo": "Nueva", "estado": "pending", "prioridad": "high"},
+        headers=headers
+    )
+
+    assert response.status_code == 201
+    assert suggestion_cache.get(user_id) is None
+    with test_engine.connect() as conn:
+        events = conn.execute(select(CacheInvalidation.namespace, CacheInvalidation.key)).all()
+    assert ("suggestions", str(user_id)) in events
+
+
+def test_listener_applies_events_from_other_workers(monkeypatch):
+    """Test: El listener (sondeo en SQLite) borra las entradas invalidadas por otro proceso"""
+    monkeypatch.setattr(settings, "invalidation_poll_interval", 0.02)
+    suggestion_cache.set(7, {"sugerencia": "obsoleta"})
+    listener = InvalidationListener(test_engine).start()
+    try:
+        time.sleep(0.1)
+        with test_engine.begin() as conn:
+            conn.execute(insert(CacheInvalidation).values(namespace="suggestions", key="7", created_at=time.time()))
+
+        deadline = time.monotonic() + 2
+        while suggestion_cache.get(7) is not None and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        listener.stop()
+
+    assert suggestion_cache.get(7) is None
+
+
+def test_upgrade_schema_adds_origin_to_existing_invalidations_table(tmp_path):
+    """Test: Una tabla cache_invalidations sin origin la recibe al arrancar (eventos previos con origen vacío)"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE cache_invalidations (id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " namespace VARCHAR(50) NOT NULL, key VARCHAR(255) NOT NULL, created_at FLOAT NOT NULL)"
+        ))
+        conn.execute(text(
+            "INSERT INTO cache_invalidations (namespace, key, created_at) VALUES ('suggestions', '7', 1)"
+        ))
+
+    upgrade_schema(engine)
+    upgrade_schema(engine)  # idempotente
+
+    assert "origin" in {column["name"] for column in inspect(engine).get_columns("cache_invalidations")}
+    with engine.connect() as conn:
+        assert conn.execute(select(CacheInvalidation.origin, CacheInvalidation.key)).all() == [("", "7")]
+    engine.dispose()
+
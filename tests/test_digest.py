@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+import time
+import numpy as np
+import pytest
+from sqlalchemy import update
+from app.api import tasks as tasks_api
+from app.jobs.daily_digest import build_digests
+from app.models.models import Task, TaskDigest, TaskPriority, TaskStatus, User
+from app.services.digest_service import score_task_dicts, top_k_per_user
+from tests.conftest import TestingSessionLocal, auth_headers, client
+
+# ==========================================
+# CONFIGURACIÓN DE TESTS
+# ==========================================
+
+def add_tasks(user_email, *tasks):
+    """Crea tareas con updated_at en el pasado (anteriores a cualquier resumen)"""
+    db = TestingSessionLocal()
+    try:
+        user = db.query(User).filter(User.email == user_email).first()
+        created = [Task(user_id=user.id, **task) for task in tasks]
+        db.add_all(created)
+        db.flush()
+        db.execute(
+            update(Task).where(Task.user_id == user.id).values(updated_at=datetime.utcnow() - timedelta(hours=1))
+        )
+        db.commit()
+        return [task.id for task in created]
+    finally:
+        db.close()
+
+# ==========================================
+# TESTS
+# ==========================================
+
+def test_top_k_per_user():
+    """Test: Las k mejores de cada usuario salen en una sola pasada, ordenadas"""
+    user_ids = np.array([2, 1, 2, 1, 2, 1])
+    task_ids = np.array([10, 11, 12, 13, 14, 15])
+    scores = np.array([0.5, 0.9, 0.7, 0.1, 0.7, 0.4])
+
+    chosen, rank = top_k_per_user(user_ids, task_ids, scores, 2)
+
+    assert task_ids[chosen].tolist() == [11, 15, 12, 14]  # empate en 0.7: id menor primero
+    assert rank.tolist() == [0, 1, 0, 1]
+
+
+def test_suggest_next_serves_daily_digest(monkeypatch):
+    """Test: suggest-next usa el resumen diario sin llamar a Gemini mientras no cambien las tareas"""
+    headers = auth_headers("digest@example.com")
+    other = auth_headers("otro@example.com")
+    soon = datetime.now() + timedelta(hours=6)
+    urgent_id, low_id, _ = add_tasks(
+        "digest@example.com",
+        {"titulo": "Entregar informe", "prioridad": TaskPriority.URGENT, "fecha_limite": soon},
+        {"titulo": "Ordenar cajón", "prioridad": TaskPriority.LOW},
+        {"titulo": "Hecha", "prioridad": TaskPriority.URGENT, "estado": TaskStatus.COMPLETED},
+    )
+    add_tasks("otro@example.com", *({"titulo": f"Tarea {i}", "prioridad": TaskPriority.MEDIUM} for i in range(5)))
+
+    # Lotes de 2 filas: las tareas de un usuario quedan repartidas entre lotes
+    db = TestingSessionLocal()
+    assert build_digests(db, top_k=2, batch_size=2) == {"tareas": 7, "usuarios": 2}
+    db.close()
+
+    def gemini_not_called(tasks):
+        raise AssertionError("No debería llamar a Gemini")
+
+    monkeypatch.setattr(tasks_api, "suggest_next_task", gemini_not_called)
+    response = client.post("/tasks/suggest-next", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["task_id"] == urgent_id
+    assert response.json()["task"]["titulo"] == "Entregar informe"
+    assert client.post("/tasks/suggest-next", headers=other).json()["task_id"] is not None
+
+    # Tras un cambio, el resumen del usuario deja de valer
+    client.patch(f"/tasks/{urgent_id}/complete", headers=headers)
+    monkeypatch.setattr(tasks_api, "suggest_next_task", lambda tasks: {"sugerencia": "Gemini", "task_id": low_id})
+    assert client.post("/tasks/suggest-next", headers=headers).json()["sugerencia"] == "Gemini"
+
+
+def test_deadlines_are_local_time(monkeypatch):
+    """Test: El job y suggest-next leen fecha_limite en hora local, como el resto de la app"""
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    try:
+        auth_headers("digest@example.com")
+        due = datetime.now() + timedelta(hours=1)
+        task_id, = add_tasks(
+            "digest@example.com",
+            {"titulo": "En una hora", "prioridad": TaskPriority.LOW, "fecha_limite": due}
+        )
+        db = TestingSessionLocal()
+        try:
+            build_digests(db)
+            digest_score = db.query(TaskDigest.score).filter(TaskDigest.task_id == task_id).scalar()
+            task = db.get(Task, task_id)
+            dict_score = score_task_dicts([{
+                "prioridad": task.prioridad.value,
+                "estado": task.estado.value,
+                "fecha_limite": task.fecha_limite,
+                "created_at": task.created_at,
+            }])[0]
+        finally:
+            db.close()
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+    # Prioridad baja (0.25) y vence en una hora (1.5 / (1 + 1/24)); antigüedad ~0
+    expected = 0.25 + 1.5 / (1 + 1 / 24)
+    assert digest_score == pytest.approx(expected, abs=1e-3)
+    assert dict_score == pytest.approx(expected, abs=1e-3)
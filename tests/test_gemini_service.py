@@ -0,0 +1,217 @@
+from datetime import datetime, timedelta
+import pytest
+from google import genai
+from google.genai import types
+from pydantic import ValidationError
+from app.config import Settings, settings
+from app.services import gemini_service
+from app.services.gemini_service import (
+    COMPLEX,
+    SIMPLE,
+    TASK_EXTRACTION_PROMPT,
+    ContextCache,
+    ModelRouter,
+    build_suggest_prompt,
+    classify_extract,
+    classify_suggest,
+    estimate_tokens,
+    extract_task_data,
+)
+from benchmarks.gemini_stub import GeminiStubServer
+
+# ==========================================
+# DATOS DE PRUEBA
+# ==========================================
+
+def make_tasks(n, titulo="Tarea"):
+    base = datetime(2030, 1, 1, 9, 0)
+    return [
+        {
+            "id": i,
+            "titulo": f"{titulo} {i}",
+            "estado": "pending",
+            "prioridad": "medium",
+            "fecha_limite": base + timedelta(days=i),
+        }
+        for i in range(1, n + 1)
+    ]
+
+# ==========================================
+# TESTS
+# ==========================================
+
+def test_prompt_is_compact():
+    """Test: El prompt usa JSON compacto, sin indentación"""
+    prompt, tokens, incluidas = build_suggest_prompt(make_tasks(3))
+
+    assert incluidas == 3
+    assert '{"id":1,"titulo":"Tarea 1"' in prompt
+    assert '\n  {' not in prompt
+    assert tokens == estimate_tokens(prompt)
+
+
+def test_prompt_respects_token_budget():
+    """Test: Con muchas tareas se descartan las menos relevantes"""
+    tasks = make_tasks(500)
+    prompt, tokens, incluidas = build_suggest_prompt(tasks, max_tokens=600)
+
+    assert tokens <= 600
+    assert 0 < incluidas < 500
+    # Se conservan las de fecha límite más próxima
+    assert '"id":1,' in prompt
+    assert '"id":500,' not in prompt
+
+
+def test_prompt_truncates_titles():
+    """Test: Los títulos largos se truncan"""
+    tasks = make_tasks(1, titulo="x" * 300)
+    prompt, _, _ = build_suggest_prompt(tasks, max_title_chars=20)
+
+    assert "x" * 19 + "…" in prompt
+    assert "x" * 21 not in prompt
+
+
+def test_prompt_always_includes_one_task():
+    """Test: Aunque el presupuesto sea mínimo, se incluye la tarea más relevante"""
+    tasks = make_tasks(5)
+    tasks[3]["prioridad"] = "urgent"
+    tasks[3]["fecha_limite"] = datetime(2029, 12, 31)
+
+    prompt, _, incluidas = build_suggest_prompt(tasks, max_tokens=1)
+
+    assert incluidas == 1
+    assert '"id":4,' in prompt
+
+
+# ==========================================
+# ROUTER DE MODELOS
+# ==========================================
+
+LITE, FLASH = "gemini-2.5-flash-lite", "gemini-2.5-flash"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """Stub local de Gemini y un router nuevo con reloj controlado"""
+    with GeminiStubServer() as server:
+        monkeypatch.setattr(gemini_service, "client", genai.Client(
+            api_key="test-key", http_options=types.HttpOptions(base_url=server.url)
+        ))
+        monkeypatch.setattr(gemini_service, "model_router", ModelRouter([LITE, FLASH], clock=FakeClock()))
+        yield server
+
+
+def test_classifier_sends_short_inputs_to_simple_tier():
+    """Test: Los textos cortos son simples; los largos o con varias fechas, complejos"""
+    assert classify_extract("Llamar al dentista mañana a las 10am, es urgente") == SIMPLE
+    assert classify_extract("Comprar pan") == SIMPLE
+    assert classify_extract(
+        "Preparar la presentación del trimestre. Revisar las cifras con finanzas antes de enviarla"
+    ) == COMPLEX
+    assert classify_extract("Reunión el lunes a las 10h, el martes a las 12h y el viernes") == COMPLEX
+    assert classify_suggest(3) == SIMPLE
+    assert classify_suggest(100) == COMPLEX
+
+
+def test_router_picks_model_by_complexity(stub):
+    """Test: Las peticiones simples van al modelo ligero y las complejas al siguiente"""
+    extract_task_data("Comprar pan mañana")
+    extract_task_data("Preparar el informe anual. Incluir las ventas por región y enviarlo a dirección")
+
+    assert stub.state.requests == {LITE: 1, FLASH: 1}
+
+
+def test_router_sets_failing_model_aside_and_readmits_it(stub, monkeypatch):
+    """Test: Si el modelo ligero falla se escala al siguiente; tras varios fallos se aparta y luego se reprueba"""
+    monkeypatch.setattr(settings, "gemini_router_min_calls", 3)
+    stub.state.failing_models.add(LITE)
+    router = gemini_service.model_router
+
+    for _ in range(5):
+        assert extract_task_data("Comprar pan")["titulo"] == "Comprar pan"
+
+    # 3 fallos bastan para apartarlo: las 2 siguientes van directas a flash
+    assert stub.state.requests == {LITE: 3, FLASH: 5}
+    assert router.status()[LITE]["disponible"] is False
+
+    # Pasado el enfriamiento se vuelve a probar; recuperado, vuelve a recibir tráfico
+    stub.state.failing_models.clear()
+    router.clock.now += settings.gemini_router_cooldown_seconds
+    extract_task_data("Comprar pan")
+    assert stub.state.requests[LITE] == 4
+    assert router.status()[LITE]["disponible"] is True
+
+
+# ==========================================
+# CACHÉ DE CONTEXTO
+# ==========================================
+
+@pytest.fixture
+def cached_stub(stub, monkeypatch):
+    """Stub con la caché de contexto activa y reloj controlado"""
+    # Las instrucciones reales no llegan al mínimo de tokens de la API
+    monkeypatch.setattr(settings, "gemini_context_cache_min_tokens", 0)
+    monkeypatch.setattr(gemini_service, "context_cache", ContextCache(clock=FakeClock()))
+    yield stub
+
+
+def test_short_instructions_skip_context_cache(stub):
+    """Test: Por debajo del mínimo de tokens las instrucciones van como system_instruction"""
+    assert extract_task_data("Comprar pan")["titulo"] == "Comprar pan"
+
+    assert stub.state.cache_operations == {}
+    assert stub.state.cached_calls == 0
+
+
+def test_context_cache_is_created_once_and_refreshed(cached_stub):
+    """Test: El contexto se crea una vez por modelo, se reutiliza y se renueva antes de caducar"""
+    clock = gemini_service.context_cache.clock
+    for _ in range(3):
+        assert extract_task_data("Comprar pan")["titulo"] == "Comprar pan"
+
+    assert cached_stub.state.cache_operations == {"create": 1}
+    assert cached_stub.state.cached_calls == 3
+    # Sólo las instrucciones fijas: las fechas van en cada llamada
+    [cache] = cached_stub.state.caches.values()
+    assert cache["model"] == LITE
+    assert cache["text"] == TASK_EXTRACTION_PROMPT
+
+    # En su último tramo, la siguiente llamada amplía el TTL
+    clock.now += settings.gemini_context_cache_ttl_seconds - settings.gemini_context_cache_refresh_seconds + 1
+    extract_task_data("Comprar pan")
+    assert cached_stub.state.cache_operations == {"create": 1, "update": 1}
+
+    # Ya caducada, se crea de nuevo
+    clock.now += settings.gemini_context_cache_ttl_seconds + 1
+    extract_task_data("Comprar pan")
+    assert cached_stub.state.cache_operations == {"create": 2, "update": 1}
+    assert cached_stub.state.cached_calls == 5
+
+
+def test_lost_context_cache_is_recreated(cached_stub):
+    """Test: Si la API ya no tiene el contexto, la petición se reintenta y el contexto se recrea"""
+    extract_task_data("Comprar pan")
+    cached_stub.state.caches.clear()
+
+    assert extract_task_data("Comprar pan")["titulo"] == "Comprar pan"
+    assert cached_stub.state.requests == {LITE: 2, FLASH: 1}
+
+    extract_task_data("Comprar pan")
+    assert cached_stub.state.requests == {LITE: 3, FLASH: 1}
+    # Uno inicial, el de flash y el que sustituye al perdido
+    assert cached_stub.state.cache_operations == {"create": 3}
+
+
+@pytest.mark.parametrize("overrides", [{"gemini_max_attempts": 0}, {"gemini_models": " , "}])
+def test_settings_reject_empty_model_ladder(overrides):
+    """Test: La configuración exige al menos un modelo y un intento por petición"""
+    with pytest.raises(ValidationError):
+        Settings(**overrides)
@@ -0,0 +1,114 @@
+import threading
+import pytest
+from app.api import tasks as tasks_api
+from app.models.models import IdempotencyKey, Task, TaskPriority
+from tests.conftest import TestingSessionLocal, auth_headers, client
+
+# ==========================================
+# CONFIGURACIÓN DE TESTS
+# ==========================================
+
+def count(model):
+    db = TestingSessionLocal()
+    try:
+        return db.query(model).count()
+    finally:
+        db.close()
+
+
+TASK = {"titulo": "Pagar la luz", "estado": "pending", "prioridad": "high"}
+
+# ==========================================
+# TESTS
+# ==========================================
+
+def test_retry_with_same_key_replays_response():
+    """Test: Un reintento con la misma Idempotency-Key devuelve la misma tarea sin crear otra"""
+    headers = {**auth_headers(), "Idempotency-Key": "retry-1"}
+
+    first = client.post("/tasks/", json=TASK, headers=headers)
+    second = client.post("/tasks/", json=TASK, headers=headers)
+
+    assert first.status_code == second.status_code == 201
+    assert second.json() == first.json()
+    assert second.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert count(Task) == 1
+
+    # Otra clave (u otro usuario con la misma) es otra petición
+    assert client.post("/tasks/", json=TASK, headers={**headers, "Idempotency-Key": "retry-2"}).status_code == 201
+    other = {**auth_headers("otro@example.com"), "Idempotency-Key": "retry-1"}
+    assert client.post("/tasks/", json=TASK, headers=other).json()["user_id"] != first.json()["user_id"]
+    assert count(Task) == 3
+
+
+def test_same_key_with_different_body_is_rejected():
+    """Test: Reutilizar una clave con otro cuerpo devuelve 422"""
+    headers = {**auth_headers(), "Idempotency-Key": "retry-1"}
+    client.post("/tasks/", json=TASK, headers=headers)
+
+    response = client.post("/tasks/", json={**TASK, "titulo": "Otra"}, headers=headers)
+
+    assert response.status_code == 422
+    assert count(Task) == 1
+
+
+def test_concurrent_duplicate_waits_for_original(monkeypatch):
+    """Test: Un duplicado concurrente espera a la petición en curso y recibe su respuesta"""
+    headers = {**auth_headers(), "Idempotency-Key": "smart-1"}
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_extract(texto):
+        calls.append(texto)
+        started.set()
+        release.wait(5)
+        return {"titulo": "Llamar al dentista", "prioridad": TaskPriority.URGENT}
+
+    monkeypatch.setattr(tasks_api, "extract_task_data", slow_extract)
+    body = {"input": "Llamar al dentista mañana, es urgente"}
+    responses = {}
+
+    def post(name):
+        responses[name] = client.post("/tasks/create-smart", json=body, headers=headers)
+
+    original = threading.Thread(target=post, args=("original",))
+    original.start()
+    assert started.wait(5)
+    duplicate = threading.Thread(target=post, args=("duplicate",))
+    duplicate.start()
+    duplicate.join(0.3)
+    assert duplicate.is_alive()  # esperando a la original
+
+    release.set()
+    original.join(5)
+    duplicate.join(5)
+
+    assert len(calls) == 1
+    assert responses["original"].status_code == responses["duplicate"].status_code == 201
+    assert responses["duplicate"].json() == responses["original"].json()
+    assert count(Task) == 1
+
+
+def test_failed_request_releases_key(monkeypatch):
+    """Test: Si la petición falla, la clave se libera y el reintento se ejecuta"""
+    headers = {**auth_headers(), "Idempotency-Key": "smart-2"}
+    results = [ValueError("Gemini no respondió"), {"titulo": "Revisar contrato", "prioridad": TaskPriority.MEDIUM}]
+
+    def flaky_extract(texto):
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(tasks_api, "extract_task_data", flaky_extract)
+    body = {"input": "Revisar el contrato del piso"}
+
+    assert client.post("/tasks/create-smart", json=body, headers=headers).status_code == 400
+    assert count(IdempotencyKey) == 0
+
+    retry = client.post("/tasks/create-smart", json=body, headers=headers)
+    assert retry.status_code == 201
+    assert retry.json()["titulo"] == "Revisar contrato"
+    assert count(IdempotencyKey) == 1
@@ -0,0 +1,68 @@
+from sqlalchemy import create_engine, text
+from app.services.metrics_service import (
+    Histogram,
+    RequestStats,
+    current_request_stats,
+    http_request_duration_seconds,
+    instrument_engine,
+)
+from tests.conftest import client
+
+# ==========================================
+# TESTS
+# ==========================================
+
+def test_metrics_endpoint_exposes_prometheus_format():
+    """Test: /metrics devuelve texto en formato Prometheus"""
+    client.get("/health")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE http_request_duration_seconds histogram" in response.text
+    assert 'http_requests_total{method="GET",route="/health",status="200"}' in response.text
+
+
+def test_latency_labeled_by_route_template():
+    """Test: La latencia se etiqueta por plantilla de ruta, no por URL"""
+    before = http_request_duration_seconds.get_count(method="GET", route="/tasks/{task_id}")
+
+    client.get("/tasks/123")
+    client.get("/tasks/456")
+
+    after = http_request_duration_seconds.get_count(method="GET", route="/tasks/{task_id}")
+    assert after - before == 2
+
+
+def test_engine_hooks_count_queries_per_request():
+    """Test: Los eventos del engine acumulan consultas en la petición en curso"""
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+
+    stats = RequestStats()
+    token = current_request_stats.set(stats)
+    try:
+        with engine.connect() as conn:
+            for _ in range(3):
+                conn.execute(text("SELECT 1"))
+    finally:
+        current_request_stats.reset(token)
+
+    assert stats.db_queries == 3
+    assert stats.db_seconds > 0
+
+
+def test_histogram_buckets_are_cumulative():
+    """Test: Los buckets del histograma son acumulativos"""
+    histogram = Histogram("demo_seconds", "demo", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    lines = histogram.collect()
+
+    assert 'demo_seconds_bucket{le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{le="1.0"} 2' in lines
+    assert 'demo_seconds_bucket{le="+Inf"} 3' in lines
+    assert "demo_seconds_count 3" in lines
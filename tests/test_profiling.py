@@ -0,0 +1,87 @@
+import pytest
+from app.config import settings
+from app.services.profiling_service import register_engine
+from tests.conftest import client, login, test_engine
+
+# ==========================================
+# CONFIGURACIÓN DE TESTS
+# ==========================================
+
+register_engine(test_engine)
+
+PROFILING_TOKEN = "admin-profiling-token"
+
+@pytest.fixture(autouse=True)
+def profiling_token(monkeypatch):
+    monkeypatch.setattr(settings, "profiling_token", PROFILING_TOKEN)
+
+
+def get_token():
+    return login("profile@example.com", "Profile User")
+
+# ==========================================
+# TESTS
+# ==========================================
+
+def test_request_without_flag_is_not_profiled():
+    """Test: Sin cabecera de profiling no se genera perfil"""
+    token = get_token()
+
+    response = client.get("/tasks", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+
+
+def test_wrong_token_is_not_profiled():
+    """Test: Un token de profiling incorrecto se ignora"""
+    token = get_token()
+
+    response = client.get(
+        "/tasks",
+        headers={"Authorization": f"Bearer {token}", "X-Profile-Token": "wrong"}
+    )
+
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+
+
+def test_token_in_query_string_is_ignored():
+    """Test: El token sólo se acepta en la cabecera, no en la URL"""
+    token = get_token()
+
+    response = client.get(
+        f"/tasks/?_profile={PROFILING_TOKEN}",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+
+
+def test_profiled_request_records_sql():
+    """Test: Una petición perfilada guarda un informe con sus consultas SQL"""
+    token = get_token()
+
+    response = client.get(
+        "/tasks",
+        headers={"Authorization": f"Bearer {token}", "X-Profile-Token": PROFILING_TOKEN}
+    )
+
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+
+    report = client.get(
+        f"/debug/profiles/{profile_id}",
+        headers={"X-Profile-Token": PROFILING_TOKEN}
+    ).json()
+
+    assert report["path"] == "/tasks/"
+    assert report["sql_count"] >= 2
+    assert any("FROM tasks" in q["statement"] for q in report["sql"])
+
+
+def test_profiles_require_admin_token():
+    """Test: Los informes no son accesibles sin el token de administrador"""
+    response = client.get("/debug/profiles")
+    assert response.status_code == 404
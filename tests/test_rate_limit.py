@@ -0,0 +1,108 @@
+import threading
+import time
+import pytest
+from app.config import settings
+from app.services import rate_limit_service
+from app.services.rate_limit_service import (
+    BucketPolicy,
+    DatabaseBackend,
+    MemoryBackend,
+    get_rate_limiter,
+)
+from tests.conftest import client, test_engine
+
+# ==========================================
+# CONFIGURACIÓN DE TESTS
+# ==========================================
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+POLICY = BucketPolicy("test", capacity=2, refill_per_second=0.5)
+
+# ==========================================
+# TESTS
+# ==========================================
+
+@pytest.mark.parametrize("make_backend", [
+    lambda clock: MemoryBackend(clock=clock),
+    lambda clock: DatabaseBackend(test_engine, clock=clock),
+])
+def test_bucket_allows_burst_then_refills(make_backend):
+    """Test: El bucket admite la ráfaga, rechaza con Retry-After y se recarga"""
+    clock = FakeClock()
+    backend = make_backend(clock)
+
+    assert backend.take("k", POLICY).allowed
+    assert backend.take("k", POLICY).allowed
+
+    rejected = backend.take("k", POLICY)
+    assert not rejected.allowed
+    assert rejected.retry_after == pytest.approx(2.0)
+
+    clock.now += 2
+    assert backend.take("k", POLICY).allowed
+    assert not backend.take("k", POLICY).allowed
+
+
+def test_buckets_are_per_key():
+    """Test: Cada usuario/clase tiene su propio bucket"""
+    backend = MemoryBackend(clock=FakeClock())
+
+    backend.take("a", POLICY)
+    backend.take("a", POLICY)
+
+    assert not backend.take("a", POLICY).allowed
+    assert backend.take("b", POLICY).allowed
+
+
+def test_get_rate_limiter_creates_a_single_instance_under_concurrency(monkeypatch):
+    """Test: Peticiones simultáneas comparten el mismo limitador (y sus buckets)"""
+    monkeypatch.setattr(rate_limit_service, "_rate_limiter", None)
+    monkeypatch.setattr(settings, "rate_limit_backend", "memory")
+    original_init = MemoryBackend.__init__
+
+    def slow_init(self, *args, **kwargs):
+        time.sleep(0.05)  # ensancha la carrera entre la comprobación y la asignación
+        original_init(self, *args, **kwargs)
+
+    monkeypatch.setattr(MemoryBackend, "__init__", slow_init)
+    limiters = []
+    threads = [threading.Thread(target=lambda: limiters.append(get_rate_limiter())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(limiters) == 8
+    assert len({id(limiter) for limiter in limiters}) == 1
+
+
+def test_llm_endpoint_returns_429_with_retry_after(monkeypatch):
+    """Test: Superar el budget LLM devuelve 429 con Retry-After, sin afectar al CRUD"""
+    monkeypatch.setattr(settings, "rate_limit_llm_burst", 2)
+
+    client.post(
+        "/auth/register",
+        json={"email": "limit@example.com", "password": "password123", "nombre": "Limit User"}
+    )
+    token = client.post(
+        "/auth/login",
+        json={"email": "limit@example.com", "password": "password123"}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # Sin tareas, suggest-next responde sin llamar a Gemini
+    assert client.post("/tasks/suggest-next", headers=headers).status_code == 200
+    assert client.post("/tasks/suggest-next", headers=headers).status_code == 200
+
+    response = client.post("/tasks/suggest-next", headers=headers)
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+
+    assert client.get("/tasks/", headers=headers).status_code == 200
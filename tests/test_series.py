@@ -0,0 +1,179 @@
+from datetime import datetime, timedelta
+import pytest
+from app.config import settings
+from app.database import upgrade_schema
+from app.models.models import RecurrenceFrequency, Task, TaskSeries
+from app.services.recurrence_service import occurrences
+from sqlalchemy import create_engine, inspect, select, text
+from tests.conftest import TestingSessionLocal, auth_headers, client, login
+
+# ==========================================
+# CONFIGURACIÓN DE TESTS
+# ==========================================
+
+def tomorrow_at(hour: int) -> datetime:
+    return (datetime.now() + timedelta(days=1)).replace(hour=hour, minute=0, second=0, microsecond=0)
+
+# ==========================================
+# TESTS
+# ==========================================
+
+def test_occurrences_jump_to_window():
+    """Test: La expansión calcula las ocurrencias de la ventana sin recorrer la serie"""
+    weekly = TaskSeries(frecuencia=RecurrenceFrequency.WEEKLY, intervalo=2, dias_semana="0,2",
+                        inicio=datetime(2030, 1, 2, 9, 0), fin=None)  # miércoles
+    monthly = TaskSeries(frecuencia=RecurrenceFrequency.MONTHLY, intervalo=1, dias_semana=None,
+                         inicio=datetime(2030, 1, 31, 8, 0), fin=datetime(2030, 6, 1))
+
+    assert list(occurrences(weekly, datetime(2030, 1, 1), datetime(2030, 1, 21))) == [
+        datetime(2030, 1, 2, 9, 0), datetime(2030, 1, 14, 9, 0), datetime(2030, 1, 16, 9, 0)
+    ]
+    # Diez años después: sólo se generan las de la ventana
+    assert len(list(occurrences(weekly, datetime(2040, 1, 1), datetime(2040, 2, 1)))) in (4, 5)
+    # Los meses sin día 31 no tienen ocurrencia; fin es inclusivo
+    assert [d.month for d in occurrences(monthly, datetime(2030, 1, 1), datetime(2031, 1, 1))] == [1, 3, 5]
+
+
+def test_due_includes_virtual_occurrences_and_completion_persists_one_row():
+    """Test: Las ocurrencias aparecen en /tasks/due y sólo se guarda la completada"""
+    headers = auth_headers()
+    series = client.post(
+        "/series/",
+        json={"titulo": "Daily standup", "frecuencia": "daily", "inicio": tomorrow_at(9).isoformat()},
+        headers=headers
+    ).json()
+
+    due = client.get("/tasks/due?within=4d", headers=headers).json()
+    assert [t["titulo"] for t in due] == ["Daily standup"] * len(due) and len(due) >= 3
+    assert all(t["id"] is None and t["series_id"] == series["id"] for t in due)
+
+    first = due[0]["occurrence_at"]
+    completed = client.patch(f"/series/{series['id']}/occurrences/{first}/complete", headers=headers)
+    assert completed.status_code == 200
+    assert completed.json()["id"] is not None
+
+    due_after = client.get("/tasks/due?within=4d", headers=headers).json()
+    assert len(due_after) == len(due) - 1
+    db = TestingSessionLocal()
+    try:
+        assert db.query(Task).count() == 1
+    finally:
+        db.close()
+
+
+def test_list_tasks_expands_occurrences_until():
+    """Test: GET /tasks sólo expande series si se pide una ventana, y en orden de fecha"""
+    headers = auth_headers()
+    client.post(
+        "/series/",
+        json={"titulo": "Regar plantas", "frecuencia": "weekly", "inicio": tomorrow_at(8).isoformat()},
+        headers=headers
+    )
+    client.post(
+        "/tasks/",
+        json={"titulo": "Suelta", "estado": "pending", "prioridad": "low",
+              "fecha_limite": (tomorrow_at(8) + timedelta(days=3)).isoformat()},
+        headers=headers
+    )
+
+    plain = client.get("/tasks/", headers=headers).json()
+    expanded = client.get(
+        f"/tasks/?occurrences_until={(tomorrow_at(8) + timedelta(days=10)).isoformat()}", headers=headers
+    ).json()
+
+    assert [t["titulo"] for t in plain] == ["Suelta"]
+    assert [t["titulo"] for t in expanded] == ["Regar plantas", "Suelta", "Regar plantas"]
+
+
+def test_series_occurrences_are_not_capped_by_other_series(monkeypatch):
+    """Test: El listado de una serie no pierde ocurrencias por las demás series del usuario"""
+    monkeypatch.setattr(settings, "recurrence_max_occurrences", 10)
+    headers = auth_headers()
+    for titulo in ("Serie A", "Serie B"):
+        series = client.post(
+            "/series/",
+            json={"titulo": titulo, "frecuencia": "daily", "inicio": tomorrow_at(9).isoformat()},
+            headers=headers
+        ).json()
+
+    desde, hasta = tomorrow_at(0), tomorrow_at(0) + timedelta(days=10)
+    response = client.get(
+        f"/series/{series['id']}/occurrences",
+        params={"desde": desde.isoformat(), "hasta": hasta.isoformat()},
+        headers=headers
+    )
+
+    assert response.status_code == 200
+    assert len(response.json()) == 10
+    assert {o["series_id"] for o in response.json()} == {series["id"]}
+
+
+def test_occurrence_mutations_emit_task_events():
+    """Test: Editar y completar una ocurrencia emiten task.updated / task.completed con su id"""
+    token = login()
+    headers = {"Authorization": f"Bearer {token}"}
+    series = client.post(
+        "/series/",
+        json={"titulo": "Gimnasio", "frecuencia": "daily", "inicio": tomorrow_at(7).isoformat()},
+        headers=headers
+    ).json()
+    occurrence_at = tomorrow_at(7).isoformat()
+
+    with client.websocket_connect(f"/ws/tasks?token={token}") as websocket:
+        updated = client.put(
+            f"/series/{series['id']}/occurrences/{occurrence_at}", json={"prioridad": "high"}, headers=headers
+        ).json()
+        client.patch(f"/series/{series['id']}/occurrences/{occurrence_at}/complete", headers=headers)
+
+        assert websocket.receive_json() == {"evento": "task.updated", "task_id": updated["id"]}
+        assert websocket.receive_json() == {"evento": "task.completed", "task_id": updated["id"]}
+
+
+def test_invalid_occurrence_is_404():
+    """Test: Una fecha que no es ocurrencia de la serie no se puede materializar"""
+    headers = auth_headers()
+    series = client.post(
+        "/series/",
+        json={"titulo": "Gimnasio", "frecuencia": "daily", "inicio": tomorrow_at(7).isoformat()},
+        headers=headers
+    ).json()
+
+    response = client.put(
+        f"/series/{series['id']}/occurrences/{tomorrow_at(12).isoformat()}",
+        json={"prioridad": "high"},
+        headers=headers
+    )
+
+    assert response.status_code == 404
+
+
+def test_only_listings_allow_virtual_occurrences_without_id():
+    """Test: TaskResponse exige id; sólo los listados con ocurrencias lo permiten nulo"""
+    schemas = client.get("/openapi.json").json()["components"]["schemas"]
+
+    assert "id" in schemas["TaskResponse"]["required"]
+    assert "id" not in schemas["TaskOccurrenceResponse"].get("required", [])
+
+
+def test_upgrade_schema_adds_series_columns_to_existing_tasks_table(tmp_path):
+    """Test: Una tabla tasks anterior a las series recibe sus columnas e índice al arrancar"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE tasks (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, titulo VARCHAR(200) NOT NULL,"
+            " descripcion TEXT, estado VARCHAR(11), prioridad VARCHAR(6), fecha_limite DATETIME,"
+            " original_input TEXT, created_by_ai BOOLEAN, created_at DATETIME, updated_at DATETIME,"
+            " completed_at DATETIME)"
+        ))
+        conn.execute(text("INSERT INTO tasks (id, user_id, titulo) VALUES (1, 1, 'Antigua')"))
+
+    upgrade_schema(engine)
+    upgrade_schema(engine)  # idempotente
+
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("tasks")}
+    assert {"series_id", "occurrence_at"} <= columns
+    assert "idx_tasks_series_occurrence" in {index["name"] for index in inspector.get_indexes("tasks")}
+    with engine.connect() as conn:
+        assert conn.execute(select(Task.titulo, Task.series_id)).all() == [("Antigua", None)]
+    engine.dispose()
@@ -0,0 +1,76 @@
+import pytest
+from app.api import tasks as tasks_api
+from app.models.models import TaskPriority
+from app.services.similarity_service import UserIndex, normalize
+from tests.conftest import auth_headers, client
+
+# ==========================================
+# FIXTURES
+# ==========================================
+
+@pytest.fixture
+def fake_gemini(monkeypatch):
+    """Sustituye la extracción de Gemini y cuenta las llamadas"""
+    calls = []
+
+    def extract(texto):
+        calls.append(texto)
+        return {"titulo": texto[:40], "prioridad": TaskPriority.MEDIUM}
+
+    monkeypatch.setattr(tasks_api, "extract_task_data", extract)
+    return calls
+
+# ==========================================
+# TESTS
+# ==========================================
+
+def test_normalize_ignores_case_accents_and_punctuation():
+    """Test: La normalización quita mayúsculas, acentos y puntuación"""
+    assert normalize("¡Llamar al DENTISTA, mañana!") == "llamar al dentista manana"
+
+
+def test_index_finds_rewordings_and_forgets_removed_tasks():
+    """Test: El índice reconoce variaciones de redacción y se actualiza al quitar tareas"""
+    index = UserIndex()
+    index.add(1, ("Llamar al dentista", "Llamar al dentista mañana a las 10am, es urgente"))
+    index.add(2, ("Comprar leche", None))
+
+    assert index.best_match("llamar al dentista mañana a las 10, urgente").task_id == 1
+    assert index.best_match("Enviar informe trimestral").score < 0.2
+
+    index.remove(1)
+    assert index.best_match("Llamar al dentista").task_id == 2
+    assert len(index) == 1
+
+
+def test_create_smart_returns_existing_task_without_calling_gemini(fake_gemini):
+    """Test: Un input casi idéntico a una tarea activa devuelve 409 sin llamar a Gemini"""
+    headers = auth_headers()
+    existing = client.post(
+        "/tasks/",
+        json={"titulo": "Llamar al dentista", "estado": "pending", "prioridad": "medium"},
+        headers=headers
+    ).json()
+
+    response = client.post("/tasks/create-smart", json={"input": "llamar al dentista!"}, headers=headers)
+
+    assert response.status_code == 409
+    assert response.json()["detail"]["task"]["id"] == existing["id"]
+    assert fake_gemini == []
+
+
+def test_completed_tasks_are_not_duplicates(fake_gemini):
+    """Test: Al completar una tarea deja de contar como duplicado; allow_duplicate lo fuerza"""
+    headers = auth_headers()
+    first = client.post("/tasks/create-smart", json={"input": "Pagar la factura de la luz"}, headers=headers)
+    again = client.post("/tasks/create-smart", json={"input": "pagar factura de la luz"}, headers=headers)
+    forced = client.post(
+        "/tasks/create-smart?allow_duplicate=true", json={"input": "pagar factura de la luz"}, headers=headers
+    )
+
+    client.patch(f"/tasks/{first.json()['id']}/complete", headers=headers)
+    client.patch(f"/tasks/{forced.json()['id']}/complete", headers=headers)
+    after = client.post("/tasks/create-smart", json={"input": "pagar factura de la luz"}, headers=headers)
+
+    assert (first.status_code, again.status_code, forced.status_code, after.status_code) == (201, 409, 201, 201)
+    assert len(fake_gemini) == 3
@@ -0,0 +1,528 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+import csv
+import io
+import json
+import msgpack
+import pytest
+from pydantic import TypeAdapter
+from app.config import settings
+from app.jobs.archive_tasks import archive_tasks
+from app.jobs.deadline_scanner import scan_deadlines
+from app.models.models import Task, TaskArchive, TaskPriority, TaskStatus
+from app.schemas.schemas import TaskResponse
+from sqlalchemy import event
+from tests.conftest import TestingSessionLocal, auth_headers, client, test_engine
+
+# ==========================================
+# CONFIGURACIÓN DE TESTS
+# ==========================================
+
+def create_task(headers, **overrides):
+    data = {
+        "titulo": "Llamar al dentista",
+        "descripcion": "Pedir cita",
+        "estado": "pending",
+        "prioridad": "medium",
+        "fecha_limite": "2030-01-10T10:00:00"
+    }
+    data.update(overrides)
+    response = client.post("/tasks/", json=data, headers=headers)
+    assert response.status_code == 201
+    return response.json()
+
+# ==========================================
+# TESTS
+# ==========================================
+
+def test_list_tasks_matches_task_response():
+    """Test: El listado rápido produce el mismo JSON que TaskResponse"""
+    headers = auth_headers()
+    create_task(headers)
+    create_task(headers, titulo="Sin fecha", fecha_limite=None, prioridad="urgent")
+
+    response = client.get("/tasks/", headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+
+    db = TestingSessionLocal()
+    try:
+        tasks = db.query(Task).order_by(Task.fecha_limite.asc().nullslast()).all()
+        expected = TypeAdapter(list[TaskResponse]).dump_json(
+            [TaskResponse.model_validate(t) for t in tasks]
+        )
+    finally:
+        db.close()
+
+    assert response.content == expected
+
+
+def test_list_tasks_filters_and_order():
+    """Test: Filtros por estado/prioridad y orden por fecha límite"""
+    headers = auth_headers()
+    create_task(headers, titulo="Tarde", fecha_limite="2030-02-01T10:00:00")
+    create_task(headers, titulo="Pronto", fecha_limite="2030-01-01T10:00:00", prioridad="high")
+    create_task(headers, titulo="Sin fecha", fecha_limite=None)
+
+    titles = [t["titulo"] for t in client.get("/tasks/", headers=headers).json()]
+    assert titles == ["Pronto", "Tarde", "Sin fecha"]
+
+    high = client.get("/tasks/?prioridad=high", headers=headers).json()
+    assert [t["titulo"] for t in high] == ["Pronto"]
+    assert high[0]["estado"] == "pending"
+
+
+def test_list_tasks_only_returns_own_tasks():
+    """Test: Cada usuario sólo ve sus tareas"""
+    create_task(auth_headers("otro@example.com"), titulo="Ajena")
+    headers = auth_headers()
+    create_task(headers, titulo="Propia")
+
+    titles = [t["titulo"] for t in client.get("/tasks/", headers=headers).json()]
+    assert titles == ["Propia"]
+
+
+def test_list_tasks_msgpack():
+    """Test: Accept: application/msgpack devuelve la lista en MessagePack"""
+    headers = auth_headers()
+    create_task(headers)
+    expected = client.get("/tasks/", headers=headers).json()
+
+    response = client.get("/tasks/", headers={**headers, "Accept": "application/msgpack"})
+
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == expected
+
+
+@pytest.mark.parametrize("accept, media_type", [
+    ("application/msgpack;q=0, application/json", "application/json"),
+    ("application/json;q=0.5, application/x-msgpack", "application/msgpack"),
+    ("application/msgpack;q=0.4, application/json;q=0.9", "application/json"),
+    ("text/html, */*;q=0.8", "application/json"),
+    ("application/vnd.taskmaster.columnar+json, application/json;q=0.5", "application/vnd.taskmaster.columnar+json"),
+])
+def test_list_tasks_accept_honors_quality_values(accept, media_type):
+    """Test: Accept se interpreta por rangos y valores q, no por subcadenas"""
+    headers = auth_headers()
+    create_task(headers)
+
+    response = client.get("/tasks/", headers={**headers, "Accept": accept})
+
+    assert response.headers["content-type"] == media_type
+
+
+@pytest.mark.parametrize("accept_encoding, encoding", [
+    ("br;q=0, gzip", "gzip"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("gzip, br", "br"),
+    ("*;q=0.5", "br"),
+    ("gzip;q=0, br;q=0", None),
+])
+def test_list_tasks_accept_encoding_honors_quality_values(monkeypatch, accept_encoding, encoding):
+    """Test: La compresión elegida es la de mayor q entre br y gzip"""
+    headers = auth_headers()
+    create_task(headers)
+    monkeypatch.setattr(settings, "compression_min_bytes", 1)
+
+    response = client.get("/tasks/", headers={**headers, "Accept-Encoding": accept_encoding})
+
+    assert response.headers.get("content-encoding") == encoding
+    assert response.json()[0]["titulo"] == "Llamar al dentista"
+
+
+def test_list_tasks_columnar():
+    """Test: ?layout=columnar envía los nombres de campo una sola vez"""
+    headers = auth_headers()
+    create_task(headers, titulo="Uno")
+    create_task(headers, titulo="Dos", fecha_limite=None)
+    expected = client.get("/tasks/", headers=headers).json()
+
+    data = client.get("/tasks/?layout=columnar", headers=headers).json()
+
+    assert [dict(zip(data["fields"], row)) for row in data["rows"]] == expected
+
+
+def test_list_tasks_compressed_above_threshold(monkeypatch):
+    """Test: Se comprime con gzip sólo por encima del tamaño mínimo"""
+    headers = auth_headers()
+    create_task(headers)
+    headers["Accept-Encoding"] = "gzip"
+
+    monkeypatch.setattr(settings, "compression_min_bytes", 10**6)
+    response = client.get("/tasks/", headers=headers)
+    assert "content-encoding" not in response.headers
+
+    monkeypatch.setattr(settings, "compression_min_bytes", 1)
+    response = client.get("/tasks/", headers=headers)
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json()[0]["titulo"] == "Llamar al dentista"
+
+
+def test_archive_moves_old_finished_tasks():
+    """Test: El archivado mueve sólo las tareas terminadas hace más de N días"""
+    headers = auth_headers()
+    old_done = create_task(headers, titulo="Vieja completada")
+    old_cancelled = create_task(headers, titulo="Vieja cancelada")
+    recent_done = create_task(headers, titulo="Reciente completada")
+    active = create_task(headers, titulo="Activa")
+
+    long_ago = datetime.utcnow() - timedelta(days=90)
+    db = TestingSessionLocal()
+    try:
+        db.query(Task).filter(Task.id == old_done["id"]).update(
+            {"estado": TaskStatus.COMPLETED, "completed_at": long_ago}
+        )
+        db.query(Task).filter(Task.id == old_cancelled["id"]).update(
+            {"estado": TaskStatus.CANCELLED, "updated_at": long_ago}
+        )
+        db.query(Task).filter(Task.id == recent_done["id"]).update(
+            {"estado": TaskStatus.COMPLETED, "completed_at": datetime.utcnow()}
+        )
+        db.commit()
+
+        archived = archive_tasks(db, older_than_days=30, batch_size=1)
+
+        assert archived == 2
+        assert {t.id for t in db.query(Task).all()} == {recent_done["id"], active["id"]}
+        assert {t.id for t in db.query(TaskArchive).all()} == {old_done["id"], old_cancelled["id"]}
+    finally:
+        db.close()
+
+    titles = [t["titulo"] for t in client.get("/tasks/", headers=headers).json()]
+    assert "Vieja completada" not in titles
+
+    response = client.get("/tasks/?include_archived=true", headers=headers)
+    titles = [t["titulo"] for t in response.json()]
+    assert sorted(titles) == ["Activa", "Reciente completada", "Vieja cancelada", "Vieja completada"]
+
+    completed = client.get("/tasks/?include_archived=true&estado=completed", headers=headers).json()
+    assert sorted(t["titulo"] for t in completed) == ["Reciente completada", "Vieja completada"]
+
+
+def test_archive_skips_task_whose_id_is_already_archived():
+    """Test: Un id reutilizado (SQLite sin AUTOINCREMENT) no aborta el archivado"""
+    headers = auth_headers()
+    reused = create_task(headers, titulo="Id reutilizado")
+    other = create_task(headers, titulo="Otra vieja")
+
+    long_ago = datetime.utcnow() - timedelta(days=90)
+    db = TestingSessionLocal()
+    try:
+        # Una tarea archivada hace tiempo con el mismo id que `reused`
+        db.add(TaskArchive(
+            id=reused["id"], user_id=reused["user_id"], titulo="Archivada antes",
+            prioridad=TaskPriority.MEDIUM, estado=TaskStatus.COMPLETED,
+            created_at=long_ago, updated_at=long_ago, completed_at=long_ago, archived_at=long_ago
+        ))
+        db.query(Task).filter(Task.id.in_([reused["id"], other["id"]])).update(
+            {"estado": TaskStatus.COMPLETED, "completed_at": long_ago}
+        )
+        db.commit()
+
+        archived = archive_tasks(db, older_than_days=30, batch_size=1)
+
+        assert archived == 1
+        assert [t.id for t in db.query(Task).all()] == [reused["id"]]
+        archived_titles = {t.id: t.titulo for t in db.query(TaskArchive).all()}
+        assert archived_titles == {reused["id"]: "Archivada antes", other["id"]: "Otra vieja"}
+    finally:
+        db.close()
+
+
+def test_bulk_complete_by_ids():
+    """Test: PATCH /tasks/bulk completa varias tareas por ID y fija completed_at"""
+    headers = auth_headers()
+    a = create_task(headers, titulo="A")
+    b = create_task(headers, titulo="B")
+    c = create_task(headers, titulo="C")
+    ajena = create_task(auth_headers("otro@example.com"), titulo="Ajena")
+
+    response = client.patch(
+        "/tasks/bulk",
+        json={"ids": [a["id"], b["id"], ajena["id"]], "cambios": {"estado": "completed"}},
+        headers=headers
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"ids": sorted([a["id"], b["id"]]), "total": 2}
+
+    tasks = {t["id"]: t for t in client.get("/tasks/", headers=headers).json()}
+    assert tasks[a["id"]]["estado"] == "completed"
+    assert tasks[a["id"]]["completed_at"] is not None
+    assert tasks[c["id"]]["estado"] == "pending"
+
+
+def test_bulk_update_by_filter():
+    """Test: PATCH /tasks/bulk reprioriza las tareas de un rango de fechas"""
+    headers = auth_headers()
+    vencida = create_task(headers, titulo="Vencida", fecha_limite="2020-01-01T10:00:00")
+    create_task(headers, titulo="Futura", fecha_limite="2030-01-01T10:00:00")
+
+    response = client.patch(
+        "/tasks/bulk",
+        json={
+            "filtro": {"estado": "pending", "fecha_limite_hasta": "2025-01-01T00:00:00"},
+            "cambios": {"prioridad": "urgent"}
+        },
+        headers=headers
+    )
+
+    assert response.json() == {"ids": [vencida["id"]], "total": 1}
+    urgent = client.get("/tasks/?prioridad=urgent", headers=headers).json()
+    assert [t["titulo"] for t in urgent] == ["Vencida"]
+
+
+def test_bulk_update_requires_single_selector():
+    """Test: Hay que indicar ids o un filtro no vacío, no ambos ni ninguno"""
+    headers = auth_headers()
+
+    both = client.patch(
+        "/tasks/bulk",
+        json={"ids": [1], "filtro": {}, "cambios": {"prioridad": "low"}},
+        headers=headers
+    )
+    neither = client.patch("/tasks/bulk", json={"cambios": {"prioridad": "low"}}, headers=headers)
+    empty_filter = client.patch(
+        "/tasks/bulk",
+        json={"filtro": {}, "cambios": {"prioridad": "low"}},
+        headers=headers
+    )
+
+    assert both.status_code == 422
+    assert neither.status_code == 422
+    assert empty_filter.status_code == 422
+
+
+def test_due_and_overdue_tasks():
+    """Test: /tasks/due y /tasks/overdue devuelven sólo tareas activas en su rango"""
+    headers = auth_headers()
+    now = datetime.now()
+    create_task(headers, titulo="Vence en 2h", fecha_limite=(now + timedelta(hours=2)).isoformat())
+    create_task(headers, titulo="Vence en 3d", fecha_limite=(now + timedelta(days=3)).isoformat())
+    create_task(headers, titulo="Vencida", fecha_limite=(now - timedelta(days=1)).isoformat())
+    hecha = create_task(headers, titulo="Vencida hecha", fecha_limite=(now - timedelta(days=2)).isoformat())
+    client.patch(f"/tasks/{hecha['id']}/complete", headers=headers)
+    create_task(headers, titulo="Sin fecha", fecha_limite=None)
+
+    due = client.get("/tasks/due", headers=headers).json()
+    due_week = client.get("/tasks/due?within=7d", headers=headers).json()
+    overdue = client.get("/tasks/overdue", headers=headers).json()
+
+    assert [t["titulo"] for t in due] == ["Vence en 2h"]
+    assert [t["titulo"] for t in due_week] == ["Vence en 2h", "Vence en 3d"]
+    assert [t["titulo"] for t in overdue] == ["Vencida"]
+    assert client.get("/tasks/due?within=mañana", headers=headers).status_code == 422
+
+
+def test_deadline_scanner_walks_all_users_in_order():
+    """Test: El escáner recorre por lotes las fechas de todos los usuarios en orden"""
+    base = datetime(2030, 1, 1, 9, 0)
+    first = auth_headers()
+    second = auth_headers("otro@example.com")
+    for i in range(5):
+        create_task(first if i % 2 else second, titulo=f"T{i}", fecha_limite=(base + timedelta(hours=i)).isoformat())
+    create_task(first, titulo="Fuera de ventana", fecha_limite=(base + timedelta(days=2)).isoformat())
+    cancelada = create_task(second, titulo="Cancelada", fecha_limite=base.isoformat())
+    client.put(f"/tasks/{cancelada['id']}", json={"estado": "cancelled"}, headers=second)
+
+    db = TestingSessionLocal()
+    try:
+        rows = list(scan_deadlines(db, base, base + timedelta(days=1), batch_size=2))
+    finally:
+        db.close()
+
+    assert [row.titulo for row in rows] == ["T0", "T1", "T2", "T3", "T4"]
+    assert len({row.user_id for row in rows}) == 2
+
+
+def test_export_streams_jsonl_in_batches(monkeypatch):
+    """Test: /tasks/export?format=jsonl devuelve todas las tareas, una por línea, aunque haya varios lotes"""
+    monkeypatch.setattr(settings, "export_batch_size", 2)
+    headers = auth_headers()
+    created = [create_task(headers, titulo=f"Tarea {i}") for i in range(5)]
+    create_task(auth_headers("otro@example.com"), titulo="Ajena")
+
+    response = client.get("/tasks/export?format=jsonl", headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "attachment" in response.headers["content-disposition"]
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    assert exported == created
+
+
+def test_export_csv_includes_archived_on_request():
+    """Test: La exportación CSV incluye las archivadas sólo si se pide"""
+    headers = auth_headers()
+    done = create_task(headers, titulo="Archivada")
+    create_task(headers, titulo="Activa")
+    client.patch(f"/tasks/{done['id']}/complete", headers=headers)
+    db = TestingSessionLocal()
+    try:
+        db.query(Task).filter(Task.id == done["id"]).update({"completed_at": datetime.utcnow() - timedelta(days=90)})
+        db.commit()
+        archive_tasks(db, older_than_days=30)
+    finally:
+        db.close()
+
+    plain = list(csv.DictReader(io.StringIO(client.get("/tasks/export?format=csv", headers=headers).text)))
+    full = list(csv.DictReader(io.StringIO(
+        client.get("/tasks/export?format=csv&include_archived=true", headers=headers).text
+    )))
+
+    assert [row["titulo"] for row in plain] == ["Activa"]
+    assert [(row["titulo"], row["estado"]) for row in full] == [("Archivada", "completed"), ("Activa", "pending")]
+
+
+def test_import_csv_reports_row_errors(monkeypatch):
+    """Test: /tasks/import guarda las filas válidas por lotes y detalla las inválidas"""
+    monkeypatch.setattr(settings, "import_batch_size", 2)
+    headers = auth_headers()
+    content = (
+        "titulo,descripcion,estado,prioridad,fecha_limite\n"
+        "Comprar pan,,pending,low,\n"
+        ",Sin título,pending,low,\n"
+        "Pagar luz,Factura,completed,high,2025-03-01T10:00:00\n"
+        "Llamar,,pending,altísima,\n"
+        "Regar,,,,\n"
+    )
+
+    response = client.post(
+        "/tasks/import",
+        headers=headers,
+        files={"file": ("tareas.csv", content.encode(), "text/csv")}
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["procesadas"], data["importadas"], data["con_errores"]) == (5, 3, 2)
+    assert [error["fila"] for error in data["errores"]] == [3, 5]
+    tasks = client.get("/tasks/", headers=headers).json()
+    assert [(t["titulo"], t["estado"], t["prioridad"]) for t in tasks] == [
+        ("Pagar luz", "completed", "high"),
+        ("Comprar pan", "pending", "low"),
+        ("Regar", "pending", "medium"),
+    ]
+
+
+def test_import_ics_streams_progress():
+    """Test: Importar un .ics con Accept: application/x-ndjson devuelve el progreso en streaming"""
+    headers = auth_headers()
+    content = (
+        "BEGIN:VCALENDAR\r\n"
+        "BEGIN:VTODO\r\n"
+        "SUMMARY:Preparar la demo\\, con\r\n"
+        "  datos reales\r\n"
+        "DUE;TZID=Europe/Madrid:20250310T090000\r\n"
+        "PRIORITY:1\r\n"
+        "STATUS:IN-PROCESS\r\n"
+        "END:VTODO\r\n"
+        "BEGIN:VEVENT\r\n"
+        "SUMMARY:Revisión\r\n"
+        "DTSTART;VALUE=DATE:20250311\r\n"
+        "END:VEVENT\r\n"
+        "BEGIN:VEVENT\r\n"
+        "SUMMARY:Llamada\r\n"
+        "DTSTART:20250312T100000Z\r\n"
+        "END:VEVENT\r\n"
+        "BEGIN:VEVENT\r\n"
+        "SUMMARY:Sin zona\r\n"
+        "DTSTART;TZID=Marte/Olympus:20250313T100000\r\n"
+        "END:VEVENT\r\n"
+        "END:VCALENDAR\r\n"
+    )
+    # Las horas con zona se guardan en hora local, como las demás fechas límite
+    madrid = datetime(2025, 3, 10, 9, 0, tzinfo=ZoneInfo("Europe/Madrid")).astimezone().replace(tzinfo=None)
+    utc = datetime(2025, 3, 12, 10, 0, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+
+    response = client.post(
+        "/tasks/import",
+        headers={**headers, "Accept": "application/x-ndjson"},
+        files={"file": ("agenda.ics", content.encode(), "text/calendar")}
+    )
+
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[0]["fila"] == 17
+    assert "Marte/Olympus" in events[0]["errores"][0]
+    assert events[-1] == {"procesadas": 4, "importadas": 3, "con_errores": 1, "terminado": True}
+    tasks = client.get("/tasks/", headers=headers).json()
+    assert [(t["titulo"], t["estado"], t["prioridad"], t["fecha_limite"]) for t in tasks] == [
+        ("Preparar la demo, con datos reales", "in_progress", "urgent", madrid.isoformat()),
+        ("Revisión", "pending", "medium", "2025-03-11T00:00:00"),
+        ("Llamada", "pending", "medium", utc.isoformat()),
+    ]
+
+
+def test_import_unreadable_file_reports_error_instead_of_failing():
+    """Test: Un fichero que no es UTF-8 termina la importación con un error de fila, no con un 500"""
+    headers = auth_headers()
+    content = b"titulo,prioridad\nComprar pan,low\n" + b"\xff\xfe" + b"basura\n"
+
+    response = client.post(
+        "/tasks/import",
+        headers=headers,
+        files={"file": ("tareas.csv", content, "text/csv")}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["con_errores"] == 1
+    assert "ilegible" in data["errores"][0]["errores"][0]
+
+    response = client.post(
+        "/tasks/import",
+        headers={**headers, "Accept": "application/x-ndjson"},
+        files={"file": ("tareas.csv", content, "text/csv")}
+    )
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert "ilegible" in events[0]["errores"][0]
+    assert events[-1]["terminado"] is True
+
+    # Con q=0 se rechaza el stream: resumen JSON
+    response = client.post(
+        "/tasks/import",
+        headers={**headers, "Accept": "application/x-ndjson;q=0, application/json"},
+        files={"file": ("tareas.csv", content, "text/csv")}
+    )
+    assert response.headers["content-type"] == "application/json"
+    assert response.json()["con_errores"] == 1
+
+
+def test_sparse_fields_are_pushed_into_select():
+    """Test: ?fields= devuelve sólo esos campos y no lee las demás columnas"""
+    headers = auth_headers()
+    task = create_task(headers, descripcion="x" * 500)
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(test_engine, "before_cursor_execute", capture)
+    try:
+        listed = client.get("/tasks/?fields=titulo,id,estado", headers=headers)
+        single = client.get(f"/tasks/{task['id']}?fields=titulo,fecha_limite", headers=headers)
+    finally:
+        event.remove(test_engine, "before_cursor_execute", capture)
+
+    assert listed.json() == [{"id": task["id"], "titulo": task["titulo"], "estado": "pending"}]
+    assert single.json() == {"titulo": task["titulo"], "fecha_limite": task["fecha_limite"]}
+    task_selects = [s for s in statements if "FROM tasks" in s]
+    assert len(task_selects) == 2
+    assert all("descripcion" not in s for s in task_selects)
+
+    assert client.get(f"/tasks/{task['id']}", headers=headers).json() == task
+    assert client.get("/tasks/?fields=id,password", headers=headers).status_code == 400
+
+
+def test_sparse_fields_with_archived_and_occurrences():
+    """Test: Sin pedir fecha_limite, la unión con archivadas y las ocurrencias siguen ordenadas"""
+    headers = auth_headers()
+    create_task(headers, titulo="Tarde", fecha_limite="2030-02-01T10:00:00")
+    create_task(headers, titulo="Pronto", fecha_limite="2030-01-01T10:00:00")
+
+    response = client.get(
+        "/tasks/?fields=titulo&include_archived=true&occurrences_until=2031-01-01T00:00:00", headers=headers
+    )
+
+    assert response.json() == [{"titulo": "Pronto"}, {"titulo": "Tarde"}]
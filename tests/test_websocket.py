@@ -0,0 +1,55 @@
+import pytest
+from starlette.websockets import WebSocketDisconnect
+from app.services.events_service import task_event_hub
+from tests.conftest import client, login
+
+# ==========================================
+# CONFIGURACIÓN DE TESTS
+# ==========================================
+
+TASK = {"titulo": "Regar plantas", "estado": "pending", "prioridad": "medium"}
+
+# ==========================================
+# TESTS
+# ==========================================
+
+def test_websocket_receives_task_events():
+    """Test: El cliente recibe los eventos de sus tareas en el orden de las mutaciones"""
+    token = login()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with client.websocket_connect(f"/ws/tasks?token={token}") as websocket:
+        task_id = client.post("/tasks/", json={**TASK, "titulo": "Regar plantas"}, headers=headers).json()["id"]
+        client.put(f"/tasks/{task_id}", json={"titulo": "Regar las plantas"}, headers=headers)
+        client.patch(f"/tasks/{task_id}/complete", headers=headers)
+        client.delete(f"/tasks/{task_id}", headers=headers)
+
+        assert websocket.receive_json() == {"evento": "task.created", "task_id": task_id}
+        assert websocket.receive_json() == {"evento": "task.updated", "task_id": task_id}
+        assert websocket.receive_json() == {"evento": "task.completed", "task_id": task_id}
+        assert websocket.receive_json() == {"evento": "task.deleted", "task_id": task_id}
+
+    assert task_event_hub.connection_count() == 0
+
+
+def test_websocket_events_are_per_user():
+    """Test: Un usuario no recibe los eventos de las tareas de otro"""
+    token = login()
+    other_headers = {"Authorization": f"Bearer {login('otro@example.com')}"}
+
+    with client.websocket_connect("/ws/tasks", headers={"Authorization": f"Bearer {token}"}) as websocket:
+        client.post("/tasks/", json={**TASK, "titulo": "Tarea ajena"}, headers=other_headers)
+        task_id = client.post(
+            "/tasks/", json={**TASK, "titulo": "Tarea propia"}, headers={"Authorization": f"Bearer {token}"}
+        ).json()["id"]
+
+        assert websocket.receive_json() == {"evento": "task.created", "task_id": task_id}
+
+
+def test_websocket_rejects_invalid_token():
+    """Test: Sin un token válido la conexión se rechaza"""
+    with pytest.raises(WebSocketDisconnect) as exc_info:
+        with client.websocket_connect("/ws/tasks?token=no-es-un-jwt") as websocket:
+            websocket.receive_json()
+
+    assert exc_info.value.code == 1008